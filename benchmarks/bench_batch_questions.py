@@ -0,0 +1,101 @@
+"""
+Compara responder un lote de preguntas una a una (`ask_question`) con `ask_questions`.
+
+Usa un Ollama falso (embeddings y chat con latencias simuladas) y un almacén vectorial con
+un corpus sintético: el almacén numpy o, con `--milvus-uri`, Milvus (Lite o servidor). Para
+cada modo informa preguntas/min, la ganancia frente al bucle secuencial y el tiempo de las
+etapas compartidas del lote (embeddings en una llamada y búsqueda multi-vector).
+
+Uso:
+    python -m benchmarks.bench_batch_questions --questions 64 --levels 1 4 8
+    python -m benchmarks.bench_batch_questions --milvus-uri ./cache/bench_batch.db
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_vector_store import synthetic_corpus
+from benchmarks.fake_ollama import FakeOllamaServer
+from src.application.metrics import Metrics
+from src.application.orchestrator import Orchestrator
+from src.infrastructure.embedding_manager import OllamaEmbeddingManager
+from src.infrastructure.numpy_vector_store import NumpyVectorStore
+
+COLLECTION = "bench_batch_questions"
+
+
+def open_store(args, workdir: str, dim: int):
+    if not args.milvus_uri:
+        return NumpyVectorStore(os.path.join(workdir, "store"), COLLECTION, dim)
+    from src.infrastructure.vector_store_manager import MilvusManager
+
+    return MilvusManager(args.milvus_uri, COLLECTION, dim, index_type="FLAT")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=64)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 8], help="Concurrencias del LLM en ask_questions")
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="Peticiones que atiende el Ollama falso a la vez")
+    parser.add_argument("--prefill-latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--milvus-uri", default="")
+    args = parser.parse_args()
+
+    questions = [f"Pregunta de evaluación número {i} sobre el documento" for i in range(args.questions)]
+    with FakeOllamaServer(
+        dim=384,
+        parallel=args.ollama_parallel,
+        prefill_latency=args.prefill_latency,
+        token_latency=args.token_latency,
+        answer_tokens=args.answer_tokens,
+    ) as server, tempfile.TemporaryDirectory() as workdir:
+        store = open_store(args, workdir, server.dim)
+        store.set_collection()
+        chunks, _ = synthetic_corpus(args.chunks, server.dim)
+        store.insert(chunks, upsert=False)
+
+        orchestrator = Orchestrator(
+            loader=None,
+            text_processor=None,
+            chunker=None,
+            embedder=OllamaEmbeddingManager("fake-embed", host=server.url),
+            vector_store=store,
+            llm_model="fake-llm",
+            search_top_k=5,
+            llm_host=server.url,
+        )
+
+        results = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            for question in questions:
+                orchestrator.ask_question(question)
+            results.append(("ask_question (secuencial)", time.perf_counter() - started, None))
+
+            # Con trazas, cada respuesta incluye la duración de las etapas compartidas del lote
+            orchestrator.metrics = Metrics(trace_requests=True)
+            for level in args.levels:
+                started = time.perf_counter()
+                responses = orchestrator.ask_questions(questions, max_concurrency=level)
+                seconds = time.perf_counter() - started
+                shared = {span["name"]: span["duration_ms"] for span in responses[0].trace["spans"]}
+                results.append((f"ask_questions x{level}", seconds, shared))
+
+    backend = "Milvus" if args.milvus_uri else "numpy"
+    print(f"{args.questions} preguntas, almacén {backend} con {args.chunks} chunks, Ollama falso con {args.ollama_parallel} en paralelo")
+    print(f"{'modo':<28} {'preguntas/min':>14} {'ganancia':>9}  etapas compartidas del lote")
+    baseline = results[0][1]
+    for name, seconds, shared in results:
+        detail = f"embeddings {shared['embed_question']:.0f} ms, búsqueda {shared['retrieve']:.0f} ms" if shared else "-"
+        print(f"{name:<28} {args.questions / seconds * 60:>14.1f} {baseline / seconds:>8.2f}x  {detail}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compara el rendimiento (chunks/s) del bucle serial original de embeddings contra
+el camino por lotes y concurrente de OllamaEmbeddingManager, usando un Ollama falso.
+
+Uso:
+    python -m benchmarks.bench_embeddings --chunks 500 --concurrency 4
+"""
+
+import argparse
+import time
+
+import ollama
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from src.infrastructure.embedding_manager import OllamaEmbeddingManager
+
+
+def legacy_embeddings_batch(client, model_name, texts, batch_size=15):
+    """Reproduce el bucle original: una petición por texto y una pausa fija por lote"""
+    embeddings = []
+    for i in range(0, len(texts), batch_size):
+        for text in texts[i : i + batch_size]:
+            embeddings.append(client.embeddings(model=model_name, prompt=text[:4000])["embedding"])
+        time.sleep(0.3)
+    return embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=15)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--request-latency", type=float, default=0.02)
+    parser.add_argument("--item-latency", type=float, default=0.002)
+    parser.add_argument("--skip-legacy", action="store_true", help="No ejecutar el bucle original")
+    args = parser.parse_args()
+
+    texts = [f"Chunk sintético número {i}. " * 20 for i in range(args.chunks)]
+
+    with FakeOllamaServer(
+        request_latency=args.request_latency, item_latency=args.item_latency, parallel=args.concurrency
+    ) as server:
+        results = {}
+        if not args.skip_legacy:
+            client = ollama.Client(host=server.url)
+            start = time.perf_counter()
+            legacy_embeddings_batch(client, "fake-embed", texts, args.batch_size)
+            results["legacy"] = args.chunks / (time.perf_counter() - start)
+
+        manager = OllamaEmbeddingManager("fake-embed", host=server.url, max_concurrency=args.concurrency)
+        start = time.perf_counter()
+        embeddings = manager.get_embeddings_batch(texts, batch_size=args.batch_size)
+        results["batched"] = args.chunks / (time.perf_counter() - start)
+        assert len(embeddings) == len(texts)
+
+    for name, rate in results.items():
+        print(f"{name:>8}: {rate:8.1f} chunks/s")
+    if "legacy" in results:
+        print(f"Aceleración: {results['batched'] / results['legacy']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
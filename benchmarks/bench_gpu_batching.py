@@ -0,0 +1,85 @@
+"""
+Compara los lotes fijos de GPUEmbeddingGenerator con los lotes por presupuesto de tokens.
+
+Informa el ratio de padding de cada modo, el tiempo de inferencia y si los embeddings
+resultantes son idénticos bit a bit (y, si no, la diferencia absoluta máxima).
+Después repite ambos modos tokenizando en secuencia y con la tokenización solapada con la
+inferencia (`--tokenizer-workers`), e informa qué fracción del tiempo total estuvo ocupada
+la etapa de inferencia.
+Requiere el modelo ONNX (se exporta automáticamente la primera vez).
+
+Uso:
+    python -m benchmarks.bench_gpu_batching --texts 2000 --batch-size 32 --token-budget 8192 --tokenizer-workers 1
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from src.infrastructure.embedding_gpu import GPUEmbeddingGenerator
+
+WORDS = "el sistema procesa documentos con chunks de texto variable y genera embeddings para la búsqueda".split()
+
+
+def synthetic_texts(count: int, seed: int = 0):
+    """Textos con longitudes muy dispares, como los chunks de páginas completas y parciales"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.choice([5, 20, 60, 150, 400]))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--token-budget", type=int, default=8192)
+    parser.add_argument("--tokenizer-workers", type=int, default=1)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.texts)
+    embedder = GPUEmbeddingGenerator(args.model, tokenizer_workers=0)
+
+    start = time.perf_counter()
+    fixed = np.vstack(
+        [embedder.generate_embeddings(texts[i : i + args.batch_size]) for i in range(0, len(texts), args.batch_size)]
+    )
+    fixed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bucketed = embedder.generate_embeddings_bucketed(
+        texts, token_budget=args.token_budget, baseline_batch_size=args.batch_size
+    )
+    bucketed_seconds = time.perf_counter() - start
+
+    stats = embedder.last_batching_stats
+    print(f"Padding lotes fijos ({args.batch_size}):      {stats['padding_ratio_fixed']:.1%}")
+    print(f"Padding por presupuesto ({args.token_budget}): {stats['padding_ratio_bucketed']:.1%}")
+    print(f"Tiempo lotes fijos:       {fixed_seconds:.2f} s ({len(texts) / fixed_seconds:.1f} textos/s)")
+    print(f"Tiempo por presupuesto:   {bucketed_seconds:.2f} s ({len(texts) / bucketed_seconds:.1f} textos/s)")
+    print(f"Idénticos bit a bit:      {np.array_equal(fixed, bucketed)}")
+    print(f"Diferencia absoluta máx.: {np.max(np.abs(fixed - bucketed)):.3e}")
+
+    print(f"\n{'modo':<14} {'hilos tok.':>10} {'total (s)':>10} {'tok. (s)':>9} {'inferencia (s)':>15} {'ocupación':>10}")
+    runs = {
+        "lotes fijos": lambda: embedder.get_embeddings_batch(texts, batch_size=args.batch_size),
+        "presupuesto": lambda: embedder.generate_embeddings_bucketed(
+            texts, token_budget=args.token_budget, baseline_batch_size=args.batch_size
+        ),
+    }
+    for mode, run in runs.items():
+        results = []
+        for workers in (0, args.tokenizer_workers):
+            embedder.tokenizer_workers = workers
+            results.append(np.asarray(run()))
+            stats = embedder.last_pipeline_stats
+            print(
+                f"{mode:<14} {workers:>10} {stats['wall_seconds']:>10.2f} {stats['tokenize_seconds']:>9.2f} "
+                f"{stats['inference_seconds']:>15.2f} {stats['inference_utilization']:>10.1%}"
+            )
+        print(f"{'':<14} idénticos con y sin solapamiento: {np.array_equal(results[0], results[1])}")
+
+
+if __name__ == "__main__":
+    main()
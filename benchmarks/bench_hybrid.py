@@ -0,0 +1,123 @@
+"""
+Compara la búsqueda solo vectorial con la híbrida (vectorial + BM25 fusionadas con RRF).
+
+Genera un corpus sintético donde cada chunk menciona un código de pieza único (p. ej.
+"XK-00421") y su embedding solo refleja el tema del chunk, como ocurre con los modelos de
+embeddings ante referencias exactas. Cada pregunta nombra un código: la búsqueda vectorial
+solo llega al tema, mientras que BM25 encuentra el chunk exacto.
+
+Informa hit@k (la pregunta recupera su chunk) para la búsqueda vectorial con top-5 y
+top-20 y para la híbrida con top-5, el tiempo de construcción y tamaño del índice BM25 y
+la latencia p50/p99 de cada búsqueda.
+
+Uso:
+    python -m benchmarks.bench_hybrid --chunks 20000 --queries 500
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from src.application.hybrid_retrieval import HybridRetriever
+from src.domain.models import DocumentChunk
+from src.infrastructure.bm25_index import BM25Index, LexicalIndexedStore
+from src.infrastructure.numpy_vector_store import NumpyVectorStore
+
+TOPIC_WORDS = [
+    "motor", "bomba", "válvula", "sensor", "rodamiento", "engranaje", "filtro", "junta", "cable", "soporte",
+    "turbina", "compresor", "eje", "tornillo", "correa", "manguera", "panel", "fusible", "relé", "carcasa",
+]
+FILLER = "La pieza se revisa según el manual de mantenimiento y se sustituye si presenta desgaste visible."
+
+
+def part_code(i: int) -> str:
+    return f"XK-{i:05d}"
+
+
+def synthetic_corpus(count: int, dim: int, topics: int, seed: int = 0):
+    """Chunks con un código de pieza en el texto y un embedding que solo depende del tema"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=count)
+    vectors = centers[labels] + rng.normal(scale=0.6, size=(count, dim)).astype(np.float32)
+    chunks = []
+    for i, (label, vector) in enumerate(zip(labels, vectors)):
+        word = TOPIC_WORDS[label % len(TOPIC_WORDS)]
+        text = f"Ficha de {word} {label}. Código de pieza {part_code(i)}, par de apriete {i % 90 + 10} Nm. {FILLER}"
+        chunks.append(
+            DocumentChunk(
+                doc_id=f"doc{i // 100}",
+                text=text,
+                metadata={"source": f"doc{i // 100}.pdf", "page": i % 100 + 1},
+                chunk_id=f"doc{i // 100}:p{i % 100 + 1}:c0",
+                embedding=vector.tolist(),
+            )
+        )
+    return chunks, centers, labels
+
+
+def timed(search, queries):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(search(query))
+        latencies.append(time.perf_counter() - started)
+    return results, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def hit_rate(results, expected):
+    hits = sum(target in {result.chunk.chunk_id for result in found} for found, target in zip(results, expected))
+    return hits / len(expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20)
+    args = parser.parse_args()
+
+    chunks, centers, labels = synthetic_corpus(args.chunks, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    targets = rng.choice(args.chunks, size=min(args.queries, args.chunks), replace=False)
+    # La pregunta se parece al tema del chunk, no al chunk concreto
+    vectors = centers[labels[targets]] + rng.normal(scale=0.6, size=(len(targets), args.dim)).astype(np.float32)
+    questions = [f"¿Qué par de apriete lleva la pieza {part_code(i)}?" for i in targets]
+    expected = [chunks[i].chunk_id for i in targets]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LexicalIndexedStore(NumpyVectorStore(tmp, "bench_hybrid", args.dim), BM25Index(f"{tmp}/bm25"))
+        store.set_collection()
+        store.insert(chunks)
+        bm25 = store.index.stats()
+
+        # Índice reabierto desde disco, como en una sesión de consultas
+        index = BM25Index(f"{tmp}/bm25")
+        hybrid = HybridRetriever(store, index, candidates=args.candidates)
+        pairs = list(zip(questions, vectors.tolist()))
+
+        dense, dense_p50, dense_p99 = timed(lambda pair: store.search(pair[1], args.top_k), pairs)
+        dense_wide, _, _ = timed(lambda pair: store.search(pair[1], args.candidates), pairs)
+        _, bm25_p50, bm25_p99 = timed(lambda question: index.search(question, args.candidates), questions)
+        fused, hybrid_p50, hybrid_p99 = timed(lambda pair: hybrid.search(pair[0], pair[1], args.top_k), pairs)
+        hybrid.close()
+
+    print(f"Corpus: {args.chunks} chunks, {len(targets)} preguntas con código de pieza")
+    print(
+        f"BM25: construcción {bm25['build_seconds']:.2f} s | {bm25['terms']} términos, {bm25['postings']} postings | "
+        f"índice {bm25['index_bytes'] / 1e6:.1f} MB + textos {bm25['docs_bytes'] / 1e6:.1f} MB"
+    )
+    print(f"{'búsqueda':<22} {'hit@k':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    print(f"{f'vectorial top-{args.top_k}':<22} {hit_rate(dense, expected):>7.3f} {dense_p50:>9.2f} {dense_p99:>9.2f}")
+    print(f"{f'vectorial top-{args.candidates}':<22} {hit_rate(dense_wide, expected):>7.3f} {'':>9} {'':>9}")
+    print(f"{f'BM25 top-{args.candidates}':<22} {'':>7} {bm25_p50:>9.2f} {bm25_p99:>9.2f}")
+    print(f"{f'híbrida top-{args.top_k}':<22} {hit_rate(fused, expected):>7.3f} {hybrid_p50:>9.2f} {hybrid_p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
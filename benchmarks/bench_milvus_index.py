@@ -0,0 +1,124 @@
+"""
+Mide recall@k y latencia de los índices de Milvus para elegir la configuración del corpus.
+
+Construye una colección por cada índice (HNSW, IVF_FLAT, IVF_PQ) sobre el mismo corpus
+sintético y, para cada valor del parámetro de búsqueda (`ef` en HNSW, `nprobe` en IVF),
+compara los top-k devueltos con la búsqueda exacta calculada con NumPy. Informa también el
+tiempo de construcción (inserción + índice) y la latencia p50/p99 por consulta.
+
+Pensado para un servidor Milvus. Milvus Lite no admite todos los índices (p. ej. IVF_PQ);
+los que falten se informan como no soportados.
+
+Uso:
+    python -m benchmarks.bench_milvus_index --chunks 50000 --queries 300 --top-k 10
+    python -m benchmarks.bench_milvus_index --indexes HNSW --ef 16 32 64 128 256
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.bench_vector_store import make_queries, synthetic_corpus
+from src.infrastructure.vector_store_manager import MilvusManager
+
+COLLECTION = "bench_milvus_index"
+
+
+def exact_top_k(chunks, queries: np.ndarray, top_k: int):
+    """chunk_ids de los top-k exactos por similitud coseno"""
+    matrix = np.asarray([chunk.embedding for chunk in chunks], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = normalized @ matrix.T
+    top = np.argsort(-scores, axis=1)[:, :top_k]
+    return [{chunks[i].chunk_id for i in row} for row in top]
+
+
+def wait_for_index(store: MilvusManager, timeout: float = 600):
+    """Espera a que el índice vectorial cubra todas las filas y recarga la colección"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = store.client.describe_index(store.collection_name, index_name="vector")
+        if not info or info.get("pending_index_rows", 0) == 0 and info.get("state", "Finished") == "Finished":
+            break
+        time.sleep(0.5)
+    store.client.release_collection(store.collection_name)
+    store.client.load_collection(store.collection_name)
+
+
+def run_queries(store: MilvusManager, queries: np.ndarray, truth, top_k: int):
+    latencies, recalls = [], []
+    store.search(queries[0].tolist(), top_k)  # Calentamiento
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        results = store.search(query.tolist(), top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(expected & {result.chunk.chunk_id for result in results}) / len(expected))
+    latencies.sort()
+    return statistics.mean(recalls), statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--uri", default="http://127.0.0.1:19530")
+    parser.add_argument("--indexes", nargs="+", default=["HNSW", "IVF_FLAT", "IVF_PQ"])
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nlist", type=int, default=0, help="0 usa 4*sqrt(chunks)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--pq-m", type=int, default=16, help="Subvectores de IVF_PQ (debe dividir --dim)")
+    args = parser.parse_args()
+
+    chunks, centers = synthetic_corpus(args.chunks, args.dim)
+    queries = make_queries(centers, args.queries)
+    truth = exact_top_k(chunks, queries, args.top_k)
+    nlist = args.nlist or int(4 * np.sqrt(args.chunks))
+
+    settings = {
+        "HNSW": ({"M": args.hnsw_m, "efConstruction": args.ef_construction}, "ef", args.ef),
+        "IVF_FLAT": ({"nlist": nlist}, "nprobe", args.nprobe),
+        "IVF_PQ": ({"nlist": nlist, "m": args.pq_m, "nbits": 8}, "nprobe", args.nprobe),
+        "FLAT": ({}, None, [None]),
+    }
+
+    rows = []
+    for index_type in args.indexes:
+        index_params, search_key, values = settings[index_type.upper()]
+        store = MilvusManager(args.uri, COLLECTION, args.dim, index_type=index_type, index_params=index_params)
+        store.set_collection()
+        started = time.perf_counter()
+        try:
+            store.insert(chunks, compact=False)
+            store.client.flush(collection_name=COLLECTION)
+            wait_for_index(store)
+        except Exception as e:
+            print(f"Índice {index_type} no soportado por este Milvus: {e}")
+            store.client.drop_collection(COLLECTION)
+            continue
+        build_seconds = time.perf_counter() - started
+
+        for value in values:
+            store.search_params = {search_key: value} if search_key else {}
+            recall, p50, p99 = run_queries(store, queries, truth, args.top_k)
+            label = f"{search_key}={value}" if search_key else "-"
+            rows.append((index_type, index_params, label, build_seconds, recall, p50, p99))
+        store.client.drop_collection(COLLECTION)
+
+    print(f"\nCorpus: {args.chunks} chunks de dimensión {args.dim}, {args.queries} consultas, top-{args.top_k}")
+    print(f"{'índice':<9} {'construcción':<34} {'búsqueda':<11} {'build (s)':>9} {'recall':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for index_type, index_params, label, build_seconds, recall, p50, p99 in rows:
+        print(
+            f"{index_type:<9} {str(index_params):<34} {label:<11} {build_seconds:>9.1f} "
+            f"{recall:>7.3f} {p50:>9.2f} {p99:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Mide el ritmo de inserción en Milvus (filas/s) según el tamaño de lote y los lotes en paralelo.
+
+Para cada combinación de `--batch-sizes` y `--concurrency` recrea la colección, inserta el
+corpus sintético con `MilvusManager.insert` y mide por separado la inserción y el cierre
+(flush, o flush + compact con `--compact`). Con `--bad-rows` se intercalan chunks con una
+dimensión incorrecta para medir el coste de aislar los fallos por bisección.
+
+Sin `--uri` usa Milvus Lite en un directorio temporal.
+
+Uso:
+    python -m benchmarks.bench_milvus_insert --chunks 20000 --batch-sizes 100 500 --concurrency 1 4
+    python -m benchmarks.bench_milvus_insert --uri http://127.0.0.1:19530 --compact
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_vector_store import synthetic_corpus
+from src.domain.models import DocumentChunk
+from src.infrastructure.vector_store_manager import MilvusManager
+
+COLLECTION = "bench_milvus_insert"
+
+
+def with_bad_rows(chunks, bad_rows: int, dim: int):
+    """Intercala chunks con un embedding de dimensión incorrecta repartidos por el corpus"""
+    if not bad_rows:
+        return chunks
+    step = max(1, len(chunks) // bad_rows)
+    mixed = list(chunks)
+    for n, position in enumerate(range(step // 2, len(chunks), step)):
+        if n == bad_rows:
+            break
+        mixed.insert(position + n, DocumentChunk(doc_id="bad", text="x", metadata={}, chunk_id=f"bad:{n}", embedding=[0.0] * (dim + 1)))
+    return mixed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--bad-rows", type=int, default=0, help="Chunks inválidos intercalados")
+    parser.add_argument("--compact", action="store_true", help="Compacta además de hacer flush al terminar")
+    parser.add_argument("--uri", default="")
+    args = parser.parse_args()
+
+    chunks, _ = synthetic_corpus(args.chunks, args.dim)
+    chunks = with_bad_rows(chunks, args.bad_rows, args.dim)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = args.uri or os.path.join(tmp, "milvus.db")
+        for batch_size in args.batch_sizes:
+            for concurrency in args.concurrency:
+                store = MilvusManager(
+                    uri, COLLECTION, args.dim, insert_concurrency=concurrency, compact_after_insert=args.compact
+                )
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    store.set_collection()
+                    started = time.perf_counter()
+                    store.insert(chunks, batch_size=batch_size, compact=False)
+                    insert_seconds = time.perf_counter() - started
+                    started = time.perf_counter()
+                    store.compact()
+                    close_seconds = time.perf_counter() - started
+                rows = store.get_stats()["row_count"]
+                results.append((batch_size, concurrency, rows, insert_seconds, close_seconds))
+                store.client.drop_collection(COLLECTION)
+
+    closing = "flush+compact" if args.compact else "flush"
+    print(f"{len(chunks)} chunks de dimensión {args.dim} ({args.bad_rows} inválidos), {args.uri or 'Milvus Lite'}")
+    print(f"{'lote':>6} {'paralelo':>9} {'filas':>7} {'inserción (s)':>14} {'filas/s':>9} {closing + ' (s)':>18}")
+    for batch_size, concurrency, rows, insert_seconds, close_seconds in results:
+        print(
+            f"{batch_size:>6} {concurrency:>9} {rows:>7} {insert_seconds:>14.2f} "
+            f"{rows / insert_seconds:>9.0f} {close_seconds:>18.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
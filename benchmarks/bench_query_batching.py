@@ -0,0 +1,97 @@
+"""
+Mide el agrupador de embeddings de preguntas (MicroBatchingEmbedder) bajo carga concurrente.
+
+N hilos lanzan preguntas de un solo texto, primero directamente contra el embedder (una
+llamada al modelo por pregunta) y después a través del agrupador. Informa preguntas/s,
+latencia p50/p99 y el histograma de tamaños de lote.
+
+Por defecto usa un modelo simulado con el perfil de una sesión ONNX en GPU: un coste fijo
+por llamada más un coste pequeño por texto, con las llamadas serializadas. Con `--onnx`
+usa el GPUEmbeddingGenerator real.
+
+Uso:
+    python -m benchmarks.bench_query_batching --threads 32 --questions 2000
+    python -m benchmarks.bench_query_batching --onnx --max-wait-ms 1
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.infrastructure.embedding_batcher import MicroBatchingEmbedder
+
+
+class SimulatedSessionEmbedder:
+    """Modelo simulado: `call_ms` por llamada + `item_ms` por texto, una llamada a la vez"""
+
+    def __init__(self, call_ms: float, item_ms: float, dim: int = 384):
+        self.call_cost = call_ms / 1000
+        self.item_cost = item_ms / 1000
+        self.dim = dim
+        self._session = threading.Lock()
+
+    def generate_embeddings(self, texts):
+        with self._session:
+            time.sleep(self.call_cost + self.item_cost * len(texts))
+        return np.ones((len(texts), self.dim), dtype=np.float32)
+
+    def get_embedding(self, text):
+        return self.generate_embeddings([text])[0].tolist()
+
+
+def run(embed, questions, threads):
+    latencies = []
+
+    def one(question):
+        started = time.perf_counter()
+        embed(question)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one, questions))
+    seconds = time.perf_counter() - started
+    return len(questions) / seconds, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--call-ms", type=float, default=4.0, help="Coste fijo por llamada del modelo simulado")
+    parser.add_argument("--item-ms", type=float, default=0.1, help="Coste por texto del modelo simulado")
+    parser.add_argument("--onnx", action="store_true", help="Usa el modelo ONNX real")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    if args.onnx:
+        from src.infrastructure.embedding_gpu import GPUEmbeddingGenerator
+
+        embedder = GPUEmbeddingGenerator(args.model)
+    else:
+        embedder = SimulatedSessionEmbedder(args.call_ms, args.item_ms)
+
+    questions = [f"¿Qué dice el documento sobre el tema número {i}?" for i in range(args.questions)]
+    embedder.get_embedding(questions[0])  # Calentamiento
+
+    direct = run(embedder.get_embedding, questions, args.threads)
+    batcher = MicroBatchingEmbedder(embedder, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    batched = run(batcher.get_embedding, questions, args.threads)
+    stats = batcher.batching_stats()
+    batcher.close()
+
+    print(f"{'modo':<12} {'preguntas/s':>12} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for name, (throughput, p50, p99) in (("directo", direct), ("agrupado", batched)):
+        print(f"{name:<12} {throughput:>12.1f} {p50:>9.2f} {p99:>9.2f}")
+    print(f"Ganancia: {batched[0] / direct[0]:.2f}x | tamaño medio de lote: {stats['mean_batch_size']}")
+    print(f"Histograma de tamaños de lote: {stats['batch_size_histogram']}")
+    print(f"Latencia interna del agrupador: p50 {stats['latency_p50_ms']} ms, p99 {stats['latency_p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
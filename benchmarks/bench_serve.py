@@ -0,0 +1,156 @@
+"""
+Prueba de carga del modo servidor (`main.py --serve`) contra dependencias falsas.
+
+Levanta el servidor HTTP con un AsyncOrchestrator que embebe y genera contra un Ollama
+falso y busca en un Milvus simulado (latencia fija), y lanza `--requests` preguntas con
+N clientes simultáneos para cada nivel de `--levels` (el límite de concurrencia del
+servidor se iguala al nivel). Informa preguntas/s, latencia p50/p95 y la ganancia de
+rendimiento respecto al primer nivel, que equivale al antiguo bucle de una pregunta a la vez.
+
+Uso:
+    python -m benchmarks.bench_serve --requests 64 --levels 1 4 16 32
+    python -m benchmarks.bench_serve --stream  # mide también el tiempo hasta el primer token
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from src.application.async_orchestrator import AsyncOrchestrator
+from src.application.interfaces import AsyncRetriever
+from src.domain.models import DocumentChunk, SearchResult
+from src.infrastructure.embedding_manager import AsyncOllamaEmbeddingManager
+from src.infrastructure.http_server import RAGHttpServer
+
+
+class FakeAsyncRetriever(AsyncRetriever):
+    """Milvus simulado: latencia fija por búsqueda y siempre los mismos chunks"""
+
+    def __init__(self, latency: float, top_k: int = 5):
+        self.latency = latency
+        self.results = [
+            SearchResult(
+                chunk=DocumentChunk(
+                    doc_id="doc",
+                    text=f"Texto de contexto del chunk {i}. " * 20,
+                    metadata={"source": "doc.pdf", "page": i + 1},
+                    chunk_id=f"doc:p{i + 1}:c0",
+                ),
+                similarity=1.0 - i * 0.01,
+            )
+            for i in range(top_k)
+        ]
+
+    async def search(self, vector, top_k):
+        await asyncio.sleep(self.latency)
+        return self.results[:top_k]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def ask(client: httpx.AsyncClient, url: str, question: str, stream: bool):
+    """Devuelve (latencia total, tiempo hasta el primer token)"""
+    started = time.perf_counter()
+    if not stream:
+        response = await client.post(f"{url}/ask", json={"question": question})
+        response.raise_for_status()
+        elapsed = time.perf_counter() - started
+        return elapsed, elapsed
+
+    first_token = None
+    async with client.stream("POST", f"{url}/ask/stream", json={"question": question}) as response:
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            payload = json.loads(line)
+            if "token" in payload and first_token is None:
+                first_token = time.perf_counter() - started
+            if payload.get("error"):
+                raise RuntimeError(payload["error"])
+    elapsed = time.perf_counter() - started
+    return elapsed, first_token or elapsed
+
+
+async def run_level(args, ollama_url: str, level: int):
+    orchestrator = AsyncOrchestrator(
+        embedder=AsyncOllamaEmbeddingManager("fake-embed", host=ollama_url, max_connections=level),
+        retriever=FakeAsyncRetriever(args.search_latency),
+        llm_model="fake-llm",
+        search_top_k=5,
+        llm_host=ollama_url,
+        max_concurrency=level,
+    )
+    server = await RAGHttpServer(orchestrator, port=0).start()
+    url = f"http://127.0.0.1:{server.port}"
+
+    questions = iter(f"Pregunta de prueba número {i}" for i in range(args.requests))
+    timings = []
+
+    async def user(client):
+        for question in questions:
+            timings.append(await ask(client, url, question, args.stream))
+
+    limits = httpx.Limits(max_connections=level)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(level)))
+        seconds = time.perf_counter() - started
+    await server.close()
+
+    latencies = [total for total, _ in timings]
+    first_tokens = [first for _, first in timings]
+    return {
+        "throughput": len(timings) / seconds,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "ttft_p50": statistics.median(first_tokens),
+    }
+
+
+async def run(args):
+    with FakeOllamaServer(
+        dim=384,
+        parallel=args.ollama_parallel,
+        prefill_latency=args.prefill_latency,
+        token_latency=args.token_latency,
+        answer_tokens=args.answer_tokens,
+    ) as fake:
+        results = {}
+        for level in args.levels:
+            results[level] = await run_level(args, fake.url, level)
+
+    baseline = results[args.levels[0]]["throughput"]
+    header = f"{'concurrencia':>12} {'preguntas/s':>12} {'ganancia':>9} {'p50 (s)':>8} {'p95 (s)':>8}"
+    print(header + (f" {'TTFT p50':>9}" if args.stream else ""))
+    for level, stats in results.items():
+        line = (
+            f"{level:>12} {stats['throughput']:>12.2f} {stats['throughput'] / baseline:>8.2f}x "
+            f"{stats['p50']:>8.2f} {stats['p95']:>8.2f}"
+        )
+        print(line + (f" {stats['ttft_p50']:>9.2f}" if args.stream else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--stream", action="store_true", help="Usa /ask/stream en lugar de /ask")
+    parser.add_argument("--ollama-parallel", type=int, default=32, help="Peticiones que el Ollama falso atiende a la vez")
+    parser.add_argument("--search-latency", type=float, default=0.01)
+    parser.add_argument("--prefill-latency", type=float, default=0.1)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--answer-tokens", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Mide el arranque en frío del chat: desde lanzar `main.py` hasta que el prompt queda listo.
+
+Cada medición es un proceso nuevo que ejecuta `main.py` en modo chat con el almacén numpy y
+responde "salir" a la primera pregunta. Escenarios:
+
+- ollama_first: embedder de Ollama (falso) sin metadatos guardados de la dimensión.
+- ollama: arranques siguientes, con los metadatos ya guardados.
+- onnx_first / onnx: lo mismo con el embedder ONNX (`--onnx-model`); el primero exporta el
+  modelo, guarda el tokenizador y el grafo optimizado de ONNX Runtime.
+
+Además, una ejecución con `-X importtime` indica qué módulos pesados (PyMuPDF, pymilvus,
+torch, transformers) llegó a importar cada escenario.
+
+`--root` permite lanzar el `main.py` de otro checkout (p. ej. un `git worktree` de un
+commit anterior) para comparar antes y después con el mismo procedimiento.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --onnx-model ./ruta/al/modelo_hf --root ../checkout_anterior
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+HEAVY_MODULES = ("fitz", "pymilvus", "torch", "transformers", "tokenizers", "onnxruntime", "ollama")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def launch(root: str, workdir: str, env: dict, importtime: bool = False) -> tuple:
+    """Ejecuta el chat hasta el primer prompt y sale; devuelve (segundos, stderr)"""
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), os.path.join(root, "main.py")]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=workdir, env=env, input="salir\n", capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"main.py terminó con código {result.returncode}:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def heavy_imports(stderr: str) -> list:
+    """Módulos pesados de primer nivel que aparecen en la salida de `-X importtime`"""
+    loaded = set()
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name in HEAVY_MODULES:
+                loaded.add(name)
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+
+def run_scenario(name: str, root: str, workdir: str, env: dict, runs: int, reset) -> dict:
+    """Mide `runs` arranques; `reset` deja el directorio en el estado del escenario antes de cada uno"""
+    times = []
+    for _ in range(runs):
+        reset()
+        elapsed, _ = launch(root, workdir, env)
+        times.append(elapsed)
+    reset()
+    _, stderr = launch(root, workdir, env, importtime=True)
+    return {"scenario": name, "median": statistics.median(times), "min": min(times), "imports": heavy_imports(stderr)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--root", default=REPO_ROOT, help="Checkout cuyo main.py se mide")
+    parser.add_argument("--onnx-model", default="", help="Modelo HF (id o carpeta local) para los escenarios ONNX")
+    parser.add_argument("--request-latency", type=float, default=0.05, help="Coste por petición al Ollama falso")
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    results = []
+    with FakeOllamaServer(dim=384, request_latency=args.request_latency) as server, tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PYTHONWARNINGS": "ignore",
+            "VECTOR_STORE_BACKEND": "numpy",
+            "OLLAMA_HOST": server.url,
+            "EMBEDDING_MODEL": "fake-embed",
+            "METRICS_TEXTFILE": "",
+        }
+        metadata_path = os.path.join(tmp, "cache", "model_metadata.json")
+
+        def forget_metadata():
+            if os.path.exists(metadata_path):
+                os.remove(metadata_path)
+
+        ollama_env = {**env, "USE_GPU": "false"}
+        results.append(run_scenario("ollama_first", root, tmp, ollama_env, args.runs, forget_metadata))
+        results.append(run_scenario("ollama", root, tmp, ollama_env, args.runs, lambda: None))
+
+        if args.onnx_model:
+            onnx_env = {**env, "USE_GPU": "true", "EMBEDDING_ONNX_MODEL": args.onnx_model}
+            models_dir = os.path.join(tmp, "models")
+
+            def forget_models():
+                shutil.rmtree(models_dir, ignore_errors=True)
+                forget_metadata()
+
+            results.append(run_scenario("onnx_first", root, tmp, onnx_env, max(1, args.runs // 2), forget_models))
+            results.append(run_scenario("onnx", root, tmp, onnx_env, args.runs, lambda: None))
+
+    print(f"Arranque del chat ({root}), mediana de {args.runs} procesos")
+    print(f"{'escenario':<14} {'mediana (s)':>12} {'mín (s)':>9}  módulos pesados importados")
+    for result in results:
+        imports = ", ".join(result["imports"]) or "-"
+        print(f"{result['scenario']:<14} {result['median']:>12.2f} {result['min']:>9.2f}  {imports}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Suite de benchmarks por etapas de la ingesta y de las consultas, sin servicios externos.
+
+Para cada tamaño de corpus genera PDFs sintéticos y mide por separado:
+
+- `PdfDocumentLoader.load` (páginas/s), sin caché y con la caché de texto en frío y en caliente
+- `SmartChunker.chunk` (chunks/s)
+- embeddings: OllamaEmbeddingManager contra un Ollama falso, CachedEmbedder en frío y en
+  caliente y, con `--onnx`, GPUEmbeddingGenerator (chunks/s)
+- `insert` (filas/s) y `search` (p50/p99) del almacén numpy y de Milvus Lite (si está instalado)
+- de extremo a extremo: `Orchestrator.ingest_documents` y la latencia de `ask_question`
+
+Cada etapa registra además el pico de memoria residente del proceso (RSS). El resultado se
+guarda en JSON para comparar ejecuciones; con `--baseline` se compara con una anterior.
+
+Uso:
+    python -m benchmarks.bench_suite --sizes 5 20 80
+    python -m benchmarks.bench_suite --sizes 20 --baseline cache/benchmarks/suite_20260101-120000.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from src.application.context_packer import ContextPacker
+from src.application.orchestrator import Orchestrator
+from src.infrastructure.document_loader import PdfDocumentLoader
+from src.infrastructure.embedding_cache import CachedEmbedder, EmbeddingCache
+from src.infrastructure.page_text_cache import PageTextCache
+from src.infrastructure.embedding_manager import OllamaEmbeddingManager
+from src.infrastructure.numpy_vector_store import NumpyVectorStore
+from src.infrastructure.text_processor import BasicTextProcessor, SmartChunker
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+WORDS = (
+    "el sistema de gestión documental registra cada revisión del contrato según la norma vigente "
+    "durante el periodo fiscal la empresa aplicó el procedimiento de auditoría interna sobre los "
+    "proveedores críticos con un presupuesto anual y un plazo de entrega acordado por el comité"
+).split()
+
+# Métrica principal de cada etapa, usada al comparar con una ejecución anterior
+HEADLINE = {"rate": "mayor es mejor", "p50_ms": "menor es mejor", "seconds": "menor es mejor"}
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso y de sus hijos (MB); 0 si la plataforma no lo expone"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux informa en KB y macOS en bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def write_synthetic_pdfs(folder: str, docs: int, pages_per_doc: int, seed: int = 0):
+    """PDFs con páginas de texto pseudoaleatorio (~2500 caracteres por página)"""
+    import fitz
+
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    for d in range(docs):
+        pdf = fitz.open()
+        for p in range(pages_per_doc):
+            sentences = []
+            for s in range(30):
+                words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+                sentences.append(f"{' '.join(words).capitalize()} (ref. {d}-{p}-{s}).")
+            page = pdf.new_page()
+            page.insert_textbox(fitz.Rect(40, 40, 555, 800), " ".join(sentences), fontsize=8)
+        pdf.save(os.path.join(folder, f"doc_{d:04d}.pdf"))
+        pdf.close()
+
+
+def percentiles(latencies) -> dict:
+    values = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+class StageRecorder:
+    """Ejecuta etapas, mide su duración y guarda sus métricas con el pico de RSS"""
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def quiet(self):
+        if self.verbose:
+            yield
+            return
+        # También stderr: las barras de progreso de tqdm ensucian el informe
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            yield
+
+    def run(self, name: str, func, items_of=None):
+        """Ejecuta `func()`; `items_of(resultado)` da el número de elementos para calcular el ritmo"""
+        with self.quiet():
+            started = time.perf_counter()
+            result = func()
+            seconds = time.perf_counter() - started
+        record = {"seconds": round(seconds, 4)}
+        if items_of is not None:
+            items = items_of(result)
+            record.update(items=items, rate=round(items / seconds, 2) if seconds else 0.0)
+        record["peak_rss_mb"] = peak_rss_mb()
+        self.stages[name] = record
+        print(f"  {name:<24} {json.dumps(record)}")
+        return result
+
+    def add(self, name: str, record: dict):
+        record["peak_rss_mb"] = peak_rss_mb()
+        self.stages[name] = record
+        print(f"  {name:<24} {json.dumps(record)}")
+
+
+def bench_search(recorder: StageRecorder, name: str, store, queries):
+    with recorder.quiet():
+        store.search(queries[0], 10)  # Calentamiento
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            store.search(query, 10)
+            latencies.append(time.perf_counter() - started)
+    recorder.add(name, {"queries": len(queries), **percentiles(latencies)})
+
+
+def run_size(args, docs: int, server: FakeOllamaServer, workdir: str) -> dict:
+    docs_folder = os.path.join(workdir, "docs")
+    write_synthetic_pdfs(docs_folder, docs, args.pages_per_doc)
+    recorder = StageRecorder(args.verbose)
+    print(f"\nCorpus: {docs} PDFs x {args.pages_per_doc} páginas")
+
+    # --- Etapas de la ingesta ---
+    loader = PdfDocumentLoader(docs_folder, num_workers=args.pdf_workers)
+    pages = recorder.run("pdf_load", loader.load, len)
+    page_cache = PageTextCache(os.path.join(workdir, "pages"), BasicTextProcessor())
+    cached_loader = PdfDocumentLoader(docs_folder, num_workers=args.pdf_workers, page_cache=page_cache)
+    recorder.run("pdf_load_cached_cold", cached_loader.load, len)
+    recorder.run("pdf_load_cached_warm", cached_loader.load, len)
+    chunker = SmartChunker(BasicTextProcessor(), chunk_size=args.chunk_size, overlap=args.chunk_overlap)
+    chunks = recorder.run("chunk", lambda: chunker.chunk(pages), len)
+    texts = [chunk.text for chunk in chunks]
+
+    ollama_embedder = OllamaEmbeddingManager("fake-embed", host=server.url, max_concurrency=args.embed_concurrency)
+    embeddings = recorder.run(
+        "embed_ollama", lambda: ollama_embedder.get_embeddings_batch(texts, batch_size=args.embed_batch_size), len
+    )
+    cache = EmbeddingCache(os.path.join(workdir, "embeddings"), "fake-embed")
+    cached = CachedEmbedder(ollama_embedder, cache)
+    recorder.run("embed_cached_cold", lambda: cached.get_embeddings_batch(texts, batch_size=args.embed_batch_size), len)
+    recorder.run("embed_cached_warm", lambda: cached.get_embeddings_batch(texts, batch_size=args.embed_batch_size), len)
+    if args.onnx:
+        from src.infrastructure.embedding_gpu import GPUEmbeddingGenerator
+
+        onnx_embedder = recorder.run("onnx_load", lambda: GPUEmbeddingGenerator(args.onnx_model))
+        recorder.run("embed_onnx", lambda: onnx_embedder.get_embeddings_batch(texts), len)
+
+    for chunk, embedding in zip(chunks, embeddings):
+        chunk.embedding = embedding
+    queries = [embeddings[i] for i in random.Random(1).sample(range(len(embeddings)), min(args.queries, len(embeddings)))]
+
+    numpy_store = NumpyVectorStore(os.path.join(workdir, "store"), "bench_suite", server.dim)
+    with recorder.quiet():
+        numpy_store.set_collection()
+    recorder.run("numpy_insert", lambda: numpy_store.insert(chunks) or len(chunks), lambda count: count)
+    bench_search(recorder, "numpy_search", numpy_store, queries)
+
+    if not args.no_milvus:
+        try:
+            from src.infrastructure.vector_store_manager import MilvusManager
+
+            with recorder.quiet():
+                milvus = MilvusManager(os.path.join(workdir, "milvus.db"), "bench_suite", server.dim)
+                milvus.set_collection()
+        except Exception as e:
+            print(f"  Milvus Lite no disponible, se omite: {e}")
+        else:
+            recorder.run("milvus_insert", lambda: milvus.insert(chunks) or len(chunks), lambda count: count)
+            bench_search(recorder, "milvus_search", milvus, queries)
+            milvus.client.close()
+
+    # --- De extremo a extremo (almacén numpy, Ollama falso) ---
+    orchestrator = Orchestrator(
+        loader=loader,
+        text_processor=BasicTextProcessor(),
+        chunker=chunker,
+        embedder=ollama_embedder,
+        vector_store=NumpyVectorStore(os.path.join(workdir, "e2e"), "bench_suite", server.dim),
+        llm_model="fake-llm",
+        search_top_k=args.top_k,
+        llm_host=server.url,
+        context_packer=ContextPacker(args.context_budget) if args.context_budget > 0 else None,
+    )
+    recorder.run("ingest_end_to_end", lambda: orchestrator.ingest_documents() or len(pages), lambda count: count)
+
+    questions = [f"¿Qué dice la referencia {d}-{d % args.pages_per_doc}-3 sobre el contrato?" for d in range(args.questions)]
+    with recorder.quiet():
+        orchestrator.ask_question(questions[0])  # Calentamiento
+        latencies = []
+        for question in questions:
+            started = time.perf_counter()
+            orchestrator.ask_question(question)
+            latencies.append(time.perf_counter() - started)
+    recorder.add("ask_question", {"questions": len(questions), **percentiles(latencies)})
+
+    return {"docs": docs, "pages": len(pages), "chunks": len(chunks), "stages": recorder.stages}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(report: dict, baseline: dict):
+    """Imprime la métrica principal de cada etapa frente a la ejecución de referencia"""
+    previous = {run["docs"]: run["stages"] for run in baseline.get("runs", [])}
+    print(f"\nComparación con {baseline.get('environment', {}).get('git_commit')} ({baseline.get('environment', {}).get('timestamp')}):")
+    for run in report["runs"]:
+        old_stages = previous.get(run["docs"])
+        if old_stages is None:
+            continue
+        print(f"  Corpus de {run['docs']} PDFs")
+        for name, record in run["stages"].items():
+            old = old_stages.get(name)
+            metric = next((key for key in HEADLINE if key in record), None)
+            if not old or metric not in old or not old[metric]:
+                continue
+            ratio = record[metric] / old[metric]
+            print(f"    {name:<24} {metric:<8} {old[metric]:>10} -> {record[metric]:>10} ({ratio:.2f}x, {HEADLINE[metric]})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20], help="Número de PDFs de cada corpus")
+    parser.add_argument("--pages-per-doc", type=int, default=20)
+    parser.add_argument("--pdf-workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=800)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--embed-batch-size", type=int, default=15)
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200, help="Consultas al almacén vectorial")
+    parser.add_argument("--questions", type=int, default=20, help="Preguntas de extremo a extremo")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--context-budget", type=int, default=1536)
+    parser.add_argument("--no-milvus", action="store_true", help="No medir Milvus Lite")
+    parser.add_argument("--onnx", action="store_true", help="Mide también el embedder ONNX (requiere el modelo)")
+    parser.add_argument("--onnx-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--request-latency", type=float, default=0.005, help="Coste fijo por petición al Ollama falso")
+    parser.add_argument("--item-latency", type=float, default=0.0005, help="Coste por texto embebido en el Ollama falso")
+    parser.add_argument("--prefill-latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.002)
+    parser.add_argument("--out", default=None, help="Archivo JSON de salida (por defecto en cache/benchmarks/)")
+    parser.add_argument("--baseline", default=None, help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--verbose", action="store_true", help="Muestra la salida de cada etapa")
+    args = parser.parse_args()
+
+    report = {"environment": environment(), "arguments": vars(args), "runs": []}
+    with FakeOllamaServer(
+        request_latency=args.request_latency,
+        item_latency=args.item_latency,
+        parallel=args.embed_concurrency,
+        prefill_latency=args.prefill_latency,
+        token_latency=args.token_latency,
+    ) as server:
+        for docs in args.sizes:
+            with tempfile.TemporaryDirectory() as workdir:
+                report["runs"].append(run_size(args, docs, server, workdir))
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    out = args.out or os.path.join("cache", "benchmarks", f"suite_{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {out} (pico de RSS: {report['peak_rss_mb']} MB)")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Compara los formatos de almacenamiento de vectores (VECTOR_STORAGE): memoria frente a recall@k.
+
+Para cada formato (float32, float16, bfloat16, binary) informa de los bytes por vector y la
+memoria total que ocupan los vectores en Milvus, el tamaño en disco de los vectores float32 de
+reordenación y el recall@k frente a la búsqueda exacta en float32, sin reordenar y reordenando
+`oversample * k` candidatos con `FullPrecisionVectors` (el mismo código que usa MilvusManager).
+
+Sin `--uri` la búsqueda de Milvus sobre los vectores comprimidos se emula de forma exacta con
+numpy (equivale a un índice FLAT/BIN_FLAT; Milvus Lite no admite vectores float16, bfloat16 ni
+binarios). Con `--uri` de un servidor Milvus se insertan y consultan colecciones reales con
+MilvusManager para cada formato.
+
+Uso:
+    python -m benchmarks.bench_vector_storage --chunks 50000 --dim 1024
+    python -m benchmarks.bench_vector_storage --uri http://127.0.0.1:19530 --index-type FLAT
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_vector_store import make_queries, synthetic_corpus
+from src.infrastructure.rescore_store import FullPrecisionVectors
+from src.infrastructure.vector_store_manager import VECTOR_STORAGE_TYPES, prepare_vectors
+
+COLLECTION = "bench_vector_storage"
+
+
+def bytes_per_vector(storage: str, dim: int) -> int:
+    return {"float32": 4 * dim, "float16": 2 * dim, "bfloat16": 2 * dim, "binary": dim // 8}[storage]
+
+
+def compressed_scores(vectors: np.ndarray, queries: np.ndarray, storage: str) -> np.ndarray:
+    """Puntuaciones (mayor es mejor) de una búsqueda exacta sobre los vectores comprimidos"""
+    if storage == "binary":
+        # Distancia HAMMING entre signos: d - coincidencias; con signos ±1, coincidencias = (d + s·t) / 2
+        signs = np.where(vectors > 0, 1, -1).astype(np.float32)
+        query_signs = np.where(queries > 0, 1, -1).astype(np.float32)
+        return query_signs @ signs.T
+    if storage == "float16":
+        return queries.astype(np.float16).astype(np.float32) @ vectors.astype(np.float16).astype(np.float32).T
+    if storage == "bfloat16":
+        import ml_dtypes
+
+        return queries.astype(ml_dtypes.bfloat16).astype(np.float32) @ vectors.astype(ml_dtypes.bfloat16).astype(np.float32).T
+    return queries @ vectors.T
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    part = np.argpartition(-scores, min(k, scores.shape[1] - 1), axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def recall(found, truth) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def emulate(vectors, queries, truth, storage: str, top_k: int, oversample: int, rescore_dir: str) -> dict:
+    """Recall sin y con reordenación emulando en numpy la búsqueda de Milvus sobre el formato"""
+    scores = compressed_scores(vectors, queries, storage)
+    plain = top_k_rows(scores, top_k)
+    candidates = top_k_rows(scores, top_k * oversample)
+
+    store = FullPrecisionVectors(rescore_dir, vectors.shape[1])
+    store.reset()
+    store.add(np.arange(len(vectors)), vectors)
+    store.flush()
+    rescored, started = [], time.perf_counter()
+    for query, ids in zip(queries, candidates):
+        found_vectors, _ = store.get(ids)
+        rescored.append(ids[np.argsort(-(found_vectors @ query), kind="stable")[:top_k]])
+    rescore_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    return {
+        "recall": recall(plain, truth),
+        "recall_rescored": recall(rescored, truth),
+        "rescore_ms": rescore_ms,
+        "rescore_bytes": store.nbytes(),
+    }
+
+
+def run_milvus(args, chunks, queries, truth, storage: str, rescore_dir: str) -> dict:
+    """Inserta y consulta una colección real con el formato; devuelve recall y latencia"""
+    from src.infrastructure.vector_store_manager import MilvusManager
+
+    store = MilvusManager(
+        args.uri,
+        f"{COLLECTION}_{storage}",
+        args.dim,
+        index_type=args.index_type,
+        vector_storage=storage,
+        oversample=args.oversample,
+        rescore_dir=rescore_dir,
+    )
+    store.set_collection()
+    store.insert(chunks, upsert=False, compact=False)
+    store.client.load_collection(store.collection_name)
+    index = {chunk.chunk_id: i for i, chunk in enumerate(chunks)}
+    found, started = [], time.perf_counter()
+    for query in queries:
+        results = store.search(query.tolist(), args.top_k)
+        found.append([index[result.chunk.chunk_id] for result in results])
+    latency_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    store.client.drop_collection(store.collection_name)
+    return {"recall_rescored": recall(found, truth), "latency_ms": latency_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, default=4)
+    parser.add_argument("--uri", default="", help="Servidor Milvus (http/https) para medir colecciones reales")
+    parser.add_argument("--index-type", default="FLAT")
+    args = parser.parse_args()
+
+    chunks, centers = synthetic_corpus(args.chunks, args.dim)
+    vectors = prepare_vectors([chunk.embedding for chunk in chunks], "COSINE")
+    queries = prepare_vectors(make_queries(centers, args.queries), "COSINE")
+    truth = top_k_rows(queries @ vectors.T, args.top_k)
+
+    print(f"{args.chunks} vectores de dimensión {args.dim}, {args.queries} consultas, k={args.top_k}, oversample={args.oversample}")
+    print(
+        f"{'formato':<9} {'B/vector':>9} {'Milvus (MB)':>12} {'reorden. (MB)':>14} "
+        f"{'recall@k':>9} {'reordenado':>11} {'reorden. ms':>12}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage in VECTOR_STORAGE_TYPES:
+            rescore_dir = os.path.join(tmp, storage)
+            size = bytes_per_vector(storage, args.dim)
+            if storage == "float32":
+                result = {"recall": recall(top_k_rows(compressed_scores(vectors, queries, storage), args.top_k), truth)}
+                result.update(recall_rescored=result["recall"], rescore_ms=0.0, rescore_bytes=0)
+            else:
+                result = emulate(vectors, queries, truth, storage, args.top_k, args.oversample, rescore_dir)
+            print(
+                f"{storage:<9} {size:>9} {size * args.chunks / 2**20:>12.1f} {result['rescore_bytes'] / 2**20:>14.1f} "
+                f"{result['recall']:>9.3f} {result['recall_rescored']:>11.3f} {result['rescore_ms']:>12.3f}"
+            )
+
+        if args.uri:
+            print(f"\nMilvus ({args.uri}, índice {args.index_type}): recall@k reordenado y latencia por consulta")
+            for storage in VECTOR_STORAGE_TYPES:
+                result = run_milvus(args, chunks, queries, truth, storage, os.path.join(tmp, f"milvus_{storage}"))
+                print(f"{storage:<9} recall@k={result['recall_rescored']:.3f}  {result['latency_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Compara el almacén vectorial en proceso (NumpyVectorStore) con Milvus sobre el mismo corpus.
+
+Genera un corpus sintético de vectores agrupados en temas (como los chunks de varios
+documentos), lo inserta en ambos almacenes y mide: velocidad de inserción, tiempo de
+arranque en frío (abrir el almacén ya persistido), latencia p50/p99 por consulta,
+consultas/s en lote y el recall@k de Milvus frente a la búsqueda exacta del almacén numpy.
+
+Si Milvus no está disponible (sin pymilvus o sin servidor) se informa solo del almacén numpy.
+
+Uso:
+    python -m benchmarks.bench_vector_store --chunks 5000 --queries 500
+    python -m benchmarks.bench_vector_store --milvus-uri ./cache/bench_milvus.db  # Milvus Lite
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from src.domain.models import DocumentChunk
+from src.infrastructure.numpy_vector_store import NumpyVectorStore
+
+COLLECTION = "bench_vector_store"
+
+
+def synthetic_corpus(count: int, dim: int, topics: int = 50, seed: int = 0):
+    """Chunks con embeddings agrupados alrededor de `topics` centros y consultas cercanas a ellos"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=count)
+    vectors = centers[labels] + rng.normal(scale=0.6, size=(count, dim)).astype(np.float32)
+    chunks = [
+        DocumentChunk(
+            doc_id=f"doc{i // 100}",
+            text=f"Texto sintético del chunk {i}. " * 25,
+            metadata={"source": f"doc{i // 100}.pdf", "page": i % 100 + 1},
+            chunk_id=f"doc{i // 100}:p{i % 100 + 1}:c0",
+            embedding=vector.tolist(),
+        )
+        for i, vector in enumerate(vectors)
+    ]
+    return chunks, centers
+
+
+def make_queries(centers: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picked = centers[rng.integers(0, len(centers), size=count)]
+    return (picked + rng.normal(scale=0.6, size=picked.shape)).astype(np.float32)
+
+
+def measure(name, open_store, search, search_batch, chunks, queries, top_k, batch_size, after_insert=None):
+    """Inserta, reabre y consulta un almacén. Devuelve (métricas, ids devueltos por consulta)"""
+    store = open_store()
+    store.set_collection()
+    started = time.perf_counter()
+    store.insert(chunks, upsert=False)
+    if after_insert is not None:
+        after_insert(store)
+    insert_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    store = open_store()
+    open_seconds = time.perf_counter() - started
+
+    search(store, queries[0], top_k)  # Calentamiento
+    latencies, ids = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results = search(store, query, top_k)
+        latencies.append(time.perf_counter() - started)
+        ids.append([result.chunk.chunk_id for result in results])
+
+    started = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        search_batch(store, queries[i : i + batch_size], top_k)
+    batch_seconds = time.perf_counter() - started
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "name": name,
+        "insert_per_s": len(chunks) / insert_seconds,
+        "open_ms": open_seconds * 1000,
+        "p50_ms": statistics.median(latencies_ms),
+        "p99_ms": latencies_ms[min(len(latencies_ms) - 1, int(0.99 * len(latencies_ms)))],
+        "batch_qps": len(queries) / batch_seconds,
+    }, ids
+
+
+def milvus_batch_search(store, vectors, top_k):
+    return store.client.search(
+        collection_name=store.collection_name,
+        data=[vector.tolist() for vector in vectors],
+        limit=top_k,
+        output_fields=["text", "metadata", "chunk_id", "doc_id"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32, help="Consultas por búsqueda en lote")
+    parser.add_argument("--milvus-uri", default="http://127.0.0.1:19530")
+    parser.add_argument("--skip-milvus", action="store_true")
+    args = parser.parse_args()
+
+    chunks, centers = synthetic_corpus(args.chunks, args.dim)
+    queries = make_queries(centers, args.queries)
+    data_dir = tempfile.mkdtemp(prefix="bench_numpy_store_")
+
+    numpy_stats, exact_ids = measure(
+        "numpy",
+        lambda: NumpyVectorStore(data_dir, COLLECTION, args.dim),
+        lambda store, query, k: store.search(query, k),
+        lambda store, batch, k: store.search_batch(batch, k),
+        chunks,
+        queries,
+        args.top_k,
+        args.batch_size,
+    )
+    rows = [numpy_stats]
+    recall = None
+
+    if not args.skip_milvus:
+        try:
+            from src.infrastructure.vector_store_manager import MilvusManager
+
+            def open_milvus():
+                store = MilvusManager(args.milvus_uri, COLLECTION, args.dim)
+                if store.has_collection():
+                    store.client.load_collection(COLLECTION)
+                return store
+
+            def milvus_search(store, query, k):
+                return store.search(query.tolist(), k)
+
+            def flush(store):
+                # Las inserciones deben ser visibles antes de consultar
+                store.client.flush(collection_name=store.collection_name)
+
+            milvus_stats, milvus_ids = measure(
+                "milvus",
+                open_milvus,
+                milvus_search,
+                milvus_batch_search,
+                chunks,
+                queries,
+                args.top_k,
+                args.batch_size,
+                after_insert=flush,
+            )
+            rows.append(milvus_stats)
+            recall = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(exact_ids, milvus_ids) if a])
+            open_milvus().client.drop_collection(COLLECTION)
+        except Exception as e:
+            print(f"Milvus no disponible ({type(e).__name__}: {e}); solo se informa del almacén numpy")
+
+    print(f"\nCorpus: {args.chunks} chunks de dimensión {args.dim}, {args.queries} consultas, top-{args.top_k}")
+    print(f"{'almacén':<8} {'inserción/s':>12} {'arranque (ms)':>14} {'p50 (ms)':>9} {'p99 (ms)':>9} {'lote q/s':>9}")
+    for stats in rows:
+        print(
+            f"{stats['name']:<8} {stats['insert_per_s']:>12.0f} {stats['open_ms']:>14.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['batch_qps']:>9.0f}"
+        )
+    if recall is not None:
+        print(f"Recall@{args.top_k} de Milvus frente a la búsqueda exacta: {recall:.3f}")
+    print(f"Tamaño en disco del almacén numpy: {dir_size_mb(data_dir):.1f} MB")
+
+
+def dir_size_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files) / 1e6
+
+
+if __name__ == "__main__":
+    main()
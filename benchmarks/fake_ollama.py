@@ -0,0 +1,178 @@
+"""
+Servidor HTTP que imita la API de Ollama para medir rendimiento sin modelos reales.
+
+Devuelve embeddings deterministas (derivados del hash del texto) y simula la latencia
+de inferencia con un coste fijo por petición más un coste por texto, limitando cuántas
+peticiones se atienden en paralelo como haría OLLAMA_NUM_PARALLEL. El endpoint de chat
+simula el prefill y genera tokens a ritmo fijo, con o sin streaming, e incluye los
+campos de tiempo (ns) que devuelve Ollama en la respuesta final.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # El backlog por defecto (5) descarta conexiones en ráfagas de muchos clientes simultáneos
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def fake_vector(text: str, dim: int):
+    """Genera un vector normalizado y reproducible a partir del texto"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    vector = [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOllamaServer:
+    """
+    Servidor Ollama falso en un hilo de fondo.
+
+    Args:
+        dim (int): Dimensión de los embeddings devueltos
+        request_latency (float): Segundos de coste fijo por petición
+        item_latency (float): Segundos adicionales por cada texto embebido
+        parallel (int): Peticiones atendidas simultáneamente
+        prefill_latency (float): Segundos de evaluación del prompt en el chat
+        token_latency (float): Segundos por token generado en el chat
+        answer_tokens (int): Tokens de cada respuesta de chat
+    """
+
+    def __init__(
+        self,
+        dim: int = 384,
+        request_latency: float = 0.02,
+        item_latency: float = 0.002,
+        parallel: int = 4,
+        prefill_latency: float = 0.2,
+        token_latency: float = 0.02,
+        answer_tokens: int = 40,
+    ):
+        self.dim = dim
+        self.request_latency = request_latency
+        self.item_latency = item_latency
+        self.prefill_latency = prefill_latency
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.slots = threading.Semaphore(parallel)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _simulate(self, n_items: int):
+        with self._lock:
+            self.request_count += 1
+        with self.slots:
+            time.sleep(self.request_latency + self.item_latency * n_items)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                if self.path == "/api/embed":
+                    inputs = request.get("input", "")
+                    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+                    server._simulate(len(inputs))
+                    self._send_json(
+                        {"model": request.get("model"), "embeddings": [fake_vector(t, server.dim) for t in inputs]}
+                    )
+                elif self.path == "/api/chat":
+                    self._chat(request)
+                elif self.path == "/api/embeddings":
+                    server._simulate(1)
+                    self._send_json({"embedding": fake_vector(request.get("prompt", ""), server.dim)})
+                else:
+                    self._send_json({"error": f"ruta no soportada: {self.path}"}, status=404)
+
+            def _chat(self, request):
+                prompt = " ".join(message.get("content", "") for message in request.get("messages", []))
+                model = request.get("model")
+                with server._lock:
+                    server.request_count += 1
+                with server.slots:
+                    time.sleep(server.prefill_latency)
+                    tokens = [f"tok{i} " for i in range(server.answer_tokens)]
+                    timings = {
+                        "prompt_eval_count": len(prompt.split()),
+                        "prompt_eval_duration": int(server.prefill_latency * 1e9),
+                        "load_duration": 0,
+                        "eval_count": len(tokens),
+                        "eval_duration": int(server.token_latency * len(tokens) * 1e9),
+                    }
+                    if not request.get("stream", True):
+                        time.sleep(server.token_latency * len(tokens))
+                        self._send_json(
+                            {
+                                "model": model,
+                                "message": {"role": "assistant", "content": "".join(tokens)},
+                                "done": True,
+                                **timings,
+                            }
+                        )
+                        return
+
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for token in tokens:
+                        time.sleep(server.token_latency)
+                        self._write_chunk(
+                            {"model": model, "message": {"role": "assistant", "content": token}, "done": False}
+                        )
+                    self._write_chunk(
+                        {"model": model, "message": {"role": "assistant", "content": ""}, "done": True, **timings}
+                    )
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+
+            def _write_chunk(self, payload):
+                line = json.dumps(payload).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,65 @@
+"""
+Verifica las variantes ONNX (optimized, int8) frente al modelo fp32.
+
+Para cada variante informa la similitud coseno entre sus embeddings y los de fp32
+(media y mínima), el rendimiento en textos/s, la ganancia respecto a fp32 y el
+tamaño del archivo. Genera las variantes que falten en `models/`.
+
+Uso:
+    python -m benchmarks.verify_onnx_variants --texts 1000 --batch-size 32
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_gpu_batching import synthetic_texts
+from src.infrastructure.embedding_gpu import ONNX_VARIANTS, GPUEmbeddingGenerator
+
+
+def embed_all(embedder, texts, batch_size):
+    start = time.perf_counter()
+    embeddings = np.vstack(
+        [embedder.generate_embeddings(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)]
+    )
+    return embeddings, time.perf_counter() - start
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.texts)
+    results = {}
+    for variant in ONNX_VARIANTS:
+        embedder = GPUEmbeddingGenerator(args.model, variant=variant)
+        embed_all(embedder, texts[: args.batch_size], args.batch_size)  # Calentamiento
+        embeddings, seconds = embed_all(embedder, texts, args.batch_size)
+        model_path = embedder.model_path(variant)
+        # Los exportadores recientes guardan los pesos aparte, en `<modelo>.onnx.data`
+        size = sum(os.path.getsize(path) for path in (model_path, model_path + ".data") if os.path.exists(path))
+        results[variant] = (embeddings, seconds, size)
+
+    baseline, baseline_seconds, _ = results["fp32"]
+    print(f"{'variante':<10} {'textos/s':>9} {'ganancia':>9} {'coseno medio':>13} {'coseno mín':>11} {'MB':>7}")
+    for variant, (embeddings, seconds, size) in results.items():
+        cosines = cosine_rows(baseline, embeddings)
+        print(
+            f"{variant:<10} {len(texts) / seconds:>9.1f} {baseline_seconds / seconds:>8.2f}x "
+            f"{cosines.mean():>13.6f} {cosines.min():>11.6f} {size / 1024 / 1024:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 
 
@@ -12,40 +13,162 @@ class AppConfig:
 
     Attributes:
         EMBEDDING_ONNX_MODEL (str): Modelo de embeddings para ONNX
+        EMBEDDING_ONNX_VARIANT (str): Variante ONNX a cargar: "fp32", "optimized" o "int8"
         EMBEDDING_BATCH_SIZE (int): Tamaño de lote para generación de embeddings
+        EMBEDDING_TOKEN_BUDGET (int): Tokens por lote (con padding) en modo GPU; 0 usa lotes de tamaño fijo
+        EMBEDDING_TOKENIZER_WORKERS (int): Hilos que tokenizan los lotes siguientes durante la inferencia ONNX (0 en secuencia)
         NUM_WORKERS (int): Número de workers para procesamiento paralelo
         USE_GPU (bool): Flag para habilitar el uso de GPU
         DOCS_FOLDER (str): Ruta a la carpeta de documentos
+        DOCS_RECURSIVE (bool): Flag para buscar PDFs también en subcarpetas
+        PDF_WORKERS (int): Procesos para extraer texto de PDFs en paralelo
+        PDF_PAGES_PER_TASK (int): Páginas por tarea al repartir PDFs grandes entre procesos
+        PAGE_CACHE_ENABLED (bool): Flag para guardar el texto extraído y no volver a parsear los PDFs sin cambios
+        PAGE_CACHE_DIR (str): Carpeta de la caché de texto extraído (por hash del contenido de cada PDF)
+        VECTOR_STORE_BACKEND (str): Almacén vectorial: "milvus" o "numpy" (en proceso, sin servidor)
+        NUMPY_STORE_DIR (str): Carpeta del almacén vectorial "numpy"
         MILVUS_URI (str): URI de conexión a Milvus
         COLLECTION_NAME (str): Nombre de la colección en Milvus
+        MILVUS_INDEX_TYPE (str): Índice vectorial de Milvus: "HNSW", "IVF_FLAT", "IVF_PQ" o "FLAT"
+        MILVUS_METRIC_TYPE (str): Métrica del índice: "COSINE", "IP" o "L2"
+        MILVUS_INDEX_PARAMS (dict): Parámetros de construcción del índice (JSON); se combinan con los de por defecto
+        MILVUS_SEARCH_PARAMS (dict): Parámetros de búsqueda (JSON), p. ej. {"ef": 64} o {"nprobe": 16}
+        VECTOR_INSERT_BATCH_SIZE (int): Chunks por lote al insertar en el almacén vectorial
+        MILVUS_INSERT_CONCURRENCY (int): Lotes de inserción enviados a Milvus a la vez
+        MILVUS_COMPACT_AFTER_INSERT (bool): Flag para compactar la colección tras cada ingesta (por defecto solo flush)
+        VECTOR_STORAGE (str): Formato de los vectores en Milvus: "float32", "float16", "bfloat16" o "binary"
+        VECTOR_OVERSAMPLE (int): Candidatos por resultado pedidos al índice comprimido antes de reordenar en float32
+        VECTOR_RESCORE_DIR (str): Carpeta de los vectores float32 usados para reordenar con almacenamiento comprimido
+        INGEST_MANIFEST_PATH (str): Manifiesto de archivos ingestados para la ingesta incremental
         EMBEDDING_MODEL (str): Modelo de embeddings para Ollama
+        OLLAMA_HOST (str): URL del servidor Ollama (vacío usa el valor por defecto del cliente)
+        EMBEDDING_CONCURRENCY (int): Peticiones de embeddings simultáneas hacia Ollama
         LLM_MODEL (str): Modelo LLM para generación de respuestas
+        MODEL_METADATA_PATH (str): Archivo con la dimensión y otros metadatos de los modelos de embeddings ya usados
+        EMBEDDING_CACHE_ENABLED (bool): Flag para reutilizar embeddings ya calculados entre ingestas
+        EMBEDDING_CACHE_DIR (str): Carpeta de la caché persistente de embeddings
+        EMBEDDING_CACHE_MAX_MB (int): Tamaño máximo de la caché de vectores por modelo
+        PIPELINE_QUEUE_SIZE (int): Lotes máximos en cada cola de la ingesta en streaming
         CHUNK_SIZE (int): Tamaño de chunks para división de texto
         CHUNK_OVERLAP (int): Solapamiento entre chunks
+        CHUNK_MODE (str): Unidad de los chunks: "chars" (CHUNK_SIZE caracteres) o "tokens" (tokens del modelo de embeddings)
+        CHUNK_MAX_TOKENS (int): Tokens máximos por chunk en el modo "tokens" (incluidos los especiales)
+        CHUNK_OVERLAP_TOKENS (int): Tokens de solapamiento entre chunks en el modo "tokens"
+        CHUNK_TOKENIZER (str): tokenizer.json o modelo de HuggingFace del tokenizador; vacío usa el del embedder ONNX
         SEARCH_TOP_K (int): Número de resultados a retornar en búsquedas
+        HYBRID_SEARCH_ENABLED (bool): Flag para combinar la búsqueda vectorial con BM25 (fusión RRF)
+        BM25_INDEX_DIR (str): Carpeta del índice BM25 de la colección, construido durante la ingesta
+        HYBRID_CANDIDATES (int): Candidatos pedidos a cada búsqueda antes de fusionar
+        HYBRID_RRF_K (int): Constante de la fusión por rangos recíprocos (RRF)
+        CONTEXT_TOKEN_BUDGET (int): Tokens máximos de contexto en el prompt tras fusionar chunks solapados (0 desactiva)
+        CONTEXT_CHARS_PER_TOKEN (float): Caracteres por token usados para estimar el tamaño del contexto
+        CORPUS_VERSION_PATH (str): Archivo con el sello de versión del corpus, renovado en cada ingesta
+        ANSWER_CACHE_ENABLED (bool): Flag para reutilizar respuestas de preguntas semánticamente equivalentes
+        ANSWER_CACHE_THRESHOLD (float): Similitud coseno mínima entre preguntas para reutilizar la respuesta
+        ANSWER_CACHE_TTL (int): Segundos de vida de cada respuesta en caché
+        ANSWER_CACHE_MAX_ENTRIES (int): Respuestas máximas guardadas en la caché semántica
+        SERVER_HOST (str): Interfaz de escucha del modo servidor (--serve)
+        SERVER_PORT (int): Puerto del modo servidor
+        SERVER_MAX_CONCURRENCY (int): Preguntas procesándose a la vez en el modo servidor
+        BATCH_QUESTIONS_PER_CALL (int): Preguntas por llamada a `ask_questions` en el modo por lotes (--batch)
+        BATCH_LLM_CONCURRENCY (int): Generaciones simultáneas en el LLM en el modo por lotes
+        QUERY_BATCH_MAX_SIZE (int): Preguntas máximas agrupadas en una llamada al modelo de embeddings GPU (1 desactiva)
+        QUERY_BATCH_MAX_WAIT_MS (float): Milisegundos máximos de espera para completar un lote de preguntas
+        METRICS_ENABLED (bool): Flag para medir las etapas de ingesta y consulta (exportadas en formato Prometheus)
+        METRICS_TEXTFILE (str): Archivo .prom donde volcar las métricas al terminar la ingesta o el chat ("" no escribe)
+        TRACE_REQUESTS (bool): Flag para adjuntar a cada respuesta la traza JSON de sus etapas
     """
 
     # --- Configuración de GPU ---
     EMBEDDING_ONNX_MODEL = os.environ.get("EMBEDDING_ONNX_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_ONNX_VARIANT = os.environ.get("EMBEDDING_ONNX_VARIANT", "fp32")
     EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_TOKEN_BUDGET = int(os.environ.get("EMBEDDING_TOKEN_BUDGET", "0"))
+    EMBEDDING_TOKENIZER_WORKERS = int(os.environ.get("EMBEDDING_TOKENIZER_WORKERS", "1"))
     NUM_WORKERS = int(os.environ.get("NUM_WORKERS", "2"))
     USE_GPU = os.environ.get("USE_GPU", "true").lower() == "true"
 
     # --- Rutas de Archivos ---
     DOCS_FOLDER = os.environ.get("DOCS_FOLDER", "./docs")  # Nueva configuración
+    DOCS_RECURSIVE = os.environ.get("DOCS_RECURSIVE", "false").lower() == "true"
+
+    # --- Extracción de PDFs ---
+    PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "1"))
+    PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "200"))
+    PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "true").lower() == "true"
+    PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", "./cache/pages")
+
+    # --- Almacén Vectorial ---
+    VECTOR_STORE_BACKEND = os.environ.get("VECTOR_STORE_BACKEND", "milvus").lower()
+    NUMPY_STORE_DIR = os.environ.get("NUMPY_STORE_DIR", "./cache/vector_store")
 
     # --- Configuración de Milvus ---
     MILVUS_URI = os.environ.get("MILVUS_URI", "http://127.0.0.1:19530")
     COLLECTION_NAME = os.environ.get("COLLECTION_NAME", "pdf_knowledge_base")
+    MILVUS_INDEX_TYPE = os.environ.get("MILVUS_INDEX_TYPE", "HNSW").upper()
+    MILVUS_METRIC_TYPE = os.environ.get("MILVUS_METRIC_TYPE", "COSINE").upper()
+    MILVUS_INDEX_PARAMS = json.loads(os.environ.get("MILVUS_INDEX_PARAMS") or "{}")
+    MILVUS_SEARCH_PARAMS = json.loads(os.environ.get("MILVUS_SEARCH_PARAMS") or "{}")
+    VECTOR_INSERT_BATCH_SIZE = int(os.environ.get("VECTOR_INSERT_BATCH_SIZE", "100"))
+    MILVUS_INSERT_CONCURRENCY = int(os.environ.get("MILVUS_INSERT_CONCURRENCY", "4"))
+    MILVUS_COMPACT_AFTER_INSERT = os.environ.get("MILVUS_COMPACT_AFTER_INSERT", "false").lower() == "true"
+    VECTOR_STORAGE = os.environ.get("VECTOR_STORAGE", "float32").lower()
+    VECTOR_OVERSAMPLE = int(os.environ.get("VECTOR_OVERSAMPLE", "4"))
+    VECTOR_RESCORE_DIR = os.environ.get("VECTOR_RESCORE_DIR", f"./cache/rescore/{COLLECTION_NAME}")
+    INGEST_MANIFEST_PATH = os.environ.get("INGEST_MANIFEST_PATH", f"./cache/manifest_{COLLECTION_NAME}.json")
 
     # --- Configuración de Modelos ---
     EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "mxbai-embed-large")
+    OLLAMA_HOST = os.environ.get("OLLAMA_HOST") or None
+    EMBEDDING_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", "4"))
 
     LLM_MODEL = os.environ.get("LLM_MODEL", "qwen2.5:3b")
+    MODEL_METADATA_PATH = os.environ.get("MODEL_METADATA_PATH", "./cache/model_metadata.json")
+
+    # --- Caché de Embeddings ---
+    EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "./cache/embeddings")
+    EMBEDDING_CACHE_MAX_MB = int(os.environ.get("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+    # --- Ingesta en Streaming ---
+    PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "4"))
 
     # --- Configuración de Procesamiento de Texto ---
     CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", "800"))
     CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "100"))
+    CHUNK_MODE = os.environ.get("CHUNK_MODE", "chars").lower()
+    CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "256"))
+    CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "32"))
+    CHUNK_TOKENIZER = os.environ.get("CHUNK_TOKENIZER", "")
 
     # --- Configuración de Búsqueda ---
     SEARCH_TOP_K = int(os.environ.get("SEARCH_TOP_K", "10"))
+    HYBRID_SEARCH_ENABLED = os.environ.get("HYBRID_SEARCH_ENABLED", "false").lower() == "true"
+    BM25_INDEX_DIR = os.environ.get("BM25_INDEX_DIR", f"./cache/bm25/{COLLECTION_NAME}")
+    HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "20"))
+    HYBRID_RRF_K = int(os.environ.get("HYBRID_RRF_K", "60"))
+
+    # --- Ensamblado del Contexto ---
+    CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1536"))
+    CONTEXT_CHARS_PER_TOKEN = float(os.environ.get("CONTEXT_CHARS_PER_TOKEN", "4"))
+
+    # --- Caché Semántica de Respuestas ---
+    CORPUS_VERSION_PATH = os.environ.get("CORPUS_VERSION_PATH", f"./cache/corpus_version_{COLLECTION_NAME}")
+    ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "512"))
+
+    # --- Modo Servidor ---
+    SERVER_HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT = int(os.environ.get("SERVER_PORT", "8000"))
+    SERVER_MAX_CONCURRENCY = int(os.environ.get("SERVER_MAX_CONCURRENCY", "16"))
+    BATCH_QUESTIONS_PER_CALL = int(os.environ.get("BATCH_QUESTIONS_PER_CALL", "256"))
+    BATCH_LLM_CONCURRENCY = int(os.environ.get("BATCH_LLM_CONCURRENCY", "4"))
+    QUERY_BATCH_MAX_SIZE = int(os.environ.get("QUERY_BATCH_MAX_SIZE", "32"))
+    QUERY_BATCH_MAX_WAIT_MS = float(os.environ.get("QUERY_BATCH_MAX_WAIT_MS", "2"))
+
+    # --- Métricas y Trazas ---
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE", "")
+    TRACE_REQUESTS = os.environ.get("TRACE_REQUESTS", "false").lower() == "true"
@@ -1,10 +1,21 @@
 # main.py
+import json
+import os
 import sys
+import time
+from dataclasses import asdict
 from config import AppConfig
 from src.infrastructure.document_loader import PdfDocumentLoader
+from src.infrastructure.page_text_cache import PageTextCache
 from src.infrastructure.text_processor import BasicTextProcessor, SmartChunker
-from src.infrastructure.vector_store_manager import MilvusManager
+from src.infrastructure.ingest_manifest import IngestManifest
+from src.infrastructure.corpus_version import CorpusVersion
+from src.infrastructure.answer_cache import SemanticAnswerCache
+from src.infrastructure.model_metadata import ModelMetadataStore
 from src.application.orchestrator import Orchestrator
+from src.application.context_packer import ContextPacker, estimate_tokens
+from src.application.metrics import Metrics
+from src.application.streaming_pipeline import StreamingIngestionPipeline
 
 
 def main():
@@ -13,82 +24,408 @@ def main():
     ... (el resto de la documentación no cambia)
     """
     config = AppConfig()
+    metrics = Metrics(enabled=config.METRICS_ENABLED, trace_requests=config.TRACE_REQUESTS)
 
     # --- Inyección de Dependencias --- (sin cambios aquí)
     text_processor = BasicTextProcessor()
-    loader = PdfDocumentLoader(config.DOCS_FOLDER)
+    loader = PdfDocumentLoader(
+        config.DOCS_FOLDER,
+        recursive=config.DOCS_RECURSIVE,
+        num_workers=config.PDF_WORKERS,
+        pages_per_task=config.PDF_PAGES_PER_TASK,
+        page_cache=PageTextCache(config.PAGE_CACHE_DIR, text_processor) if config.PAGE_CACHE_ENABLED else None,
+    )
     chunker = SmartChunker(text_processor=text_processor, chunk_size=config.CHUNK_SIZE, overlap=config.CHUNK_OVERLAP)
 
+    model_metadata = ModelMetadataStore(config.MODEL_METADATA_PATH)
     embedder = None
     if config.USE_GPU:
         print("Inicializando embedder en modo GPU...")
         from src.infrastructure.embedding_gpu import GPUEmbeddingGenerator
 
-        embedder = GPUEmbeddingGenerator(config.EMBEDDING_ONNX_MODEL)
+        embedder = GPUEmbeddingGenerator(
+            config.EMBEDDING_ONNX_MODEL,
+            token_budget=config.EMBEDDING_TOKEN_BUDGET,
+            variant=config.EMBEDDING_ONNX_VARIANT,
+            metadata=model_metadata,
+            tokenizer_workers=config.EMBEDDING_TOKENIZER_WORKERS,
+        )
     else:
         print("Inicializando embedder en modo CPU (Ollama)...")
         from src.infrastructure.embedding_manager import OllamaEmbeddingManager
 
-        embedder = OllamaEmbeddingManager(config.EMBEDDING_MODEL)
+        embedder = OllamaEmbeddingManager(
+            config.EMBEDDING_MODEL,
+            host=config.OLLAMA_HOST,
+            max_concurrency=config.EMBEDDING_CONCURRENCY,
+            metadata=model_metadata,
+        )
+
+    if config.CHUNK_MODE == "tokens":
+        chunker = build_token_chunker(config, text_processor, embedder) or chunker
+
+    if config.EMBEDDING_CACHE_ENABLED:
+        from src.infrastructure.embedding_cache import EmbeddingCache, CachedEmbedder
+
+        cache = EmbeddingCache(config.EMBEDDING_CACHE_DIR, embedder.model_id, config.EMBEDDING_CACHE_MAX_MB)
+        embedder = CachedEmbedder(embedder, cache)
+    # Las preguntas no pasan por la caché de embeddings de chunks
+    query_embedder = embedder.uncached if config.EMBEDDING_CACHE_ENABLED else embedder
 
     embedding_dim = embedder.get_embedding_dim()
     print(f"Dimensión de embedding detectada: {embedding_dim}")
 
-    vector_store = MilvusManager(
-        uri=config.MILVUS_URI, collection_name=config.COLLECTION_NAME, embedding_dim=embedding_dim
-    )
+    if config.VECTOR_STORE_BACKEND == "numpy":
+        from src.infrastructure.numpy_vector_store import NumpyVectorStore
 
-    # --- Lógica de Ejecución ---
-    if "--ingest" in sys.argv:
-        print("Iniciando proceso de ingesta...")
-        orchestrator = Orchestrator(
-            loader=loader,
-            text_processor=text_processor,
-            chunker=chunker,
-            embedder=embedder,
-            vector_store=vector_store,
-            llm_model=config.LLM_MODEL,
-            search_top_k=config.SEARCH_TOP_K,
+        vector_store = NumpyVectorStore(config.NUMPY_STORE_DIR, config.COLLECTION_NAME, embedding_dim)
+    else:
+        from src.infrastructure.vector_store_manager import MilvusManager
+
+        vector_store = MilvusManager(
+            uri=config.MILVUS_URI,
+            collection_name=config.COLLECTION_NAME,
+            embedding_dim=embedding_dim,
+            index_type=config.MILVUS_INDEX_TYPE,
+            metric_type=config.MILVUS_METRIC_TYPE,
+            index_params=config.MILVUS_INDEX_PARAMS,
+            search_params=config.MILVUS_SEARCH_PARAMS,
+            metrics=metrics,
+            vector_storage=config.VECTOR_STORAGE,
+            oversample=config.VECTOR_OVERSAMPLE,
+            rescore_dir=config.VECTOR_RESCORE_DIR,
+            insert_concurrency=config.MILVUS_INSERT_CONCURRENCY,
+            compact_after_insert=config.MILVUS_COMPACT_AFTER_INSERT,
         )
-        orchestrator.ingest_documents()
-        print("Ingesta completada.")
+
+    hybrid_retriever = None
+    if config.HYBRID_SEARCH_ENABLED:
+        from src.infrastructure.bm25_index import BM25Index, LexicalIndexedStore
+        from src.application.hybrid_retrieval import HybridRetriever
+
+        # La ingesta mantiene el índice BM25 sincronizado con la colección
+        vector_store = LexicalIndexedStore(vector_store, BM25Index(config.BM25_INDEX_DIR))
+        if vector_store.index.exists():
+            hybrid_retriever = HybridRetriever(
+                vector_store, vector_store.index, candidates=config.HYBRID_CANDIDATES, rrf_k=config.HYBRID_RRF_K
+            )
+        elif "--ingest" not in sys.argv:
+            print(f"Aviso: no existe el índice BM25 en {config.BM25_INDEX_DIR}; se usará solo la búsqueda vectorial.")
+
+    context_packer = None
+    if config.CONTEXT_TOKEN_BUDGET > 0:
+        context_packer = ContextPacker(
+            config.CONTEXT_TOKEN_BUDGET,
+            count_tokens=lambda text: estimate_tokens(text, config.CONTEXT_CHARS_PER_TOKEN),
+        )
+
+    # --- Lógica de Ejecución ---
+    try:
+        if "--serve" in sys.argv:
+            serve(config, query_embedder, vector_store, hybrid_retriever, context_packer, metrics)
+        elif "--ingest" in sys.argv:
+            print("Iniciando proceso de ingesta...")
+            pipeline = None
+            if "--stream" in sys.argv:
+                pipeline = StreamingIngestionPipeline(
+                    loader,
+                    chunker,
+                    embedder,
+                    vector_store,
+                    embed_batch_size=config.EMBEDDING_BATCH_SIZE,
+                    queue_size=config.PIPELINE_QUEUE_SIZE,
+                    insert_batch_size=config.VECTOR_INSERT_BATCH_SIZE,
+                    metrics=metrics,
+                )
+            orchestrator = Orchestrator(
+                loader=loader,
+                text_processor=text_processor,
+                chunker=chunker,
+                embedder=embedder,
+                vector_store=vector_store,
+                llm_model=config.LLM_MODEL,
+                search_top_k=config.SEARCH_TOP_K,
+                manifest=IngestManifest(config.INGEST_MANIFEST_PATH),
+                pipeline=pipeline,
+                insert_batch_size=config.VECTOR_INSERT_BATCH_SIZE,
+                corpus_version=CorpusVersion(config.CORPUS_VERSION_PATH),
+                metrics=metrics,
+            )
+            orchestrator.ingest_documents(incremental="--incremental" in sys.argv)
+            if config.METRICS_TEXTFILE:
+                metrics.write_textfile(config.METRICS_TEXTFILE)
+            print("Ingesta completada.")
+        else:
+            answer_cache = None
+            if config.ANSWER_CACHE_ENABLED:
+                answer_cache = SemanticAnswerCache(
+                    threshold=config.ANSWER_CACHE_THRESHOLD,
+                    ttl_seconds=config.ANSWER_CACHE_TTL,
+                    max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+                )
+            chat_orchestrator = Orchestrator(
+                loader=loader,
+                text_processor=text_processor,
+                chunker=chunker,
+                embedder=embedder,
+                vector_store=vector_store,
+                llm_model=config.LLM_MODEL,
+                search_top_k=config.SEARCH_TOP_K,
+                llm_host=config.OLLAMA_HOST,
+                answer_cache=answer_cache,
+                corpus_version=CorpusVersion(config.CORPUS_VERSION_PATH),
+                hybrid_retriever=hybrid_retriever,
+                context_packer=context_packer,
+                metrics=metrics,
+                query_embedder=query_embedder,
+            )
+
+            if "--batch" in sys.argv:
+                input_path = cli_option("--batch")
+                output_path = cli_option("--output") or default_batch_output(input_path)
+                run_batch(config, chat_orchestrator, input_path, output_path)
+                if config.METRICS_TEXTFILE:
+                    metrics.write_textfile(config.METRICS_TEXTFILE)
+                return
+
+            print("\nSistema de Chat RAG listo. Escribe 'salir' para terminar.")
+            while True:
+                question = input("\nPregunta: ")
+                if question.lower() == "salir":
+                    if answer_cache is not None:
+                        print(f"Estadísticas de la caché de respuestas: {answer_cache.stats()}")
+                    if config.METRICS_TEXTFILE:
+                        metrics.write_textfile(config.METRICS_TEXTFILE)
+                    break
+
+                # 1. Imprimir la respuesta del LLM a medida que se genera
+                streaming_answer = chat_orchestrator.ask_question_stream(question)
+                print("\nRespuesta:")
+                for token in streaming_answer:
+                    print(token, end="", flush=True)
+                print()
+                response_obj = streaming_answer.response
+
+                if response_obj.from_cache:
+                    print("\n[Respuesta servida desde la caché semántica]")
+                elif response_obj.metrics:
+                    generation = response_obj.metrics
+                    print(
+                        f"\n[Primer token: {generation.time_to_first_token:.2f} s | "
+                        f"Total: {generation.total_time:.2f} s | {generation.tokens_per_second:.1f} tokens/s | "
+                        f"{generation.prompt_tokens_saved} tokens de contexto ahorrados]"
+                    )
+
+                if response_obj.trace is not None:
+                    print(f"[Traza: {json.dumps(response_obj.trace, ensure_ascii=False)}]")
+
+                # 2. Imprimir las fuentes consultadas de forma clara
+                if response_obj.source_chunks:
+                    print("\n--- Fuentes Consultadas ---")
+                    # Usamos un set para evitar mostrar la misma página múltiples veces
+                    sources = set()
+                    for result in response_obj.source_chunks:
+                        source_file = result.chunk.metadata.get("source", "Desconocido")
+                        page_num = result.chunk.metadata.get("page", "N/A")
+                        sources.add(f"- Documento: {source_file}, Página: {page_num}")
+
+                    # Imprimir las fuentes únicas y ordenadas
+                    for source in sorted(list(sources)):
+                        print(source)
+    finally:
+        if hybrid_retriever is not None:
+            hybrid_retriever.close()
+
+
+def build_token_chunker(config: AppConfig, text_processor, embedder):
+    """TokenChunker con el tokenizador configurado o el del embedder ONNX; None si no hay ninguno disponible"""
+    from src.infrastructure.text_processor import TokenChunker
+
+    max_tokens = config.CHUNK_MAX_TOKENS
+    on_tokenized = None
+    if config.CHUNK_TOKENIZER:
+        from tokenizers import Tokenizer
+
+        if os.path.exists(config.CHUNK_TOKENIZER):
+            tokenizer = Tokenizer.from_file(config.CHUNK_TOKENIZER)
+        else:
+            tokenizer = Tokenizer.from_pretrained(config.CHUNK_TOKENIZER)
+    elif config.USE_GPU:
+        from src.infrastructure.embedding_gpu import MAX_LENGTH
+
+        embedder_tokenizer = embedder.tokenizer
+        tokenizer = getattr(embedder_tokenizer, "backend_tokenizer", None) or embedder_tokenizer.tokenizer
+        # Los ids de cada chunk se reutilizan al embeberlo en lugar de volver a tokenizarlo
+        on_tokenized = getattr(embedder_tokenizer, "remember", None)
+        max_tokens = min(max_tokens, MAX_LENGTH)
     else:
-        chat_orchestrator = Orchestrator(
-            loader=loader,
-            text_processor=text_processor,
-            chunker=chunker,
+        print("Aviso: CHUNK_MODE=tokens requiere CHUNK_TOKENIZER con Ollama; se usarán chunks por caracteres.")
+        return None
+
+    return TokenChunker(
+        text_processor,
+        tokenizer,
+        max_tokens=max_tokens,
+        overlap=config.CHUNK_OVERLAP_TOKENS,
+        on_tokenized=on_tokenized,
+    )
+
+
+def cli_option(name: str):
+    """Valor que sigue a una opción de la línea de comandos (p. ej. `--batch preguntas.jsonl`), o None"""
+    if name in sys.argv:
+        index = sys.argv.index(name) + 1
+        if index < len(sys.argv) and not sys.argv[index].startswith("--"):
+            return sys.argv[index]
+    return None
+
+
+def default_batch_output(input_path: str) -> str:
+    return f"{os.path.splitext(input_path)[0]}_respuestas.jsonl"
+
+
+def batch_record(record: dict, response) -> dict:
+    """Línea de salida del modo por lotes: la entrada con la respuesta, sus fuentes y métricas (o el error)"""
+    if isinstance(response, Exception):
+        return {**record, "error": f"{type(response).__name__}: {response}"}
+    output = {
+        **record,
+        "answer": response.answer,
+        "sources": [
+            {
+                "source": result.chunk.metadata.get("source"),
+                "page": result.chunk.metadata.get("page"),
+                "similarity": result.similarity,
+            }
+            for result in response.source_chunks
+        ],
+        "from_cache": response.from_cache,
+    }
+    if response.metrics is not None:
+        output["metrics"] = asdict(response.metrics)
+    if response.trace is not None:
+        output["trace"] = response.trace
+    return output
+
+
+def run_batch(config: AppConfig, orchestrator, input_path: str, output_path: str):
+    """Responde las preguntas de un JSONL (`{"question": ...}` por línea) y escribe las respuestas en otro
+
+    Las preguntas se envían a `ask_questions` en grupos de BATCH_QUESTIONS_PER_CALL y cada grupo
+    se escribe (en el orden de entrada) en cuanto termina, de modo que la salida avanza sin
+    esperar al archivo completo. Los demás campos de cada línea se copian a la salida.
+    """
+    if not input_path or not os.path.exists(input_path):
+        raise FileNotFoundError(f"No existe el archivo de preguntas: {input_path}")
+
+    def answer_group(records, out):
+        responses = orchestrator.ask_questions(
+            [record["question"] for record in records],
+            max_concurrency=config.BATCH_LLM_CONCURRENCY,
+            return_exceptions=True,
+        )
+        for record, response in zip(records, responses):
+            out.write(json.dumps(batch_record(record, response), ensure_ascii=False) + "\n")
+        out.flush()
+        return sum(isinstance(response, Exception) for response in responses)
+
+    answered = failed = 0
+    started = time.perf_counter()
+    with open(input_path, "r", encoding="utf-8") as f, open(output_path, "w", encoding="utf-8") as out:
+        group = []
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or not isinstance(record.get("question"), str):
+                raise ValueError(f"{input_path}:{line_number}: se esperaba un objeto con el campo 'question'")
+            group.append(record)
+            if len(group) == config.BATCH_QUESTIONS_PER_CALL:
+                failed += answer_group(group, out)
+                answered += len(group)
+                group = []
+                elapsed = time.perf_counter() - started
+                print(f"Respondidas {answered} preguntas ({answered / elapsed * 60:.1f} preguntas/min)")
+        if group:
+            failed += answer_group(group, out)
+            answered += len(group)
+
+    elapsed = time.perf_counter() - started
+    rate = answered / elapsed * 60 if elapsed else 0.0
+    print(
+        f"Lote completado: {answered} preguntas ({failed} con error) en {elapsed:.1f} s "
+        f"-> {rate:.1f} preguntas/min. Respuestas en {output_path}"
+    )
+
+
+def serve(config: AppConfig, embedder, vector_store, hybrid_retriever=None, context_packer=None, metrics=None):
+    """Atiende preguntas concurrentes por HTTP con clientes asíncronos de Ollama y Milvus
+
+    `embedder` es el de las preguntas, sin la caché de embeddings de chunks.
+    """
+    import asyncio
+    from src.application.async_orchestrator import AsyncOrchestrator
+    from src.infrastructure.http_server import RAGHttpServer
+
+    if not config.USE_GPU:
+        from src.infrastructure.embedding_manager import AsyncOllamaEmbeddingManager
+
+        embedder = AsyncOllamaEmbeddingManager(
+            config.EMBEDDING_MODEL, host=config.OLLAMA_HOST, max_connections=config.SERVER_MAX_CONCURRENCY
+        )
+    elif config.QUERY_BATCH_MAX_SIZE > 1:
+        from src.infrastructure.embedding_batcher import MicroBatchingEmbedder
+
+        embedder = MicroBatchingEmbedder(
+            embedder,
+            max_batch_size=config.QUERY_BATCH_MAX_SIZE,
+            max_wait_ms=config.QUERY_BATCH_MAX_WAIT_MS,
+        )
+
+    answer_cache = None
+    if config.ANSWER_CACHE_ENABLED:
+        answer_cache = SemanticAnswerCache(
+            threshold=config.ANSWER_CACHE_THRESHOLD,
+            ttl_seconds=config.ANSWER_CACHE_TTL,
+            max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+        )
+
+    async def run():
+        # El almacén numpy y Milvus Lite (archivo local) no tienen cliente asíncrono: se busca en hilos
+        retriever = vector_store
+        if config.VECTOR_STORE_BACKEND != "numpy" and config.MILVUS_URI.startswith(("http://", "https://")):
+            from src.infrastructure.vector_store_manager import AsyncMilvusSearcher
+
+            retriever = AsyncMilvusSearcher(
+                config.MILVUS_URI,
+                config.COLLECTION_NAME,
+                index_type=config.MILVUS_INDEX_TYPE,
+                metric_type=config.MILVUS_METRIC_TYPE,
+                search_params=config.MILVUS_SEARCH_PARAMS,
+                vector_storage=config.VECTOR_STORAGE,
+                oversample=config.VECTOR_OVERSAMPLE,
+                rescore_vectors=getattr(vector_store, "rescore_vectors", None),
+            )
+
+        orchestrator = AsyncOrchestrator(
             embedder=embedder,
-            vector_store=vector_store,
+            retriever=retriever,
             llm_model=config.LLM_MODEL,
             search_top_k=config.SEARCH_TOP_K,
+            llm_host=config.OLLAMA_HOST,
+            max_concurrency=config.SERVER_MAX_CONCURRENCY,
+            answer_cache=answer_cache,
+            corpus_version=CorpusVersion(config.CORPUS_VERSION_PATH),
+            hybrid_retriever=hybrid_retriever,
+            context_packer=context_packer,
+            metrics=metrics,
         )
+        await RAGHttpServer(orchestrator, host=config.SERVER_HOST, port=config.SERVER_PORT).serve_forever()
 
-        print("\nSistema de Chat RAG listo. Escribe 'salir' para terminar.")
-        while True:
-            question = input("\nPregunta: ")
-            if question.lower() == "salir":
-                break
-
-            # --- CORRECCIÓN: Formateo de la respuesta ---
-            response_obj = chat_orchestrator.ask_question(question)
-
-            # 1. Imprimir la respuesta de texto del LLM
-            print("\nRespuesta:")
-            print(response_obj.answer)
-
-            # 2. Imprimir las fuentes consultadas de forma clara
-            if response_obj.source_chunks:
-                print("\n--- Fuentes Consultadas ---")
-                # Usamos un set para evitar mostrar la misma página múltiples veces
-                sources = set()
-                for result in response_obj.source_chunks:
-                    source_file = result.chunk.metadata.get("source", "Desconocido")
-                    page_num = result.chunk.metadata.get("page", "N/A")
-                    sources.add(f"- Documento: {source_file}, Página: {page_num}")
-
-                # Imprimir las fuentes únicas y ordenadas
-                for source in sorted(list(sources)):
-                    print(source)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
 
 
 if __name__ == "__main__":
@@ -4,27 +4,41 @@ Script de configuración para GPU AMD con DirectML.
 
 Este script automatiza la instalación de dependencias y preparación
 de modelos necesarios para la aceleración GPU en el sistema RAG.
+
+Uso:
+    python setup_gpu.py              # prepara la variante configurada en EMBEDDING_ONNX_VARIANT
+    python setup_gpu.py --all        # genera fp32, optimized e int8
 """
+import sys
 
 
-def setup_models():
+def setup_models(variants=None):
     """
     Prepara los modelos de embeddings necesarios.
 
     Descarga y configura el modelo de embeddings para su uso con ONNX
     y DirectML, mostrando información sobre la dimensión de embeddings.
+    Genera además las variantes ONNX indicadas (optimizada, int8) en `models/`.
+
+    Args:
+        variants (list): Variantes a generar. Por defecto la configurada en AppConfig
     """
+    from config import AppConfig
     from src.infrastructure.embedding_gpu import GPUEmbeddingGenerator
 
+    config = AppConfig()
     print("Preparando modelo de embeddings...")
-    embedder = GPUEmbeddingGenerator()
-    print(f"Modelo listo. Dimensión de embeddings: {embedder.get_embedding_dim()}")
+    for variant in variants or [config.EMBEDDING_ONNX_VARIANT]:
+        embedder = GPUEmbeddingGenerator(config.EMBEDDING_ONNX_MODEL, variant=variant)
+        print(f"Variante {variant} lista. Dimensión de embeddings: {embedder.get_embedding_dim()}")
 
 
 if __name__ == "__main__":
     """
     Punto de entrada principal del script de configuración.
     """
+    from src.infrastructure.embedding_gpu import ONNX_VARIANTS
+
     print("Configurando entorno GPU...")
-    setup_models()
+    setup_models(list(ONNX_VARIANTS) if "--all" in sys.argv else None)
     print("Configuración completada.")
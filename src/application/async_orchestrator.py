@@ -0,0 +1,269 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+
+from dataclasses import replace
+
+from src.application.interfaces import AsyncEmbedder, AsyncRetriever
+from src.application.metrics import NULL_METRICS
+from src.application.orchestrator import NO_RESULTS_ANSWER, build_prompt
+from src.domain.models import GenerationMetrics, LLMResponse, SearchResult
+
+
+class AsyncOrchestrator:
+    """
+    Responde preguntas sobre asyncio para atender a muchos usuarios a la vez.
+
+    Embedding, búsqueda y generación se esperan sin bloquear el event loop, de modo que
+    mientras una pregunta espera a Ollama o a Milvus se avanza con las demás. Como mucho
+    `max_concurrency` preguntas están en vuelo; el resto espera su turno en orden de llegada.
+    Los componentes síncronos (p. ej. el embedder ONNX o Milvus Lite) se ejecutan en hilos.
+
+    Args:
+        embedder: AsyncEmbedder, un embedder con `get_embedding_async` o un Embedder síncrono (en un hilo)
+        retriever: AsyncRetriever, o un Retriever síncrono que se ejecutará en un hilo
+        llm_model (str): Modelo LLM de Ollama
+        search_top_k (int): Número de chunks de contexto
+        llm_host (Optional[str]): URL del servidor Ollama para el cliente asíncrono
+        llm_client: `ollama.AsyncClient` ya creado (si no, se crea uno con `llm_host`)
+        max_concurrency (int): Preguntas procesándose a la vez. Defaults to 16.
+        answer_cache: SemanticAnswerCache opcional
+        corpus_version: CorpusVersion opcional para invalidar la caché tras cada ingesta
+        hybrid_retriever: HybridRetriever opcional (búsqueda vectorial + BM25, en un hilo)
+        context_packer: ContextPacker opcional para fusionar y recortar el contexto del prompt
+        metrics: Metrics opcional para los tiempos por etapa y las trazas por pregunta
+    """
+
+    def __init__(
+        self,
+        embedder,
+        retriever,
+        llm_model: str,
+        search_top_k: int,
+        llm_host: Optional[str] = None,
+        llm_client=None,
+        max_concurrency: int = 16,
+        answer_cache=None,
+        corpus_version=None,
+        hybrid_retriever=None,
+        context_packer=None,
+        metrics=None,
+    ):
+        self.embedder = embedder
+        self.retriever = retriever
+        self.llm_model = llm_model
+        self.search_top_k = search_top_k
+        self.llm_host = llm_host
+        self._llm_client = llm_client
+        self.max_concurrency = max(1, max_concurrency)
+        self.answer_cache = answer_cache
+        self.corpus_version = corpus_version
+        self.hybrid_retriever = hybrid_retriever
+        self.context_packer = context_packer
+        self.metrics = metrics or NULL_METRICS
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def llm_client(self):
+        """Cliente asíncrono de Ollama, creado al primer uso"""
+        if self._llm_client is None:
+            import ollama
+
+            self._llm_client = ollama.AsyncClient(host=self.llm_host)
+        return self._llm_client
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Reserva un hueco de concurrencia y lleva la cuenta de preguntas en vuelo y en espera"""
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+            self.completed += 1
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Estado de la concurrencia del servicio"""
+        stats = {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+        if self.answer_cache is not None:
+            stats["answer_cache"] = self.answer_cache.stats()
+        if hasattr(self.embedder, "batching_stats"):
+            stats["query_embedding_batches"] = self.embedder.batching_stats()
+        return stats
+
+    async def _embed_question(self, question: str, trace=None) -> List[float]:
+        with self.metrics.span("embed_question", trace):
+            if isinstance(self.embedder, AsyncEmbedder):
+                return await self.embedder.get_embedding(question)
+            if hasattr(self.embedder, "get_embedding_async"):
+                return await self.embedder.get_embedding_async(question)
+            return await asyncio.to_thread(self.embedder.get_embedding, question)
+
+    async def _retrieve(self, question: str, question_embedding: List[float], trace=None) -> List[SearchResult]:
+        with self.metrics.span("retrieve", trace):
+            if self.hybrid_retriever is not None:
+                return await asyncio.to_thread(
+                    self.hybrid_retriever.search, question, question_embedding, self.search_top_k
+                )
+            if isinstance(self.retriever, AsyncRetriever):
+                return await self.retriever.search(question_embedding, self.search_top_k)
+            return await asyncio.to_thread(self.retriever.search, question_embedding, self.search_top_k)
+
+    def _pack_context(self, results: List[SearchResult]) -> Tuple[List[SearchResult], int]:
+        if self.context_packer is None:
+            return results, 0
+        packed = self.context_packer.pack(results)
+        self.metrics.inc("rag_context_tokens_saved_total", packed.tokens_saved)
+        return packed.results, packed.tokens_saved
+
+    def _finish_trace(self, response: LLMResponse, trace) -> LLMResponse:
+        """Copia de la respuesta con la traza de esta pregunta (la original puede estar en la caché)"""
+        if trace is None:
+            return response
+        return replace(response, trace=trace.to_dict())
+
+    def _current_corpus_version(self) -> str:
+        return self.corpus_version.current() if self.corpus_version is not None else ""
+
+    def _cached_answer(self, question_embedding: List[float]) -> Optional[LLMResponse]:
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.lookup(question_embedding, self._current_corpus_version())
+        if cached is not None:
+            self.metrics.inc("rag_answer_cache_hits_total")
+        return cached
+
+    def _cache_answer(self, question_embedding: List[float], response: LLMResponse):
+        if self.answer_cache is not None:
+            self.answer_cache.store(question_embedding, response, self._current_corpus_version())
+
+    async def ask_question(self, question: str) -> LLMResponse:
+        """Procesa una pregunta y genera una respuesta completa"""
+        async with self._slot():
+            with self.metrics.span("ask_question"):
+                trace = self.metrics.start_trace()
+                return self._finish_trace(await self._answer(question, trace), trace)
+
+    async def _answer(self, question: str, trace) -> LLMResponse:
+        self.metrics.inc("rag_questions_total")
+        question_embedding = await self._embed_question(question, trace)
+        cached = self._cached_answer(question_embedding)
+        if cached is not None:
+            return cached
+
+        results = await self._retrieve(question, question_embedding, trace)
+        if not results:
+            return LLMResponse(answer=NO_RESULTS_ANSWER, source_chunks=[])
+
+        with self.metrics.span("build_context", trace):
+            results, tokens_saved = self._pack_context(results)
+            prompt = build_prompt(question, results)
+        client = self.llm_client
+        started = time.perf_counter()
+        with self.metrics.span("llm_generate", trace):
+            response = await client.chat(model=self.llm_model, messages=[{"role": "user", "content": prompt}])
+        elapsed = time.perf_counter() - started
+
+        metrics = GenerationMetrics.from_ollama(response, time_to_first_token=elapsed, total_time=elapsed)
+        metrics.prompt_tokens_saved = tokens_saved
+        llm_response = LLMResponse(answer=response["message"]["content"], source_chunks=results, metrics=metrics)
+        self._cache_answer(question_embedding, llm_response)
+        return llm_response
+
+    def ask_question_stream(self, question: str) -> "AsyncStreamingAnswer":
+        """Procesa una pregunta y devuelve la respuesta como un flujo asíncrono de tokens
+
+        Returns:
+            AsyncStreamingAnswer: Iterable asíncrono de fragmentos de texto; al agotarse,
+                `response` contiene el LLMResponse completo con las fuentes y sus métricas
+        """
+        return AsyncStreamingAnswer(self, question)
+
+
+class AsyncStreamingAnswer:
+    """
+    Respuesta en streaming de AsyncOrchestrator.
+
+    El trabajo empieza al iterarla con `async for` y ocupa un hueco de concurrencia hasta que
+    termina el flujo. Después, `response` queda con la respuesta completa, las fuentes y las
+    métricas de tiempo.
+    """
+
+    def __init__(self, orchestrator: AsyncOrchestrator, question: str):
+        self.orchestrator = orchestrator
+        self.question = question
+        self.response: Optional[LLMResponse] = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        orchestrator = self.orchestrator
+        metrics_registry = orchestrator.metrics
+        async with orchestrator._slot():
+            metrics_registry.inc("rag_questions_total")
+            trace = metrics_registry.start_trace()
+            question_embedding = await orchestrator._embed_question(self.question, trace)
+            cached = orchestrator._cached_answer(question_embedding)
+            if cached is not None:
+                self.response = orchestrator._finish_trace(cached, trace)
+                yield cached.answer
+                return
+
+            results = await orchestrator._retrieve(self.question, question_embedding, trace)
+            if not results:
+                self.response = LLMResponse(answer=NO_RESULTS_ANSWER, source_chunks=[])
+                yield NO_RESULTS_ANSWER
+                return
+
+            with metrics_registry.span("build_context", trace):
+                results, tokens_saved = orchestrator._pack_context(results)
+                prompt = build_prompt(self.question, results)
+            client = orchestrator.llm_client
+            started = time.perf_counter()
+            stream = await client.chat(
+                model=orchestrator.llm_model, messages=[{"role": "user", "content": prompt}], stream=True
+            )
+
+            parts = []
+            first_token_at = None
+            final_chunk = {}
+            async for chunk in stream:
+                content = chunk["message"]["content"]
+                if content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(content)
+                    yield content
+                if chunk.get("done"):
+                    final_chunk = chunk
+            finished = time.perf_counter()
+
+            metrics = GenerationMetrics.from_ollama(
+                final_chunk,
+                time_to_first_token=(first_token_at or finished) - started,
+                total_time=finished - started,
+            )
+            metrics.prompt_tokens_saved = tokens_saved
+            metrics_registry.observe("rag_llm_first_token_seconds", metrics.time_to_first_token)
+            metrics_registry.record_span("llm_generate", metrics.total_time, trace)
+            response = LLMResponse(answer="".join(parts), source_chunks=results, metrics=metrics)
+            orchestrator._cache_answer(question_embedding, response)
+            self.response = orchestrator._finish_trace(response, trace)
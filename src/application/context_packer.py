@@ -0,0 +1,193 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.domain.models import DocumentChunk, SearchResult
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Estimación barata de tokens a partir de los caracteres (sin el tokenizador del LLM)"""
+    return int(len(text) / chars_per_token + 0.5) if text else 0
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    """Grupos de `size` palabras consecutivas, para comparar textos sin importar espacios ni mayúsculas"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _new_text(previous: str, following: str, overlap: int) -> str:
+    """Parte de `following` que no está ya al final de `previous`
+
+    `overlap` son los caracteres compartidos según start_char/end_char; como los chunks se
+    guardan sin los espacios de los extremos, se busca la coincidencia exacta a su alrededor.
+    """
+    if overlap <= 0:
+        return following
+    if overlap >= len(following) and following in previous:
+        return ""
+    for size in sorted(range(max(1, overlap - 2), overlap + 3), key=lambda size: abs(size - overlap)):
+        if size <= len(following) and previous.endswith(following[:size]):
+            return following[size:]
+    return following
+
+
+@dataclass
+class _Block:
+    """Tramo contiguo de una página formado por uno o varios chunks"""
+
+    chunk: DocumentChunk
+    start: int
+    end: int
+    rank: int
+    similarity: float
+    text: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PackedContext:
+    """Contexto listo para el prompt y el ahorro respecto a concatenar los resultados tal cual"""
+
+    results: List[SearchResult]
+    tokens: int
+    original_tokens: int
+    merged_chunks: int = 0
+    dropped_duplicates: int = 0
+    dropped_over_budget: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+
+class ContextPacker:
+    """
+    Ensambla el contexto del prompt a partir de los resultados de la búsqueda.
+
+    Los chunks de la misma página que se solapan o se tocan (según `start_char`/`end_char`)
+    se fusionan en un solo tramo sin repetir el texto común. Después se descartan los tramos
+    casi idénticos a otros ya elegidos (p. ej. el mismo PDF indexado dos veces) y se llena el
+    presupuesto de tokens por orden de relevancia; un tramo que no cabe se salta para probar
+    con los siguientes.
+
+    Args:
+        token_budget (int): Tokens máximos del contexto (sin contar la plantilla del prompt)
+        count_tokens: Función que cuenta los tokens de un texto. Defaults to estimate_tokens.
+        duplicate_threshold (float): Fracción de grupos de palabras ya presentes a partir de la cual
+            un tramo se considera duplicado. Defaults to 0.9.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        duplicate_threshold: float = 0.9,
+    ):
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or estimate_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+    def _merge_pages(self, results: List[SearchResult]) -> Tuple[List[_Block], int]:
+        """Fusiona los chunks solapados o contiguos de cada página; devuelve los tramos y los chunks absorbidos"""
+        pages: Dict[tuple, List[_Block]] = {}
+        blocks: List[_Block] = []
+        for rank, result in enumerate(results):
+            chunk = result.chunk
+            metadata = chunk.metadata
+            block = _Block(
+                chunk=chunk,
+                start=metadata.get("start_char", -1),
+                end=metadata.get("end_char", -1),
+                rank=rank,
+                similarity=result.similarity,
+                text=chunk.text,
+                chunk_ids=[chunk.chunk_id],
+            )
+            if block.start < 0 or block.end < 0:
+                blocks.append(block)
+            else:
+                pages.setdefault((chunk.doc_id, metadata.get("page")), []).append(block)
+
+        merged = 0
+        for page_blocks in pages.values():
+            page_blocks.sort(key=lambda block: block.start)
+            current = page_blocks[0]
+            for block in page_blocks[1:]:
+                if block.start > current.end:
+                    blocks.append(current)
+                    current = block
+                    continue
+                if block.end > current.end:
+                    addition = _new_text(current.text, block.text, current.end - block.start)
+                    separator = " " if addition and block.start == current.end else ""
+                    current.text = f"{current.text}{separator}{addition}"
+                    current.end = block.end
+                current.chunk_ids.append(block.chunk.chunk_id)
+                if block.rank < current.rank:
+                    current.rank, current.similarity = block.rank, block.similarity
+                merged += 1
+            blocks.append(current)
+
+        blocks.sort(key=lambda block: block.rank)
+        return blocks, merged
+
+    def _to_result(self, block: _Block) -> SearchResult:
+        if len(block.chunk_ids) == 1:
+            return SearchResult(chunk=block.chunk, similarity=block.similarity)
+        metadata = {
+            **block.chunk.metadata,
+            "start_char": block.start,
+            "end_char": block.end,
+            "merged_chunk_ids": block.chunk_ids,
+        }
+        chunk = DocumentChunk(doc_id=block.chunk.doc_id, text=block.text, metadata=metadata, chunk_id=block.chunk_ids[0])
+        return SearchResult(chunk=chunk, similarity=block.similarity)
+
+    def pack(self, results: List[SearchResult]) -> PackedContext:
+        """Fusiona, deduplica y recorta los resultados al presupuesto de tokens
+
+        Args:
+            results (List[SearchResult]): Resultados de la búsqueda, del más al menos relevante
+
+        Returns:
+            PackedContext: Resultados a usar en el prompt (en orden de relevancia) y sus tokens
+        """
+        original_tokens = sum(self.count_tokens(result.chunk.text) for result in results)
+        blocks, merged = self._merge_pages(results)
+
+        selected: List[SearchResult] = []
+        seen: Set[Tuple[str, ...]] = set()
+        tokens = duplicates = over_budget = 0
+        for block in blocks:
+            shingles = _shingles(block.text)
+            if shingles and len(shingles & seen) >= self.duplicate_threshold * len(shingles):
+                duplicates += 1
+                continue
+            block_tokens = self.count_tokens(block.text)
+            if tokens + block_tokens > self.token_budget:
+                if selected:
+                    over_budget += 1
+                    continue
+                # El tramo más relevante se incluye siempre, recortado al presupuesto
+                block.text = block.text[: int(len(block.text) * self.token_budget / block_tokens)]
+                block.chunk = DocumentChunk(
+                    doc_id=block.chunk.doc_id, text=block.text, metadata=block.chunk.metadata, chunk_id=block.chunk.chunk_id
+                )
+                block_tokens = self.count_tokens(block.text)
+            selected.append(self._to_result(block))
+            seen |= shingles
+            tokens += block_tokens
+
+        return PackedContext(
+            results=selected,
+            tokens=tokens,
+            original_tokens=original_tokens,
+            merged_chunks=merged,
+            dropped_duplicates=duplicates,
+            dropped_over_budget=over_budget,
+        )
@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence
+
+from src.domain.models import SearchResult
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[List[SearchResult]], top_k: int, k: int = 60) -> List[SearchResult]:
+    """Fusiona listas ordenadas con RRF: cada chunk suma 1 / (k + posición) en cada lista donde aparece
+
+    La similitud de los resultados pasa a ser la puntuación RRF (comparable entre sí, no con el coseno).
+    """
+    scores: Dict[str, float] = {}
+    chunks = {}
+    for results in ranked_lists:
+        for rank, result in enumerate(results, 1):
+            chunk_id = result.chunk.chunk_id
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(chunk_id, result.chunk)
+    best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [SearchResult(chunk=chunks[chunk_id], similarity=scores[chunk_id]) for chunk_id in best]
+
+
+class HybridRetriever:
+    """
+    Búsqueda híbrida: vectorial (Milvus o numpy) y léxica (BM25) en paralelo, fusionadas con RRF.
+
+    Cada búsqueda pide `candidates` resultados a cada índice y devuelve los `top_k` mejor
+    fusionados. La búsqueda léxica recupera coincidencias exactas (códigos, nombres) que la
+    vectorial ordena mal, lo que permite usar un top-k final más pequeño.
+
+    Args:
+        dense_retriever: Retriever vectorial (`search(vector, top_k)`)
+        lexical_index: Índice léxico (`search(texto, top_k)`), p. ej. BM25Index
+        candidates (int): Resultados pedidos a cada índice antes de fusionar. Defaults to 20.
+        rrf_k (int): Constante de RRF; valores altos suavizan el peso de las primeras posiciones. Defaults to 60.
+    """
+
+    def __init__(self, dense_retriever, lexical_index, candidates: int = 20, rrf_k: int = 60):
+        self.dense_retriever = dense_retriever
+        self.lexical_index = lexical_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.last_timings: Dict[str, float] = {}
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25")
+
+    def close(self):
+        """Detiene los hilos de las búsquedas léxicas"""
+        self._executor.shutdown(wait=True)
+
+    def _timed_lexical(self, question: str, limit: int):
+        started = time.perf_counter()
+        results = self.lexical_index.search(question, limit)
+        return results, time.perf_counter() - started
+
+    def search(self, question: str, vector: List[float], top_k: int) -> List[SearchResult]:
+        """Busca por vector y por texto a la vez y devuelve los top-k fusionados"""
+        limit = max(self.candidates, top_k)
+        lexical_future = self._executor.submit(self._timed_lexical, question, limit)
+        started = time.perf_counter()
+        dense = self.dense_retriever.search(vector, limit)
+        dense_seconds = time.perf_counter() - started
+        lexical, lexical_seconds = lexical_future.result()
+        fused = reciprocal_rank_fusion([dense, lexical], top_k, k=self.rrf_k)
+        self.last_timings = {
+            "dense_ms": dense_seconds * 1000,
+            "lexical_ms": lexical_seconds * 1000,
+            "total_ms": (time.perf_counter() - started) * 1000,
+        }
+        return fused
+
+    def search_batch(self, questions: List[str], vectors, top_k: int) -> List[List[SearchResult]]:
+        """Búsquedas híbridas de varias preguntas: la vectorial en una sola llamada multi-vector
+        (si el retriever la admite) y las léxicas en paralelo mientras tanto"""
+        limit = max(self.candidates, top_k)
+        lexical_futures = [self._executor.submit(self.lexical_index.search, question, limit) for question in questions]
+        if hasattr(self.dense_retriever, "search_batch"):
+            dense = self.dense_retriever.search_batch(vectors, limit)
+        else:
+            dense = [self.dense_retriever.search(vector, limit) for vector in vectors]
+        return [
+            reciprocal_rank_fusion([dense_results, future.result()], top_k, k=self.rrf_k)
+            for dense_results, future in zip(dense, lexical_futures)
+        ]
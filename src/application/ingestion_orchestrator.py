@@ -1,32 +1,60 @@
 import numpy as np
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
 from multiprocessing import Pool, cpu_count
-from typing import List
+from typing import Iterator, List, Optional
 import logging
 from tqdm import tqdm
 import fitz
 import re
 import os
+from src.domain.models import DocumentChunk, make_chunk_id
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def _process_batch_worker(batch_data):
+# Embedder propio de cada proceso worker, creado una sola vez por _init_worker
+_worker_embedder = None
+
+
+def _init_worker(model_name: str, variant: str = "fp32"):
     """
-    Función que se ejecuta en cada proceso worker.
-    Inicializa su propio embedder y procesa un batch.
+    Inicializador de cada proceso del pool.
+    Carga el tokenizer y la sesión ONNX una sola vez para toda la ingesta.
     """
+    global _worker_embedder
     from src.infrastructure.embedding_gpu import GPUEmbeddingGenerator
 
-    batch_texts, model_name = batch_data
-    # Cada worker crea su propia instancia, abriendo su propia conexión a la GPU.
-    embedder = GPUEmbeddingGenerator(model_name=model_name)
+    _worker_embedder = GPUEmbeddingGenerator(model_name=model_name, variant=variant)
+
+
+def _process_batch_worker(batch_texts: List[str]):
+    """
+    Función que se ejecuta en cada proceso worker.
+    Reutiliza el embedder del proceso para procesar un batch.
+    """
     try:
-        return embedder.generate_embeddings(batch_texts)
+        return _worker_embedder.generate_embeddings(batch_texts)
     except Exception as e:
         # Si un worker falla, devolvemos ceros para no romper todo el proceso.
         logger.error(f"Error procesando un batch en un worker: {e}")
-        return np.zeros((len(batch_texts), embedder.get_embedding_dim()))
+        return np.zeros((len(batch_texts), _worker_embedder.get_embedding_dim()))
+
+
+@dataclass
+class _PendingDocument:
+    """Documento con sus embeddings en curso en el pool"""
+
+    file_path: str
+    doc_id: str
+    chunks: List[str]
+    metadata: List[dict]
+    found: List[Optional[np.ndarray]]
+    misses: List[int]
+    results: Optional[Iterator[np.ndarray]]
+    num_batches: int
 
 
 class IngestionOrchestrator:
@@ -42,9 +70,21 @@ class IngestionOrchestrator:
         docs_folder (str): Ruta a la carpeta con documentos PDF
         batch_size (int): Tamaño de lote para procesamiento. Defaults to 64
         num_workers (int): Número de workers para procesamiento paralelo
+        embedding_cache: Caché persistente de embeddings (opcional); solo se calculan los fallos
+        max_pending_documents (int): Documentos con embeddings en curso a la vez. Defaults to 2
+        page_cache: Caché del texto extraído (opcional); los PDFs sin cambios no se vuelven a parsear
     """
 
-    def __init__(self, milvus_store, docs_folder: str, config, num_workers: int = None):
+    def __init__(
+        self,
+        milvus_store,
+        docs_folder: str,
+        config,
+        num_workers: int = None,
+        embedding_cache=None,
+        max_pending_documents: int = 2,
+        page_cache=None,
+    ):
         """
         Inicializa el orquestador de ingesta.
         """
@@ -52,6 +92,27 @@ class IngestionOrchestrator:
         self.milvus_store = milvus_store
         self.config = config
         self.num_workers = num_workers or max(1, cpu_count() - 1)
+        self.embedding_cache = embedding_cache
+        self.max_pending_documents = max(1, max_pending_documents)
+        self.page_cache = page_cache
+        self._pool = None
+
+    @contextmanager
+    def _worker_pool(self):
+        """
+        Pool de workers de larga vida compartido por todos los documentos de la ingesta.
+        Si ya hay uno abierto se reutiliza.
+        """
+        if self._pool is not None:
+            yield self._pool
+            return
+        initargs = (self.config.EMBEDDING_ONNX_MODEL, self.config.EMBEDDING_ONNX_VARIANT)
+        with Pool(self.num_workers, initializer=_init_worker, initargs=initargs) as pool:
+            self._pool = pool
+            try:
+                yield pool
+            finally:
+                self._pool = None
 
     def process_documents(self):
         """
@@ -68,13 +129,22 @@ class IngestionOrchestrator:
             raise FileNotFoundError(f"No se encontraron archivos PDF en {self.docs_folder}")
 
         total_chunks = 0
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(self.docs_folder, pdf_file)
-            chunks_processed = self.process_document(pdf_path)
-            total_chunks += chunks_processed
-            print(f"Procesado {pdf_file} con {chunks_processed} chunks")
+        # Mientras el pool embebe un documento, el proceso principal extrae el siguiente
+        pending = deque()
+        try:
+            with self._worker_pool():
+                for pdf_file in pdf_files:
+                    pending.append(self._submit_document(os.path.join(self.docs_folder, pdf_file)))
+                    if len(pending) >= self.max_pending_documents:
+                        total_chunks += self._finish_document(pending.popleft())
+                while pending:
+                    total_chunks += self._finish_document(pending.popleft())
+        finally:
+            self._flush_embedding_cache()
 
         print(f"Documentos procesados: {len(pdf_files)} \nChunks en total: {total_chunks}")
+        if self.embedding_cache is not None:
+            print(f"Estadísticas de la caché de embeddings: {self.embedding_cache.stats()}")
         return total_chunks
 
     def process_document(self, file_path: str):
@@ -92,29 +162,83 @@ class IngestionOrchestrator:
         """
 
         try:
+            with self._worker_pool():
+                return self._finish_document(self._submit_document(file_path))
+        finally:
+            self._flush_embedding_cache()
+
+    def _flush_embedding_cache(self):
+        """Persiste la caché de embeddings una vez por ejecución en lugar de tras cada documento"""
+        if self.embedding_cache is not None:
+            self.embedding_cache.flush()
+
+    def _submit_document(self, file_path: str) -> _PendingDocument:
+        """
+        Extrae y chunkea un documento y encola sus embeddings en el pool sin esperar el resultado.
+        """
+        try:
+            doc_id = os.path.splitext(os.path.basename(file_path))[0]
             chunks, metadata = self._extract_and_chunk(file_path)
-            embeddings = self._generate_embeddings_parallel(chunks)
-
-            data_to_insert = []
-            chunk_id_counter = 0  # Usamos un contador local para los IDs
-            for chunk_text, meta in zip(chunks, metadata):
-                embedding_vector = embeddings[chunk_id_counter].tolist()
-                data_to_insert.append(
-                    {
-                        "id": chunk_id_counter,
-                        "vector": embedding_vector,
-                        "text": chunk_text[:2000],  # Limitar tamaño de texto por si acaso
-                        "page": meta["page"],
-                        "source": meta["source"],
-                    }
+            if self.embedding_cache is not None and chunks:
+                found, misses = self.embedding_cache.get_many(chunks)
+            else:
+                found, misses = [None] * len(chunks), list(range(len(chunks)))
+            batches = self._make_batches([chunks[i] for i in misses])
+            results = self._pool.imap(_process_batch_worker, batches) if batches else None
+            return _PendingDocument(file_path, doc_id, chunks, metadata, found, misses, results, len(batches))
+        except Exception as e:
+            logger.error(f"Error procesando documento {file_path}: {e}")
+            raise
+
+    def _finish_document(self, pending: _PendingDocument) -> int:
+        """
+        Espera los embeddings de un documento encolado y lo inserta en Milvus.
+
+        Returns:
+            int: Número de chunks del documento
+        """
+        try:
+            found = pending.found
+            if pending.results is not None:
+                computed = np.vstack(
+                    list(
+                        tqdm(
+                            pending.results,
+                            total=pending.num_batches,
+                            desc=f"Embeddings {os.path.basename(pending.file_path)}",
+                        )
+                    )
+                )
+                for i, vector in zip(pending.misses, computed):
+                    found[i] = vector
+                if self.embedding_cache is not None:
+                    self.embedding_cache.put_many([pending.chunks[i] for i in pending.misses], computed)
+            if self.embedding_cache is not None:
+                logger.info(
+                    f"Caché de embeddings: {len(pending.chunks) - len(pending.misses)} aciertos, "
+                    f"{len(pending.misses)} calculados"
                 )
-                chunk_id_counter += 1
 
-            self.milvus_store.insert(data_to_insert, batch_size=100)
-            logger.info(f"Documento: {file_path} - Chunks: {len(chunks)}")
-            return len(chunks)
+            doc_id = pending.doc_id
+            # IDs deterministas (documento, página, posición): reingestar el mismo PDF reemplaza sus filas
+            data_to_insert = [
+                DocumentChunk(
+                    doc_id=doc_id,
+                    text=chunk_text[:2000],  # Limitar tamaño de texto por si acaso
+                    metadata=meta,
+                    chunk_id=make_chunk_id(doc_id, meta["page"], meta["chunk_index"]),
+                    embedding=embedding.tolist(),
+                )
+                for chunk_text, meta, embedding in zip(pending.chunks, pending.metadata, found)
+            ]
+
+            self.milvus_store.delete_documents([doc_id])
+            self.milvus_store.insert(data_to_insert, batch_size=100, upsert=True)
+            logger.info(f"Documento: {pending.file_path} - Chunks: {len(pending.chunks)}")
+            print(f"Procesado {os.path.basename(pending.file_path)} con {len(pending.chunks)} chunks")
+            return len(pending.chunks)
         except Exception as e:
-            logger.error(f"Error procesando documento {file_path}: {e}")
+            logger.error(f"Error procesando documento {pending.file_path}: {e}")
             raise
 
     def _extract_and_chunk(self, file_path: str):
@@ -132,53 +256,49 @@ class IngestionOrchestrator:
         """
         chunks = []
         metadata = []
-        doc = fitz.open(file_path)
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text = page.get_text()
-            if text.strip():
-                text = re.sub(r"\s+", " ", text).replace("\n", " ").strip()
-                start = 0
-                while start < len(text):
-                    end = start + self.config.CHUNK_SIZE
-                    chunk_text = text[start:end].strip()
-                    if chunk_text:
-                        chunks.append(chunk_text)
-                        metadata.append({"page": page_num + 1, "source": os.path.basename(file_path)})
-                    start += self.config.CHUNK_SIZE - self.config.CHUNK_OVERLAP
-        doc.close()
+        for page_num, text in self._page_texts(file_path):
+            start = 0
+            chunk_index = 0
+            while start < len(text):
+                end = start + self.config.CHUNK_SIZE
+                chunk_text = text[start:end].strip()
+                if chunk_text:
+                    chunks.append(chunk_text)
+                    metadata.append({"page": page_num, "source": os.path.basename(file_path), "chunk_index": chunk_index})
+                    chunk_index += 1
+                start += self.config.CHUNK_SIZE - self.config.CHUNK_OVERLAP
         return chunks, metadata
 
-    def _generate_embeddings_parallel(self, texts: List[str]) -> np.ndarray:
+    def _page_texts(self, file_path: str) -> List[tuple]:
         """
-        Genera embeddings en paralelo utilizando múltiples workers.
-
-        Args:
-            embedder: Instancia del generador de embeddings
-            texts (List[str]): Lista de textos a procesar
-
-        Returns:
-            np.ndarray: Array con todos los embeddings generados
+        Texto limpio de las páginas con texto de un PDF: (número de página, texto).
+        Con caché de texto solo se parsea el PDF si su contenido cambió.
         """
+        key = self.page_cache.key(file_path) if self.page_cache is not None else None
+        if key is not None:
+            cached = self.page_cache.get(key)
+            if cached is not None:
+                return cached
 
-        if not texts:
-            return np.array([])
-
-        batches = [
+        pages = []
+        doc = fitz.open(file_path)
+        try:
+            for page_num in range(len(doc)):
+                text = doc.load_page(page_num).get_text()
+                if text.strip():
+                    pages.append((page_num + 1, re.sub(r"\s+", " ", text).replace("\n", " ").strip()))
+        finally:
+            doc.close()
+        if key is not None:
+            self.page_cache.put(key, pages)
+            self.page_cache.save()
+        return pages
+
+    def _make_batches(self, texts: List[str]) -> List[List[str]]:
+        return [
             texts[i : i + self.config.EMBEDDING_BATCH_SIZE]
             for i in range(0, len(texts), self.config.EMBEDDING_BATCH_SIZE)
         ]
-        worker_data = [(batch, self.config.EMBEDDING_ONNX_MODEL) for batch in batches]
-
-        with Pool(self.num_workers) as pool:
-            results = list(
-                tqdm(
-                    pool.imap(_process_batch_worker, worker_data),
-                    total=len(batches),
-                    desc="Generando embeddings en paralelo",
-                )
-            )
-        return np.vstack(results)
 
     def _process_batch(self, args):
         """
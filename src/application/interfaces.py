@@ -10,6 +10,11 @@ class DocumentLoader(ABC):
         """Carga documentos y devuelve una lista de páginas con metadatos"""
         pass
 
+    @abstractmethod
+    def list_files(self) -> List[str]:
+        """Lista las rutas de los documentos disponibles"""
+        pass
+
 
 class TextProcessor(ABC):
     """Interface para procesar y limpiar texto"""
@@ -43,6 +48,15 @@ class Embedder(ABC):
         pass
 
 
+class AsyncEmbedder(ABC):
+    """Interface para generar embeddings sin bloquear el event loop"""
+
+    @abstractmethod
+    async def get_embedding(self, text: str) -> List[float]:
+        """Genera un embedding para un texto dado"""
+        pass
+
+
 class OrchestratorInterface(ABC):
     """Interface para el orquestador"""
 
@@ -94,6 +108,21 @@ class VectorStore(ABC):
         """Inserta datos en la base de datos vectorial"""
         pass
 
+    @abstractmethod
+    def compact(self):
+        """Consolida los datos insertados"""
+        pass
+
+    @abstractmethod
+    def has_collection(self) -> bool:
+        """Indica si la colección ya existe"""
+        pass
+
+    @abstractmethod
+    def delete_documents(self, doc_ids: List[str]):
+        """Elimina todos los chunks de los documentos indicados"""
+        pass
+
 
 class Retriever(ABC):
     """Interface para recuperar información relevante"""
@@ -104,6 +133,15 @@ class Retriever(ABC):
         pass
 
 
+class AsyncRetriever(ABC):
+    """Interface para recuperar información relevante sin bloquear el event loop"""
+
+    @abstractmethod
+    async def search(self, vector: List[float], top_k: int) -> List[Dict]:
+        """Busca los chunks más relevantes para un vector dado"""
+        pass
+
+
 class ResponseGenerator(ABC):
     """Interface para generar respuestas basadas en contexto"""
 
@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Límites (segundos) de los histogramas: de milisegundos en la búsqueda a decenas de segundos en el LLM
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "rag_span_seconds": "Duración de cada etapa instrumentada",
+    "rag_span_errors_total": "Etapas terminadas con excepción",
+    "rag_questions_total": "Preguntas recibidas",
+    "rag_answer_cache_hits_total": "Preguntas respondidas desde la caché semántica",
+    "rag_context_tokens_saved_total": "Tokens de contexto ahorrados al fusionar y recortar chunks",
+    "rag_llm_first_token_seconds": "Tiempo hasta el primer token del LLM",
+    "rag_pages_loaded_total": "Páginas extraídas de los PDFs",
+    "rag_chunks_created_total": "Chunks generados",
+    "rag_chunks_embedded_total": "Chunks embebidos",
+    "rag_vector_insert_batches_total": "Lotes escritos en el almacén vectorial",
+    "rag_vector_inserted_chunks_total": "Chunks escritos en el almacén vectorial",
+    "rag_vector_insert_retries_total": "Reintentos individuales tras un lote fallido",
+    "rag_vector_insert_failed_total": "Chunks que no se pudieron insertar",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _NullSpan:
+    """Span sin efecto que se devuelve con las métricas desactivadas"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "trace", "started")
+
+    def __init__(self, metrics: "Metrics", name: str, trace: Optional["RequestTrace"]):
+        self.metrics = metrics
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record_span(self.name, time.perf_counter() - self.started, self.trace, error=exc_type is not None)
+        return False
+
+
+class RequestTrace:
+    """Etapas de una pregunta concreta, con su inicio y duración relativos al comienzo"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[dict] = []
+
+    def add(self, name: str, seconds: float, error: bool = False):
+        span = {
+            "name": name,
+            "start_ms": round((time.perf_counter() - seconds - self.started) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+        }
+        if error:
+            span["error"] = True
+        self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        return {"total_ms": round((time.perf_counter() - self.started) * 1000, 3), "spans": list(self.spans)}
+
+
+def _labels(labels: dict) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, le: Optional[str] = None) -> str:
+    pairs = list(key) if le is None else [*key, ("le", le)]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """
+    Contadores e histogramas en memoria con exportación en formato de texto de Prometheus.
+
+    `span(nombre)` mide un bloque y lo registra en el histograma `rag_span_seconds`; si se le
+    pasa una RequestTrace, la etapa queda además en la traza de esa pregunta. Con `enabled`
+    a False todas las operaciones retornan de inmediato (los spans son un objeto compartido
+    sin efecto), de modo que la instrumentación puede quedarse en el camino crítico.
+
+    Args:
+        enabled (bool): Registra métricas. Defaults to True.
+        trace_requests (bool): Genera una traza JSON por pregunta (ver `start_trace`). Defaults to False.
+        buckets: Límites en segundos de los histogramas. Defaults to DEFAULT_BUCKETS.
+    """
+
+    def __init__(self, enabled: bool = True, trace_requests: bool = False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.trace_requests = enabled and trace_requests
+        self.buckets = tuple(buckets)
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], list] = {}  # [cuentas por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def span(self, name: str, trace: Optional[RequestTrace] = None):
+        """Context manager que mide el bloque como la etapa `name`"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, trace)
+
+    def record_span(self, name: str, seconds: float, trace: Optional[RequestTrace] = None, error: bool = False):
+        """Registra una etapa medida por fuera de `span` (p. ej. al terminar un streaming)"""
+        if not self.enabled:
+            return
+        self.observe("rag_span_seconds", seconds, span=name)
+        if error:
+            self.inc("rag_span_errors_total", span=name)
+        if trace is not None:
+            trace.add(name, seconds, error)
+
+    def start_trace(self) -> Optional[RequestTrace]:
+        """Traza para una pregunta, o None si las trazas por petición están desactivadas"""
+        return RequestTrace() if self.trace_requests else None
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def render_prometheus(self) -> str:
+        """Todas las métricas en el formato de texto de exposición de Prometheus (0.0.4)"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, [list(value[0]), value[1], value[2]]) for key, value in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name: str, kind: str):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {int(value) if value == int(value) else value}")
+        for (name, labels), (counts, total, count) in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, f'{bound:g}')} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, '+Inf')} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Escribe las métricas de forma atómica (para el textfile collector de node_exporter)"""
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+# Instancia compartida para los componentes sin métricas configuradas
+NULL_METRICS = Metrics(enabled=False)
@@ -7,9 +7,56 @@ from src.application.interfaces import (
     OrchestratorInterface,
 )
 
-from src.domain.models import DocumentChunk, LLMResponse, SearchResult, DocumentPage
+from src.application.metrics import NULL_METRICS
+from src.domain.models import DocumentChunk, LLMResponse, SearchResult, DocumentPage, GenerationMetrics
 
-from typing import List
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Iterator, List, Optional, Tuple, Union
+
+NO_RESULTS_ANSWER = "No encontré información relevante en los documentos para responder a esta pregunta."
+
+
+def build_prompt(question: str, results: List[SearchResult]) -> str:
+    """Arma el prompt con el contexto recuperado"""
+    # Formatear el contexto de una manera muy clara para el LLM
+    context_parts = []
+    for i, result in enumerate(results, 1):
+        source = result.chunk.metadata.get("source", "desconocida")
+        page = result.chunk.metadata.get("page", "?")
+        context_parts.append(f"--- Fuente {i} (Documento: {source}, Pagina: {page}) ---\n{result.chunk.text}")
+    context = "\n".join(context_parts)
+
+    # **PROMPT MEJORADO Y MÁS ESTRICTO**
+    prompt = f"""
+    **Tu Tarea:** Eres un asistente experto que responde preguntas basándose
+    EXCLUSIVAMENTE en el contexto proporcionado de los documentos.
+
+    **REGLAS ESTRICTAS E INQUEBRANTABLES:**
+    1.  **NO PUEDES** usar ningún conocimiento externo.
+        Tu única fuente de verdad es el texto en la sección "CONTEXTO DE LOS DOCUMENTOS".
+    2.  Lee el CONTEXTO cuidadosamente y extrae de él la información necesaria para responder
+        la PREGUNTA DEL USUARIO.
+    3.  Si la respuesta se encuentra en el contexto, formúlala con tus propias palabras,
+        siendo claro y conciso.
+    4.  **Cita tus fuentes OBLIGATORIAMENTE.** Después de cada pieza de información,
+        debes añadir la cita correspondiente, por ejemplo: [Fuente: nombre_del_archivo.pdf, Página: X].
+    5.  Si después de leer todo el contexto, la información para responder la pregunta no se encuentra,
+        debes responder **EXACTAMENTE** con la frase:
+        "La información necesaria para responder a esta pregunta no se encuentra en
+        los documentos proporcionados." No intentes adivinar.
+
+    **CONTEXTO DE LOS DOCUMENTOS:**
+    {context}
+
+    **PREGUNTA DEL USUARIO:**
+    {question}
+
+    **RESPUESTA (basada únicamente en el contexto y citando las fuentes):**
+    """
+    return prompt
 
 
 class Orchestrator(OrchestratorInterface):
@@ -24,6 +71,17 @@ class Orchestrator(OrchestratorInterface):
         vector_store: VectorStore,
         llm_model: str,
         search_top_k: int,
+        manifest=None,
+        pipeline=None,
+        llm_host: Optional[str] = None,
+        llm_client=None,
+        answer_cache=None,
+        corpus_version=None,
+        hybrid_retriever=None,
+        context_packer=None,
+        metrics=None,
+        insert_batch_size: int = 100,
+        query_embedder: Optional[Embedder] = None,
     ):
         self.loader = loader
         self.text_processor = text_processor
@@ -32,82 +90,419 @@ class Orchestrator(OrchestratorInterface):
         self.vector_store = vector_store
         self.llm_model = llm_model
         self.search_top_k = search_top_k
+        self.manifest = manifest
+        self.pipeline = pipeline
+        self.llm_host = llm_host
+        self._llm_client = llm_client
+        self.answer_cache = answer_cache
+        self.corpus_version = corpus_version
+        self.hybrid_retriever = hybrid_retriever
+        self.context_packer = context_packer
+        self.metrics = metrics or NULL_METRICS
+        self.insert_batch_size = insert_batch_size
+        # Embedder de las preguntas; con caché de embeddings, el embedder sin ella (`CachedEmbedder.uncached`)
+        self.query_embedder = query_embedder or embedder
+
+    def _embed_chunks(self, chunks: List[DocumentChunk]):
+        texts = [chunk.text for chunk in chunks]
+        with self.metrics.span("ingest_embed"):
+            embeddings = self.embedder.get_embeddings_batch(texts, batch_size=15)
+        self.metrics.inc("rag_chunks_embedded_total", len(chunks))
 
-    def ingest_documents(self):
-        """Ejecuta el proceso completo de ingesta de documentos"""
-        pages: List[DocumentPage] = self.loader.load()
+        for i, chunk in enumerate(chunks):
+            chunk.embedding = embeddings[i]
+
+    def _file_keys(self, pdf_files: List[str]) -> dict:
+        """Clave estable de cada archivo para el manifiesto: ruta relativa a la carpeta de documentos"""
+        return {os.path.relpath(path, self.loader.docs_folder): path for path in pdf_files}
+
+    def _record_files(self, files: List[tuple]):
+        """Registra en el manifiesto los archivos procesados (salvo los que fallaron al cargarse)"""
+        failed = set(getattr(self.loader, "failed_files", []))
+        for key, path, fingerprint in files:
+            if path not in failed:
+                self.manifest.record(key, fingerprint, self.loader.document_id(path))
+        self.manifest.save()
+
+    def _process_files(self, pdf_files: List[str], upsert: bool = False):
+        """Carga, chunkea, embebe e inserta los PDFs indicados
+
+        Con un pipeline configurado las etapas se solapan en streaming; si no, se ejecutan
+        una tras otra sobre listas completas.
+        """
+        try:
+            if self.pipeline is not None:
+                self.pipeline.run(pdf_files, upsert=upsert)
+                return
+            self._process_files_sequential(pdf_files, upsert)
+        finally:
+            # La caché de embeddings se persiste una vez por ingesta, también si falla a medias
+            if hasattr(self.embedder, "flush"):
+                self.embedder.flush()
+
+    def _process_files_sequential(self, pdf_files: List[str], upsert: bool):
+        with self.metrics.span("ingest_load"):
+            pages: List[DocumentPage] = self.loader.load(pdf_files)
+        self.metrics.inc("rag_pages_loaded_total", len(pages))
         print(f"Páginas cargadas: {len(pages)}")
 
-        chunks: List[DocumentChunk] = self.chunker.chunk(pages)
+        with self.metrics.span("ingest_chunk"):
+            chunks: List[DocumentChunk] = self.chunker.chunk(pages)
+        self.metrics.inc("rag_chunks_created_total", len(chunks))
         print(f"Chunks creados: {len(chunks)}")
 
+        self._embed_chunks(chunks)
+        with self.metrics.span("ingest_insert"):
+            self.vector_store.insert(chunks, batch_size=self.insert_batch_size, upsert=upsert)
+
+    def ingest_documents(self, incremental: bool = False):
+        """Ejecuta el proceso de ingesta de documentos
+
+        Args:
+            incremental (bool): Procesa solo los PDFs nuevos o modificados según el manifiesto.
+                Si el modelo o la dimensión de embedding cambiaron se hace una reconstrucción completa.
+        """
+        if incremental and self.manifest is not None:
+            return self._ingest_incremental()
+
+        pdf_files = self.loader.list_files()
+        if not pdf_files:
+            raise FileNotFoundError(f"No se encontraron archivos PDF en {self.loader.docs_folder}")
+
         self.vector_store.set_collection()
+        with self.metrics.span("ingest"):
+            self._process_files(pdf_files)
 
-        texts = [chunk.text for chunk in chunks]
-        embeddings = self.embedder.get_embeddings_batch(texts, batch_size=15)
+        if self.manifest is not None:
+            self.manifest.reset(self.embedder.model_id, self.embedder.get_embedding_dim())
+            files = [(key, path, self.manifest.fingerprint(path)) for key, path in self._file_keys(pdf_files).items()]
+            self._record_files(files)
 
-        for i, chunk in enumerate(chunks):
-            chunk.embedding = embeddings[i]
+        self._bump_corpus_version()
+        self._print_stats()
+
+    def _ingest_incremental(self):
+        """Sincroniza la colección con la carpeta de documentos procesando solo las diferencias"""
+        model_id = self.embedder.model_id
+        embedding_dim = self.embedder.get_embedding_dim()
+        if not self.manifest.is_compatible(model_id, embedding_dim) or not self.vector_store.has_collection():
+            print("Colección inexistente o modelo/dimensión de embedding distintos: reconstrucción completa.")
+            return self.ingest_documents(incremental=False)
+
+        plan = self.manifest.plan(self._file_keys(self.loader.list_files()))
+        print(
+            f"Sin cambios: {plan.unchanged}, nuevos o modificados: {len(plan.to_process)}, "
+            f"eliminados: {len(plan.removed_keys)}"
+        )
+
+        self.vector_store.delete_documents(plan.stale_doc_ids)
+        for key in plan.removed_keys:
+            self.manifest.forget(key)
+
+        if plan.to_process:
+            with self.metrics.span("ingest"):
+                self._process_files([path for _, path, _ in plan.to_process], upsert=True)
+        elif plan.stale_doc_ids:
+            # Sin inserciones que los persistan, los borrados se confirman aquí
+            self.vector_store.compact()
 
-        self.vector_store.insert(chunks, batch_size=100)
+        self._record_files(plan.to_process)
+        if plan.to_process or plan.stale_doc_ids:
+            self._bump_corpus_version()
+        self._print_stats()
 
+    def _bump_corpus_version(self):
+        # La colección cambió: lo que dependa del corpus anterior queda invalidado
+        if self.corpus_version is not None:
+            self.corpus_version.bump()
+
+    def _print_stats(self):
         stats = self.vector_store.get_stats()
         print(f"Estadísticas de la colección: {stats}")
 
-    def ask_question(self, question: str) -> LLMResponse:
-        """Procesa una pregunta y genera una respuesta"""
+        if hasattr(self.embedder, "cache_stats"):
+            print(f"Estadísticas de la caché de embeddings: {self.embedder.cache_stats()}")
+
+    @property
+    def llm_client(self):
+        """Cliente de Ollama para el LLM, creado al primer uso"""
+        if self._llm_client is None:
+            import ollama
+
+            self._llm_client = ollama.Client(host=self.llm_host)
+        return self._llm_client
+
+    def _embed_question(self, question: str, trace=None) -> List[float]:
         print("1. Generando embedding para la pregunta...")
-        question_embedding = self.embedder.get_embedding(question)
+        with self.metrics.span("embed_question", trace):
+            return self.query_embedder.get_embedding(question)
 
+    def _retrieve(self, question: str, question_embedding: List[float], trace=None) -> List[SearchResult]:
+        """Recupera los chunks más relevantes (búsqueda híbrida si está configurada)"""
         print("2. Buscando en la base de conocimiento...")
-        results: List[SearchResult] = self.vector_store.search(question_embedding, self.search_top_k)
+        with self.metrics.span("retrieve", trace):
+            if self.hybrid_retriever is not None:
+                return self.hybrid_retriever.search(question, question_embedding, self.search_top_k)
+            return self.vector_store.search(question_embedding, self.search_top_k)
+
+    def _retrieve_batch(self, questions: List[str], embeddings: List[List[float]]) -> List[List[SearchResult]]:
+        """Recupera los chunks de varias preguntas con una sola búsqueda multi-vector si el almacén la admite"""
+        if not questions:
+            return []
+        if self.hybrid_retriever is not None:
+            return self.hybrid_retriever.search_batch(questions, embeddings, self.search_top_k)
+        if hasattr(self.vector_store, "search_batch"):
+            return self.vector_store.search_batch(embeddings, self.search_top_k)
+        return [self.vector_store.search(embedding, self.search_top_k) for embedding in embeddings]
+
+    def _pack_context(self, results: List[SearchResult]) -> Tuple[List[SearchResult], int]:
+        """Fusiona y recorta el contexto si hay un ContextPacker; devuelve los resultados y los tokens ahorrados"""
+        if self.context_packer is None or not results:
+            return results, 0
+        packed = self.context_packer.pack(results)
+        self.metrics.inc("rag_context_tokens_saved_total", packed.tokens_saved)
+        print(
+            f"   Contexto: {packed.tokens} tokens, {packed.tokens_saved} ahorrados "
+            f"({packed.merged_chunks} chunks fusionados, {packed.dropped_duplicates} duplicados, "
+            f"{packed.dropped_over_budget} fuera del presupuesto)"
+        )
+        return packed.results, packed.tokens_saved
+
+    def _current_corpus_version(self) -> str:
+        return self.corpus_version.current() if self.corpus_version is not None else ""
+
+    def _cached_answer(self, question_embedding: List[float]) -> Optional[LLMResponse]:
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.lookup(question_embedding, self._current_corpus_version())
+        if cached is not None:
+            self.metrics.inc("rag_answer_cache_hits_total")
+            print("Respuesta encontrada en la caché semántica.")
+        return cached
 
+    def _finish_trace(self, response: LLMResponse, trace) -> LLMResponse:
+        """Copia de la respuesta con la traza de esta pregunta (la original puede estar en la caché)"""
+        if trace is None:
+            return response
+        return replace(response, trace=trace.to_dict())
+
+    def _cache_answer(self, question_embedding: List[float], response: LLMResponse):
+        if self.answer_cache is not None:
+            self.answer_cache.store(question_embedding, response, self._current_corpus_version())
+
+    def _build_prompt(self, question: str, results: List[SearchResult]) -> str:
+        """Arma el prompt con el contexto recuperado"""
+        return build_prompt(question, results)
+
+    def ask_question(self, question: str) -> LLMResponse:
+        """Procesa una pregunta y genera una respuesta"""
+        with self.metrics.span("ask_question"):
+            trace = self.metrics.start_trace()
+            return self._finish_trace(self._answer(question, trace), trace)
+
+    def _answer(self, question: str, trace) -> LLMResponse:
+        self.metrics.inc("rag_questions_total")
+        question_embedding = self._embed_question(question, trace)
+        cached = self._cached_answer(question_embedding)
+        if cached is not None:
+            return cached
+
+        results: List[SearchResult] = self._retrieve(question, question_embedding, trace)
+        return self._generate(question, question_embedding, results, trace)
+
+    def _generate(
+        self, question: str, question_embedding: List[float], results: List[SearchResult], trace, announce: bool = True
+    ) -> LLMResponse:
+        """Arma el contexto, genera la respuesta sin streaming y la guarda en la caché semántica"""
         if not results:
-            return LLMResponse(
-                answer="No encontré información relevante en los documentos para responder a esta pregunta.",
-                source_chunks=[],
-            )
-
-        # Formatear el contexto de una manera muy clara para el LLM
-        context_parts = []
-        for i, result in enumerate(results, 1):
-            source = result.chunk.metadata.get("source", "desconocida")
-            page = result.chunk.metadata.get("page", "?")
-            context_parts.append(f"--- Fuente {i} (Documento: {source}, Pagina: {page}) ---\n{result.chunk.text}")
-        context = "\n".join(context_parts)
-
-        # **PROMPT MEJORADO Y MÁS ESTRICTO**
-        prompt = f"""
-        **Tu Tarea:** Eres un asistente experto que responde preguntas basándose
-        EXCLUSIVAMENTE en el contexto proporcionado de los documentos.
-
-        **REGLAS ESTRICTAS E INQUEBRANTABLES:**
-        1.  **NO PUEDES** usar ningún conocimiento externo.
-            Tu única fuente de verdad es el texto en la sección "CONTEXTO DE LOS DOCUMENTOS".
-        2.  Lee el CONTEXTO cuidadosamente y extrae de él la información necesaria para responder
-            la PREGUNTA DEL USUARIO.
-        3.  Si la respuesta se encuentra en el contexto, formúlala con tus propias palabras,
-            siendo claro y conciso.
-        4.  **Cita tus fuentes OBLIGATORIAMENTE.** Después de cada pieza de información,
-            debes añadir la cita correspondiente, por ejemplo: [Fuente: nombre_del_archivo.pdf, Página: X].
-        5.  Si después de leer todo el contexto, la información para responder la pregunta no se encuentra,
-            debes responder **EXACTAMENTE** con la frase:
-            "La información necesaria para responder a esta pregunta no se encuentra en
-            los documentos proporcionados." No intentes adivinar.
-
-        **CONTEXTO DE LOS DOCUMENTOS:**
-        {context}
-
-        **PREGUNTA DEL USUARIO:**
-        {question}
-
-        **RESPUESTA (basada únicamente en el contexto y citando las fuentes):**
+            return LLMResponse(answer=NO_RESULTS_ANSWER, source_chunks=[])
+
+        with self.metrics.span("build_context", trace):
+            results, tokens_saved = self._pack_context(results)
+            prompt = self._build_prompt(question, results)
+
+        if announce:
+            print("3. Generando respuesta con el LLM...")
+        client = self.llm_client
+        started = time.perf_counter()
+        with self.metrics.span("llm_generate", trace):
+            response = client.chat(model=self.llm_model, messages=[{"role": "user", "content": prompt}])
+        elapsed = time.perf_counter() - started
+
+        answer = response["message"]["content"]
+        # Sin streaming el primer token solo se ve al terminar la generación completa
+        metrics = GenerationMetrics.from_ollama(response, time_to_first_token=elapsed, total_time=elapsed)
+        metrics.prompt_tokens_saved = tokens_saved
+        llm_response = LLMResponse(answer=answer, source_chunks=results, metrics=metrics)
+        self._cache_answer(question_embedding, llm_response)
+        return llm_response
+
+    def _record_batch_stage(self, name: str, started: float, traces: list):
+        """Registra una etapa compartida por un lote de preguntas en las métricas y en la traza de cada una"""
+        seconds = time.perf_counter() - started
+        self.metrics.record_span(name, seconds)
+        for trace in traces:
+            if trace is not None:
+                trace.add(name, seconds, False)
+
+    def ask_questions(
+        self, questions: List[str], max_concurrency: int = 4, return_exceptions: bool = False
+    ) -> List[Union[LLMResponse, Exception]]:
+        """Responde un lote de preguntas (evaluaciones, informes) sin procesarlas una a una
+
+        Los embeddings de todas las preguntas se calculan en una llamada, las que no están en la
+        caché semántica se buscan con una sola consulta multi-vector y las respuestas se generan
+        con hasta `max_concurrency` peticiones simultáneas al LLM.
+
+        Args:
+            questions (List[str]): Preguntas del lote
+            max_concurrency (int): Generaciones simultáneas en el LLM. Defaults to 4.
+            return_exceptions (bool): Devuelve la excepción de cada pregunta fallida en su posición
+                en lugar de propagar la primera. Defaults to False.
+
+        Returns:
+            List: Un LLMResponse (o la excepción, con `return_exceptions`) por pregunta, en el orden de entrada
+        """
+        if not questions:
+            return []
+        self.metrics.inc("rag_questions_total", len(questions))
+        traces = [self.metrics.start_trace() for _ in questions]
+
+        print(f"1. Generando embeddings para {len(questions)} preguntas...")
+        started = time.perf_counter()
+        embeddings = self.query_embedder.get_embeddings_batch(questions, batch_size=len(questions))
+        self._record_batch_stage("embed_question", started, traces)
+
+        responses: List[Union[LLMResponse, Exception, None]] = [self._cached_answer(e) for e in embeddings]
+        pending = [i for i, response in enumerate(responses) if response is None]
+
+        print(f"2. Buscando en la base de conocimiento ({len(pending)} preguntas sin respuesta en caché)...")
+        started = time.perf_counter()
+        retrieved = self._retrieve_batch([questions[i] for i in pending], [embeddings[i] for i in pending])
+        self._record_batch_stage("retrieve", started, [traces[i] for i in pending])
+
+        print(f"3. Generando {len(pending)} respuestas con el LLM ({max_concurrency} a la vez)...")
+        executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="llm")
+        try:
+            futures = {
+                i: executor.submit(self._generate, questions[i], embeddings[i], results, traces[i], False)
+                for i, results in zip(pending, retrieved)
+            }
+            for i, future in futures.items():
+                try:
+                    responses[i] = future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    responses[i] = e
+        finally:
+            # Si una pregunta falla sin return_exceptions, las que aún no empezaron se cancelan
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return [
+            self._finish_trace(response, trace) if isinstance(response, LLMResponse) else response
+            for response, trace in zip(responses, traces)
+        ]
+
+    def ask_question_stream(self, question: str) -> "StreamingAnswer":
+        """Procesa una pregunta y devuelve la respuesta como un flujo de tokens
+
+        Returns:
+            StreamingAnswer: Iterable de fragmentos de texto; al agotarse, `response` contiene
+                el LLMResponse completo con las fuentes y las métricas de la generación
         """
+        self.metrics.inc("rag_questions_total")
+        trace = self.metrics.start_trace()
+        question_embedding = self._embed_question(question, trace)
+        cached = self._cached_answer(question_embedding)
+        if cached is not None:
+            return StreamingAnswer.from_response(self._finish_trace(cached, trace))
+
+        results: List[SearchResult] = self._retrieve(question, question_embedding, trace)
+
+        if not results:
+            return StreamingAnswer(iter(()), results, time.perf_counter())
+
+        with self.metrics.span("build_context", trace):
+            results, tokens_saved = self._pack_context(results)
+            prompt = self._build_prompt(question, results)
 
         print("3. Generando respuesta con el LLM...")
-        import ollama
+        client = self.llm_client
+        started = time.perf_counter()
+        stream = client.chat(
+            model=self.llm_model, messages=[{"role": "user", "content": prompt}], stream=True
+        )
 
-        response = ollama.chat(model=self.llm_model, messages=[{"role": "user", "content": prompt}])
+        def on_complete(response: LLMResponse):
+            response.metrics.prompt_tokens_saved = tokens_saved
+            self._cache_answer(question_embedding, response)
+            self.metrics.observe("rag_llm_first_token_seconds", response.metrics.time_to_first_token)
+            self.metrics.record_span("llm_generate", response.metrics.total_time, trace)
+            if trace is not None:
+                response.trace = trace.to_dict()
 
-        answer = response["message"]["content"]
-        return LLMResponse(answer=answer, source_chunks=results)
+        return StreamingAnswer(stream, results, started, on_complete=on_complete)
+
+
+class StreamingAnswer:
+    """
+    Respuesta del LLM en streaming.
+
+    Al iterarla produce los fragmentos de texto a medida que llegan de Ollama. Cuando el flujo
+    termina, `response` queda con la respuesta completa, las fuentes y sus métricas de tiempo
+    (tiempo hasta el primer token y tokens/s).
+
+    Args:
+        stream: Iterador de respuestas parciales de `ollama.chat(..., stream=True)`
+        sources (List[SearchResult]): Chunks usados como contexto
+        started (float): Instante (perf_counter) en que se envió la petición
+        on_complete: Función opcional que recibe el LLMResponse al terminar el flujo
+    """
+
+    def __init__(self, stream, sources: List[SearchResult], started: float, on_complete=None):
+        self._stream = stream
+        self.sources = sources
+        self.started = started
+        self.on_complete = on_complete
+        self.response: Optional[LLMResponse] = None
+
+    @classmethod
+    def from_response(cls, response: LLMResponse) -> "StreamingAnswer":
+        """Respuesta ya disponible (p. ej. desde caché) que se entrega en un solo fragmento"""
+        answer = cls(iter(()), response.source_chunks, time.perf_counter())
+        answer.response = response
+        return answer
+
+    def __iter__(self) -> Iterator[str]:
+        if self.response is not None:
+            yield self.response.answer
+            return
+
+        if not self.sources:
+            self.response = LLMResponse(answer=NO_RESULTS_ANSWER, source_chunks=[])
+            yield NO_RESULTS_ANSWER
+            return
+
+        parts = []
+        first_token_at = None
+        final_chunk = {}
+        for chunk in self._stream:
+            content = chunk["message"]["content"]
+            if content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(content)
+                yield content
+            if chunk.get("done"):
+                final_chunk = chunk
+        finished = time.perf_counter()
+
+        metrics = GenerationMetrics.from_ollama(
+            final_chunk,
+            time_to_first_token=(first_token_at or finished) - self.started,
+            total_time=finished - self.started,
+        )
+        self.response = LLMResponse(answer="".join(parts), source_chunks=self.sources, metrics=metrics)
+        if self.on_complete is not None:
+            self.on_complete(self.response)
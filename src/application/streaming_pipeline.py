@@ -0,0 +1,231 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src.application.metrics import NULL_METRICS
+from src.domain.models import DocumentChunk
+
+_END = object()  # Marca de fin de flujo entre etapas
+
+
+@dataclass
+class StageStats:
+    """Métricas de una etapa del pipeline"""
+
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    queue_samples: int = 0
+    queue_depth_total: int = 0
+    max_queue_depth: int = 0
+
+    def sample_queue(self, depth: int):
+        self.queue_samples += 1
+        self.queue_depth_total += depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    @property
+    def avg_queue_depth(self) -> float:
+        return self.queue_depth_total / self.queue_samples if self.queue_samples else 0.0
+
+    def as_dict(self, wall_seconds: float) -> dict:
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(self.busy_seconds / wall_seconds, 3) if wall_seconds else 0.0,
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            "avg_queue_depth": round(self.avg_queue_depth, 2),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class StreamingIngestionPipeline:
+    """
+    Ingesta en streaming con memoria acotada.
+
+    Tres etapas concurrentes unidas por colas acotadas: extracción y chunking de PDFs,
+    generación de embeddings e inserción en la base vectorial. Cada cola admite como
+    máximo `queue_size` lotes, por lo que la memoria no depende del tamaño del corpus
+    y la etapa más rápida espera a la más lenta en lugar de acumular trabajo.
+
+    Args:
+        loader: Loader con `iter_pages`
+        chunker: Chunker con `iter_chunks`
+        embedder: Embedder con `get_embeddings_batch`
+        vector_store: Almacén vectorial destino
+        embed_batch_size (int): Chunks por lote enviado al embedder. Defaults to 64.
+        insert_batch_size (int): Chunks por lote insertado. Defaults to 100.
+        queue_size (int): Lotes máximos en cada cola entre etapas. Defaults to 4.
+        metrics: Metrics opcional; registra la duración de cada lote por etapa
+    """
+
+    def __init__(
+        self,
+        loader,
+        chunker,
+        embedder,
+        vector_store,
+        embed_batch_size: int = 64,
+        insert_batch_size: int = 100,
+        queue_size: int = 4,
+        metrics=None,
+    ):
+        self.loader = loader
+        self.chunker = chunker
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.embed_batch_size = embed_batch_size
+        self.insert_batch_size = insert_batch_size
+        self.queue_size = queue_size
+        self.metrics = metrics or NULL_METRICS
+
+    def _put(self, q: queue.Queue, item, stop: threading.Event):
+        """Encola esperando hueco, salvo que otra etapa haya fallado"""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue, stop: threading.Event, stats: StageStats):
+        while not stop.is_set():
+            try:
+                stats.sample_queue(q.qsize())
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _parse_stage(self, pdf_files, out_q, stop, stats: StageStats):
+        batch: List[DocumentChunk] = []
+        batch_seconds = 0.0
+        pages = self.loader.iter_pages(pdf_files)
+        chunks = self.chunker.iter_chunks(pages)
+        while True:
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            batch_seconds += time.perf_counter() - started
+            if chunk is None:
+                break
+            batch.append(chunk)
+            if len(batch) >= self.embed_batch_size:
+                self._record_batch(stats, "ingest_parse", len(batch), batch_seconds)
+                batch_seconds = 0.0
+                if not self._put(out_q, batch, stop):
+                    return
+                batch = []
+        if batch:
+            self._record_batch(stats, "ingest_parse", len(batch), batch_seconds)
+            self._put(out_q, batch, stop)
+
+    def _record_batch(self, stats: StageStats, span: str, items: int, seconds: float):
+        stats.items += items
+        stats.busy_seconds += seconds
+        self.metrics.record_span(span, seconds)
+        if span == "ingest_parse":
+            self.metrics.inc("rag_chunks_created_total", items)
+        elif span == "ingest_embed":
+            self.metrics.inc("rag_chunks_embedded_total", items)
+
+    def _embed_stage(self, in_q, out_q, stop, stats: StageStats):
+        while True:
+            batch = self._get(in_q, stop, stats)
+            if batch is _END:
+                return
+            started = time.perf_counter()
+            embeddings = self.embedder.get_embeddings_batch([chunk.text for chunk in batch], batch_size=15)
+            for chunk, embedding in zip(batch, embeddings):
+                chunk.embedding = embedding
+            self._record_batch(stats, "ingest_embed", len(batch), time.perf_counter() - started)
+            if not self._put(out_q, batch, stop):
+                return
+
+    def _insert_stage(self, in_q, stop, stats: StageStats, upsert: bool):
+        pending: List[DocumentChunk] = []
+        while True:
+            batch = self._get(in_q, stop, stats)
+            if batch is not _END:
+                pending.extend(batch)
+            if pending and (batch is _END or len(pending) >= self.insert_batch_size):
+                started = time.perf_counter()
+                self.vector_store.insert(pending, batch_size=self.insert_batch_size, upsert=upsert, compact=False)
+                self._record_batch(stats, "ingest_insert", len(pending), time.perf_counter() - started)
+                pending = []
+            if batch is _END:
+                return
+
+    def run(self, pdf_files: Optional[List[str]] = None, upsert: bool = False) -> dict:
+        """Ejecuta el pipeline completo y devuelve las métricas por etapa
+
+        Raises:
+            Exception: La primera excepción producida por cualquier etapa
+        """
+        embed_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        insert_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        stats = {name: StageStats(name) for name in ("parse", "embed", "insert")}
+
+        def guarded(target, out_q, *args):
+            try:
+                target(*args)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                # Avisar a la etapa siguiente del fin del flujo
+                if out_q is not None:
+                    self._put(out_q, _END, stop)
+
+        threads = [
+            threading.Thread(
+                target=guarded,
+                args=(self._parse_stage, embed_q, pdf_files, embed_q, stop, stats["parse"]),
+                name="ingest-parse",
+            ),
+            threading.Thread(
+                target=guarded,
+                args=(self._embed_stage, insert_q, embed_q, insert_q, stop, stats["embed"]),
+                name="ingest-embed",
+            ),
+            threading.Thread(
+                target=guarded,
+                args=(self._insert_stage, None, insert_q, stop, stats["insert"], upsert),
+                name="ingest-insert",
+            ),
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+        # La caché de embeddings se persiste una vez por ejecución, no en cada lote
+        if hasattr(self.embedder, "flush"):
+            self.embedder.flush()
+
+        if errors:
+            raise errors[0]
+
+        self.vector_store.compact()
+        report = {name: stage.as_dict(wall_seconds) for name, stage in stats.items()}
+        report["wall_seconds"] = round(wall_seconds, 3)
+        self._print_report(report)
+        return report
+
+    def _print_report(self, report: dict):
+        print(f"\nPipeline de ingesta completado en {report['wall_seconds']} s")
+        print(f"{'Etapa':<8} {'items':>8} {'items/s':>10} {'uso':>6} {'cola media':>11} {'cola máx':>9}")
+        for name in ("parse", "embed", "insert"):
+            stage = report[name]
+            print(
+                f"{name:<8} {stage['items']:>8} {stage['items_per_second']:>10} "
+                f"{stage['utilization']:>6.0%} {stage['avg_queue_depth']:>11} {stage['max_queue_depth']:>9}"
+            )
+        bottleneck = max(("parse", "embed", "insert"), key=lambda name: report[name]["utilization"])
+        print(f"Cuello de botella: {bottleneck}")
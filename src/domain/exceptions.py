@@ -0,0 +1,10 @@
+# src/domain/exceptions.py
+from typing import List, Optional
+
+
+class EmbeddingError(Exception):
+    """Se lanza cuando uno o más textos no pudieron convertirse en embedding tras los reintentos"""
+
+    def __init__(self, message: str, failed_indices: Optional[List[int]] = None):
+        super().__init__(message)
+        self.failed_indices = failed_indices or []
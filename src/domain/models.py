@@ -1,4 +1,5 @@
 # src/domain/models.py
+import hashlib
 from dataclasses import dataclass, field
 from typing import Dict, Any, List, Optional
 from uuid import uuid4
@@ -27,7 +28,50 @@ class SearchResult:
     similarity: float
 
 
+@dataclass
+class GenerationMetrics:
+    """Tiempos de una generación del LLM (segundos)"""
+
+    time_to_first_token: float  # Medido en el cliente desde el envío de la petición
+    total_time: float
+    server_time_to_first_token: float = 0.0  # Carga del modelo + evaluación del prompt según Ollama
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    tokens_per_second: float = 0.0  # output_tokens / eval_duration según Ollama
+    prompt_tokens_saved: int = 0  # Tokens de contexto (estimados) evitados al fusionar y recortar los chunks
+
+    @classmethod
+    def from_ollama(cls, final_chunk, time_to_first_token: float, total_time: float) -> "GenerationMetrics":
+        """Construye las métricas con los campos de tiempo (en ns) de la respuesta final de Ollama"""
+        eval_count = final_chunk.get("eval_count") or 0
+        eval_duration = final_chunk.get("eval_duration") or 0
+        load_duration = final_chunk.get("load_duration") or 0
+        prompt_eval_duration = final_chunk.get("prompt_eval_duration") or 0
+        return cls(
+            time_to_first_token=time_to_first_token,
+            total_time=total_time,
+            server_time_to_first_token=(load_duration + prompt_eval_duration) / 1e9,
+            prompt_tokens=final_chunk.get("prompt_eval_count") or 0,
+            output_tokens=eval_count,
+            tokens_per_second=eval_count / (eval_duration / 1e9) if eval_duration else 0.0,
+        )
+
+
 @dataclass
 class LLMResponse:
     answer: str
     source_chunks: List[SearchResult]
+    metrics: Optional[GenerationMetrics] = None
+    from_cache: bool = False
+    trace: Optional[Dict[str, Any]] = None  # Etapas de la pregunta (solo con trazas por petición activadas)
+
+
+def make_chunk_id(doc_id: str, page_num: int, index: int) -> str:
+    """ID estable de un chunk: mismo documento, página y posición producen el mismo ID"""
+    return f"{doc_id}:p{page_num}:c{index}"
+
+
+def chunk_primary_key(chunk_id: str) -> int:
+    """Clave primaria int64 determinista derivada del chunk_id (hash() de Python cambia entre procesos)"""
+    digest = hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & 0x7FFFFFFFFFFFFFFF
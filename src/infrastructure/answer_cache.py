@@ -0,0 +1,112 @@
+import threading
+import time
+from dataclasses import replace
+from typing import List, Optional
+
+import numpy as np
+
+from src.domain.models import LLMResponse
+
+
+class SemanticAnswerCache:
+    """
+    Caché semántica de respuestas del LLM.
+
+    Guarda el embedding normalizado de cada pregunta respondida en una matriz y, ante una
+    pregunta nueva, calcula la similitud coseno contra todas con un solo producto matricial.
+    Si la más parecida supera el umbral se devuelve su respuesta sin llamar al LLM.
+
+    Las entradas caducan tras `ttl_seconds`; al llenarse se descarta la menos usada. Toda la
+    caché se vacía cuando cambia la versión del corpus (reingesta).
+
+    Args:
+        threshold (float): Similitud coseno mínima para reutilizar una respuesta. Defaults to 0.95.
+        ttl_seconds (float): Vida de cada entrada en segundos. Defaults to 3600.
+        max_entries (int): Número máximo de respuestas guardadas. Defaults to 512.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 512):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_llm_seconds = 0.0
+
+        self._vectors: Optional[np.ndarray] = None
+        self._responses: List[Optional[LLMResponse]] = [None] * max_entries
+        self._created_at = np.full(max_entries, -np.inf)
+        self._last_used = np.full(max_entries, -np.inf)
+        self._corpus_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, corpus_version: str):
+        if corpus_version != self._corpus_version:
+            self.clear()
+            self._corpus_version = corpus_version
+
+    def clear(self):
+        """Elimina todas las respuestas guardadas"""
+        self._vectors = None
+        self._responses = [None] * self.max_entries
+        self._created_at.fill(-np.inf)
+        self._last_used.fill(-np.inf)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question_embedding, corpus_version: str = "") -> Optional[LLMResponse]:
+        """Busca una respuesta para una pregunta semánticamente equivalente
+
+        Returns:
+            Optional[LLMResponse]: Copia de la respuesta guardada (con `from_cache=True`) o None
+        """
+        with self._lock:
+            self._check_version(corpus_version)
+            now = time.monotonic()
+            if self._vectors is not None:
+                similarities = self._vectors @ self._normalize(question_embedding)
+                # Las filas vacías o caducadas no pueden ganar
+                similarities[now - self._created_at > self.ttl_seconds] = -np.inf
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    self._last_used[best] = now
+                    response = self._responses[best]
+                    if response.metrics:
+                        self.saved_llm_seconds += response.metrics.total_time
+                    return replace(response, from_cache=True)
+            self.misses += 1
+            return None
+
+    def store(self, question_embedding, response: LLMResponse, corpus_version: str = ""):
+        """Guarda la respuesta de una pregunta, reemplazando la entrada caducada o menos usada"""
+        if not response.source_chunks:
+            return
+        with self._lock:
+            self._check_version(corpus_version)
+            vector = self._normalize(question_embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            now = time.monotonic()
+            expired = now - self._created_at > self.ttl_seconds
+            slot = int(np.argmax(expired)) if expired.any() else int(np.argmin(self._last_used))
+            self._vectors[slot] = vector
+            self._responses[slot] = response
+            self._created_at[slot] = now
+            self._last_used[slot] = now
+
+    def stats(self) -> dict:
+        """Tasa de aciertos y tiempo de LLM ahorrado"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_llm_seconds": round(self.saved_llm_seconds, 2),
+            "entries": sum(response is not None for response in self._responses),
+        }
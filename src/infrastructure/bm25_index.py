@@ -0,0 +1,370 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.application.interfaces import Retriever, VectorStore
+from src.domain.models import DocumentChunk, SearchResult
+
+INDEX_FILE = "index.json"
+POSTINGS_FILE = "postings.npz"
+DOCS_FILE = "docs.jsonl"
+
+# Palabras con separadores internos (p. ej. "XK-4821", "v2.1") se indexan enteras y por partes
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+TOKEN_SEPARATORS = re.compile(r"[-./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens en minúsculas y sin tildes; los códigos compuestos producen el código y sus partes"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text):
+        tokens.append(token)
+        if TOKEN_SEPARATORS.search(token):
+            tokens.extend(part for part in TOKEN_SEPARATORS.split(token) if part)
+    return tokens
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 en proceso sobre el texto de los chunks.
+
+    Las listas de postings se guardan en formato CSR (offsets por término, filas y
+    frecuencias en arrays contiguos) y se puntúan de forma vectorizada con NumPy. El texto y
+    los metadatos de cada chunk van en un JSONL aparte del que solo se leen los resultados.
+    Se mantiene también el índice directo (términos de cada fila) para poder añadir y
+    eliminar chunks; las filas eliminadas se descartan al guardar.
+
+    Args:
+        path (str): Directorio del índice
+        k1 (float): Saturación de la frecuencia de término. Defaults to 1.5.
+        b (float): Normalización por longitud del chunk. Defaults to 0.75.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.last_build_seconds = 0.0
+        self._lock = threading.Lock()
+        self._reset_state()
+        if self.exists():
+            self._load()
+
+    def _reset_state(self):
+        self._vocab: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._doc_terms: List[np.ndarray] = []
+        self._doc_tfs: List[np.ndarray] = []
+        self._doc_len: List[int] = []
+        self._chunk_ids: List[str] = []
+        self._doc_ids: List[str] = []
+        self._offsets: List[int] = []
+        self._deleted: List[bool] = []
+        self._rows_by_chunk: Dict[str, int] = {}
+        self._inverted = None  # (offsets, filas, frecuencias, longitudes) o None si hay que reconstruirlo
+        self._dirty = False
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, INDEX_FILE)
+
+    @property
+    def _postings_path(self) -> str:
+        return os.path.join(self.path, POSTINGS_FILE)
+
+    @property
+    def _docs_path(self) -> str:
+        return os.path.join(self.path, DOCS_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._index_path)
+
+    def _load(self):
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        arrays = np.load(self._postings_path)
+        self._terms = index["terms"]
+        self._vocab = {term: term_id for term_id, term in enumerate(self._terms)}
+        self._chunk_ids = index["chunk_ids"]
+        self._doc_ids = index["doc_ids"]
+        self._offsets = index["offsets"]
+        self._deleted = [False] * len(self._chunk_ids)
+        self._rows_by_chunk = {chunk_id: row for row, chunk_id in enumerate(self._chunk_ids)}
+        self.last_build_seconds = index.get("build_seconds", 0.0)
+
+        doc_offsets = arrays["doc_offsets"]
+        self._doc_terms = np.split(arrays["doc_terms"], doc_offsets[1:-1])
+        self._doc_tfs = np.split(arrays["doc_tfs"], doc_offsets[1:-1])
+        self._doc_len = arrays["doc_len"].tolist()
+        self._inverted = (arrays["postings_offsets"], arrays["postings_rows"], arrays["postings_tfs"], arrays["doc_len"])
+
+    def reset(self):
+        """Vacía el índice y elimina sus archivos"""
+        with self._lock:
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            os.makedirs(self.path)
+            open(self._docs_path, "wb").close()
+            self._reset_state()
+            self._dirty = True
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._vocab.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._vocab[term] = term_id
+            self._terms.append(term)
+        return term_id
+
+    def _mark_deleted(self, rows):
+        for row in rows:
+            self._deleted[row] = True
+            self._rows_by_chunk.pop(self._chunk_ids[row], None)
+
+    def add(self, chunks: Sequence[DocumentChunk], upsert: bool = False):
+        """Indexa chunks; con `upsert` reemplaza los que ya tengan el mismo chunk_id"""
+        started = time.perf_counter()
+        with self._lock:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+            if upsert:
+                self._mark_deleted(
+                    [self._rows_by_chunk[chunk.chunk_id] for chunk in chunks if chunk.chunk_id in self._rows_by_chunk]
+                )
+            with open(self._docs_path, "ab") as f:
+                for chunk in chunks:
+                    counts = Counter(self._term_id(term) for term in tokenize(chunk.text))
+                    self._doc_terms.append(np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)))
+                    self._doc_tfs.append(np.fromiter(counts.values(), dtype=np.int32, count=len(counts)))
+                    self._doc_len.append(sum(counts.values()))
+                    self._rows_by_chunk[chunk.chunk_id] = len(self._chunk_ids)
+                    self._chunk_ids.append(chunk.chunk_id)
+                    self._doc_ids.append(chunk.doc_id)
+                    self._deleted.append(False)
+                    self._offsets.append(f.tell())
+                    record = {"text": chunk.text, "metadata": chunk.metadata}
+                    f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._inverted = None
+            self._dirty = True
+        self.last_build_seconds += time.perf_counter() - started
+
+    def delete_documents(self, doc_ids: List[str]):
+        """Marca como eliminados los chunks de los documentos indicados"""
+        targets = set(doc_ids)
+        with self._lock:
+            self._mark_deleted(
+                [row for row, doc_id in enumerate(self._doc_ids) if doc_id in targets and not self._deleted[row]]
+            )
+            self._dirty = True
+
+    def _build_inverted(self):
+        """Construye las listas de postings (CSR por término) a partir del índice directo"""
+        lengths = np.array([len(terms) for terms in self._doc_terms], dtype=np.int64)
+        doc_len = np.array(self._doc_len, dtype=np.float32)
+        if not lengths.sum():
+            empty = np.zeros(0, dtype=np.int32)
+            self._inverted = (np.zeros(len(self._terms) + 1, dtype=np.int64), empty, empty, doc_len)
+            return
+        terms = np.concatenate(self._doc_terms)
+        tfs = np.concatenate(self._doc_tfs)
+        rows = np.repeat(np.arange(len(self._doc_terms), dtype=np.int32), lengths)
+        order = np.argsort(terms, kind="stable")
+        offsets = np.zeros(len(self._terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(self._terms)))
+        self._inverted = (offsets, rows[order], tfs[order], doc_len)
+
+    def _compact(self):
+        """Reescribe el JSONL y el índice directo sin las filas eliminadas"""
+        live = [row for row, deleted in enumerate(self._deleted) if not deleted]
+        if len(live) == len(self._deleted):
+            return
+        records = self._read_records(live)
+        tmp_docs = self._docs_path + ".tmp"
+        offsets = []
+        with open(tmp_docs, "wb") as f:
+            for record in records:
+                offsets.append(f.tell())
+                f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        os.replace(tmp_docs, self._docs_path)
+        self._doc_terms = [self._doc_terms[row] for row in live]
+        self._doc_tfs = [self._doc_tfs[row] for row in live]
+        self._doc_len = [self._doc_len[row] for row in live]
+        self._chunk_ids = [self._chunk_ids[row] for row in live]
+        self._doc_ids = [self._doc_ids[row] for row in live]
+        self._offsets = offsets
+        self._deleted = [False] * len(live)
+        self._rows_by_chunk = {chunk_id: row for row, chunk_id in enumerate(self._chunk_ids)}
+        self._inverted = None
+
+    def save(self):
+        """Compacta y persiste el índice (postings, índice directo y claves de cada fila)"""
+        started = time.perf_counter()
+        with self._lock:
+            if not self._dirty:
+                return
+            self._compact()
+            if self._inverted is None:
+                self._build_inverted()
+            postings_offsets, postings_rows, postings_tfs, doc_len = self._inverted
+            doc_offsets = np.zeros(len(self._doc_terms) + 1, dtype=np.int64)
+            doc_offsets[1:] = np.cumsum([len(terms) for terms in self._doc_terms])
+            empty = np.zeros(0, dtype=np.int32)
+            tmp_postings = self._postings_path + ".tmp.npz"
+            np.savez(
+                tmp_postings,
+                postings_offsets=postings_offsets,
+                postings_rows=postings_rows,
+                postings_tfs=postings_tfs,
+                doc_len=doc_len,
+                doc_offsets=doc_offsets,
+                doc_terms=np.concatenate(self._doc_terms) if self._doc_terms else empty,
+                doc_tfs=np.concatenate(self._doc_tfs) if self._doc_tfs else empty,
+            )
+            os.replace(tmp_postings, self._postings_path)
+            self.last_build_seconds += time.perf_counter() - started
+            index = {
+                "k1": self.k1,
+                "b": self.b,
+                "build_seconds": self.last_build_seconds,
+                "terms": self._terms,
+                "chunk_ids": self._chunk_ids,
+                "doc_ids": self._doc_ids,
+                "offsets": self._offsets,
+            }
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+
+    def _read_records(self, rows: Sequence[int]) -> List[dict]:
+        records = []
+        with open(self._docs_path, "rb") as f:
+            for row in rows:
+                f.seek(self._offsets[row])
+                records.append(json.loads(f.readline()))
+        return records
+
+    def search(self, query: str, top_k: int) -> List[SearchResult]:
+        """Devuelve los top-k chunks por puntuación BM25 (solo los que comparten algún término)"""
+        with self._lock:
+            term_ids = {self._vocab[term] for term in tokenize(query) if term in self._vocab}
+            if not term_ids or not self._chunk_ids:
+                return []
+            if self._inverted is None:
+                self._build_inverted()
+            offsets, postings_rows, postings_tfs, doc_len = self._inverted
+
+            total = len(self._chunk_ids)
+            avg_len = float(doc_len.mean()) or 1.0
+            norms = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+            scores = np.zeros(total, dtype=np.float32)
+            for term_id in term_ids:
+                start, end = offsets[term_id], offsets[term_id + 1]
+                if start == end:
+                    continue
+                rows = postings_rows[start:end]
+                tfs = postings_tfs[start:end].astype(np.float32)
+                df = end - start
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norms[rows])
+            if any(self._deleted):
+                scores[np.array(self._deleted)] = 0
+
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")].tolist()
+            records = self._read_records(candidates)
+            return [
+                SearchResult(
+                    chunk=DocumentChunk(
+                        chunk_id=self._chunk_ids[row],
+                        doc_id=self._doc_ids[row],
+                        text=record["text"],
+                        metadata=record["metadata"],
+                    ),
+                    similarity=float(scores[row]),
+                )
+                for row, record in zip(candidates, records)
+            ]
+
+    def stats(self) -> dict:
+        """Tamaño del índice, vocabulario y tiempo de construcción acumulado"""
+        def size(path: str) -> int:
+            return os.path.getsize(path) if os.path.exists(path) else 0
+
+        return {
+            "chunks": len(self._chunk_ids) - sum(self._deleted),
+            "terms": len(self._terms),
+            "postings": int(sum(len(terms) for terms in self._doc_terms)),
+            "index_bytes": size(self._postings_path) + size(self._index_path),
+            "docs_bytes": size(self._docs_path),
+            "build_seconds": round(self.last_build_seconds, 3),
+        }
+
+
+class LexicalIndexedStore(VectorStore, Retriever):
+    """
+    Envuelve un almacén vectorial y mantiene un BM25Index sincronizado con él.
+
+    Toda inserción, borrado o recreación de la colección se aplica también al índice
+    léxico, y `compact()` lo persiste. Así cualquier camino de ingesta (secuencial, en
+    streaming o incremental) lo construye sin cambios. Los demás atributos se delegan.
+
+    Args:
+        store: Almacén vectorial envuelto (MilvusManager o NumpyVectorStore)
+        index (BM25Index): Índice léxico de la misma colección
+    """
+
+    def __init__(self, store, index: BM25Index):
+        self.store = store
+        self.index = index
+
+    def __getattr__(self, name):
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    def set_collection(self):
+        self.store.set_collection()
+        self.index.reset()
+
+    def has_collection(self) -> bool:
+        """La colección solo está completa si también existe su índice léxico"""
+        return self.store.has_collection() and self.index.exists()
+
+    def delete_documents(self, doc_ids: List[str]):
+        if not doc_ids:
+            return
+        self.store.delete_documents(doc_ids)
+        self.index.delete_documents(doc_ids)
+        # Los borrados en el almacén son inmediatos: el índice se persiste aunque no haya inserciones
+        self.index.save()
+
+    def insert(self, chunks: List[DocumentChunk], batch_size: int = 100, upsert: bool = False, compact: bool = True):
+        self.store.insert(chunks, batch_size=batch_size, upsert=upsert, compact=False)
+        self.index.add([chunk for chunk in chunks if chunk.embedding is not None], upsert=upsert)
+        if compact:
+            self.compact()
+
+    def compact(self):
+        self.store.compact()
+        self.index.save()
+
+    def search(self, vector: List[float], top_k: int) -> List[SearchResult]:
+        return self.store.search(vector, top_k)
+
+    def get_stats(self):
+        return {**self.store.get_stats(), "bm25": self.index.stats()}
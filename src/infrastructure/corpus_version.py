@@ -0,0 +1,44 @@
+import os
+import uuid
+from typing import Optional
+
+
+class CorpusVersion:
+    """
+    Sello de versión del corpus ingestado, persistido en un archivo.
+
+    La ingesta lo renueva al terminar; los procesos de chat lo leen para invalidar
+    todo lo que dependa del contenido anterior de la colección (p. ej. la caché de respuestas).
+
+    Args:
+        path (str): Ruta del archivo con el sello
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cached: Optional[str] = None
+        self._cached_mtime: Optional[int] = None
+
+    def current(self) -> str:
+        """Sello actual; solo relee el archivo si cambió su fecha de modificación"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return ""
+        if mtime != self._cached_mtime:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._cached = f.read().strip()
+            self._cached_mtime = mtime
+        return self._cached
+
+    def bump(self) -> str:
+        """Genera y persiste un nuevo sello"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        version = uuid.uuid4().hex
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, self.path)
+        return version
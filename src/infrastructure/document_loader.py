@@ -1,41 +1,227 @@
-import fitz
 import os
-from typing import List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 from glob import glob
 from src.application.interfaces import DocumentLoader
 from src.domain.models import DocumentPage
+from src.infrastructure.page_text_cache import PageTextCache
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extrae el texto de las páginas [start, end) de un PDF. Se ejecuta en un proceso worker."""
+    import fitz
+
+    pages = []
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num in range(start, end):
+            text = doc.load_page(page_num).get_text()
+            if text.strip():
+                pages.append((page_num + 1, text))
+    finally:
+        doc.close()
+    return pages
 
 
 class PdfDocumentLoader(DocumentLoader):
-    """Sabe como leer multiples archivos PDF y extraer su texto por pagina"""
+    """Sabe como leer multiples archivos PDF y extraer su texto por pagina
+
+    Args:
+        docs_folder (str): Carpeta con los PDFs. Defaults to "./docs".
+        recursive (bool): Busca PDFs también en subcarpetas. Defaults to False.
+        num_workers (int): Procesos para extraer texto en paralelo; 1 extrae en el proceso actual. Defaults to 1.
+        pages_per_task (int): Páginas máximas por tarea; los PDFs grandes se reparten en rangos. Defaults to 200.
+        page_cache (Optional[PageTextCache]): Caché del texto extraído; con ella las páginas se devuelven
+            ya limpias y los PDFs sin cambios no se vuelven a parsear
+    """
 
-    def __init__(self, docs_folder: str = "./docs"):
+    def __init__(
+        self,
+        docs_folder: str = "./docs",
+        recursive: bool = False,
+        num_workers: int = 1,
+        pages_per_task: int = 200,
+        page_cache: Optional[PageTextCache] = None,
+    ):
         self.docs_folder = docs_folder
+        self.recursive = recursive
+        self.num_workers = max(1, num_workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.page_cache = page_cache
+        self.failed_files: List[str] = []
         if not os.path.exists(docs_folder):
             os.makedirs(docs_folder)
 
-    def load(self) -> List[DocumentPage]:
-        """Extrae texto de todos los PDFs en la carpeta por pagina con metadatos"""
-        pdf_files = glob(os.path.join(self.docs_folder, "*.pdf"))
+    def list_files(self) -> List[str]:
+        """Lista los PDFs de la carpeta de documentos en orden estable"""
+        if self.recursive:
+            return sorted(glob(os.path.join(self.docs_folder, "**", "*.pdf"), recursive=True))
+        return sorted(glob(os.path.join(self.docs_folder, "*.pdf")))
+
+    def _relative_name(self, pdf_path: str) -> str:
+        return os.path.relpath(pdf_path, self.docs_folder).replace(os.sep, "/")
+
+    def document_id(self, pdf_path: str) -> str:
+        """doc_id de un archivo: su ruta relativa sin extensión (el nombre, si está en la raíz)"""
+        return os.path.splitext(self._relative_name(pdf_path))[0]
+
+    def source_name(self, pdf_path: str) -> str:
+        """Nombre mostrado como fuente: ruta relativa a la carpeta de documentos"""
+        return self._relative_name(pdf_path)
+
+    def iter_pages(self, pdf_files: Optional[List[str]] = None) -> Iterator[DocumentPage]:
+        """Genera las paginas con texto una a una, abriendo un solo PDF a la vez"""
+        if pdf_files is None:
+            pdf_files = self.list_files()
+            if not pdf_files:
+                raise FileNotFoundError(f"No se encontraron archivos PDF en {self.docs_folder}")
+
+        self.failed_files = []
+        if self.page_cache is None:
+            yield from self._extract_pages(pdf_files)
+            return
+        yield from self._iter_pages_cached(pdf_files)
+        self.page_cache.save()
+        print(f"Estadísticas de la caché de texto: {self.page_cache.stats()}")
+
+    def _iter_pages_cached(self, pdf_files: List[str]) -> Iterator[DocumentPage]:
+        """Sirve de la caché los PDFs sin cambios y extrae el resto, respetando el orden de `pdf_files`"""
+        # Primero solo se calculan las claves: el texto en caché se lee archivo a archivo al generarlo
+        entries = []
+        for pdf_path in pdf_files:
+            try:
+                key = self.page_cache.key(pdf_path)
+            except OSError as e:
+                print(f"Error procesando {pdf_path}: {e}")
+                self.failed_files.append(pdf_path)
+                continue
+            entries.append((pdf_path, key, self.page_cache.contains(key)))
+
+        extracted = self._extract_pages([path for path, _, cached in entries if not cached])
+        pending = next(extracted, None)
+
+        def pages_of(doc_id: str) -> Iterator[DocumentPage]:
+            # Las páginas extraídas llegan agrupadas por archivo: se consumen las de este documento
+            nonlocal pending
+            while pending is not None and pending.doc_id == doc_id:
+                yield pending
+                pending = next(extracted, None)
+
+        for pdf_path, key, cached in entries:
+            doc_id = self.document_id(pdf_path)
+            source = self.source_name(pdf_path)
+            if not cached:
+                self.page_cache.misses += 1
+                yield from self._cache_extracted(pdf_path, key, pages_of(doc_id))
+                continue
+            pages = self.page_cache.get(key)
+            if pages is None:
+                # Entrada ilegible: se vuelve a extraer solo este archivo
+                yield from self._cache_extracted(pdf_path, key, self._extract_pages([pdf_path]))
+                continue
+            print(f"Procesando (texto en caché): {source}")
+            for page_num, text in pages:
+                yield DocumentPage(page_num=page_num, text=text, source=source, doc_id=doc_id)
+
+    def _cache_extracted(self, pdf_path: str, key: str, extracted: Iterator[DocumentPage]) -> Iterator[DocumentPage]:
+        """Limpia y devuelve las páginas extraídas de un PDF y las guarda en la caché si no falló"""
+        pages = []
+        for page in extracted:
+            text = self.page_cache.clean(page.text)
+            pages.append((page.page_num, text))
+            yield DocumentPage(page_num=page.page_num, text=text, source=page.source, doc_id=page.doc_id)
+        if pdf_path not in self.failed_files:
+            self.page_cache.put(key, pages)
+
+    def _extract_pages(self, pdf_files: List[str]) -> Iterator[DocumentPage]:
+        """Extrae con PyMuPDF las páginas con texto de los PDFs, en su orden"""
         if not pdf_files:
-            raise FileNotFoundError(f"No se encontraron archivos PDF en {self.docs_folder}")
+            return
+        if self.num_workers > 1:
+            yield from self._iter_pages_parallel(pdf_files)
+            return
+
+        # PyMuPDF se importa solo al leer PDFs: el modo chat no necesita cargarlo
+        import fitz
 
-        all_pages = []
         for pdf_path in pdf_files:
-            print(f"Procesando: {os.path.basename(pdf_path)}")
+            print(f"Procesando: {self.source_name(pdf_path)}")
             try:
                 doc = fitz.open(pdf_path)
-                doc_id = os.path.splitext(os.path.basename(pdf_path))[0]
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    if text.strip():
-                        document_page = DocumentPage(
-                            page_num=page_num + 1, text=text, source=os.path.basename(pdf_path), doc_id=doc_id
-                        )
-                        all_pages.append(document_page)
-                doc.close()
+                doc_id = self.document_id(pdf_path)
+                try:
+                    for page_num in range(len(doc)):
+                        page = doc.load_page(page_num)
+                        text = page.get_text()
+                        if text.strip():
+                            yield DocumentPage(
+                                page_num=page_num + 1, text=text, source=self.source_name(pdf_path), doc_id=doc_id
+                            )
+                finally:
+                    doc.close()
+            except Exception as e:
+                print(f"Error procesando {pdf_path}: {e}")
+                self.failed_files.append(pdf_path)
+
+    def _iter_pages_parallel(self, pdf_files: List[str]) -> Iterator[DocumentPage]:
+        """Extrae en un pool de procesos repartiendo por archivo y por rangos de páginas.
+
+        Solo hay `2 * num_workers` rangos lanzados o pendientes de consumir a la vez, para que la
+        memoria no crezca con el corpus; cada vez que se rellena la ventana se lanzan primero los
+        rangos de los archivos más grandes. Las páginas se devuelven en el orden de `pdf_files` y,
+        si falla cualquier rango de un archivo, el archivo completo se descarta y se registra en
+        `failed_files`.
+        """
+        import fitz
+
+        file_ranges: List[List[Tuple[int, int]]] = []
+        tasks = deque()  # (tamaño en bytes, índice de archivo, inicio, fin) en el orden de consumo
+        for index, pdf_path in enumerate(pdf_files):
+            ranges = []
+            try:
+                with fitz.open(pdf_path) as doc:
+                    page_count = doc.page_count
+                size = os.path.getsize(pdf_path)
+                for start in range(0, page_count, self.pages_per_task):
+                    end = min(page_count, start + self.pages_per_task)
+                    ranges.append((start, end))
+                    tasks.append((size, index, start, end))
             except Exception as e:
                 print(f"Error procesando {pdf_path}: {e}")
+                self.failed_files.append(pdf_path)
+                ranges = None
+            file_ranges.append(ranges)
+
+        window = 2 * self.num_workers
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            futures = {}
+
+            def fill_window():
+                batch = [tasks.popleft() for _ in range(min(len(tasks), window - len(futures)))]
+                for _, index, start, end in sorted(batch, key=lambda task: -task[0]):
+                    futures[(index, start)] = executor.submit(_extract_page_range, pdf_files[index], start, end)
+
+            for index, pdf_path in enumerate(pdf_files):
+                if file_ranges[index] is None:
+                    continue
+                print(f"Procesando: {self.source_name(pdf_path)}")
+                extracted, error = [], None
+                for start, _ in file_ranges[index]:
+                    fill_window()
+                    try:
+                        extracted.extend(futures.pop((index, start)).result())
+                    except Exception as e:
+                        error = error or e
+                if error is not None:
+                    print(f"Error procesando {pdf_path}: {error}")
+                    self.failed_files.append(pdf_path)
+                    continue
+                doc_id = self.document_id(pdf_path)
+                source = self.source_name(pdf_path)
+                for page_num, text in extracted:
+                    yield DocumentPage(page_num=page_num, text=text, source=source, doc_id=doc_id)
 
-        return all_pages
+    def load(self, pdf_files: Optional[List[str]] = None) -> List[DocumentPage]:
+        """Extrae texto por pagina con metadatos de los PDFs indicados (por defecto, de toda la carpeta)"""
+        return list(self.iter_pages(pdf_files))
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import List, Tuple
+
+import numpy as np
+
+from src.application.interfaces import Embedder
+
+
+class MicroBatchingEmbedder(Embedder):
+    """
+    Agrupa las peticiones concurrentes de un solo texto en una única llamada al modelo.
+
+    Cada `get_embedding` encola su texto y espera su Future. Un hilo de fondo toma el primer
+    texto pendiente, espera como mucho `max_wait_ms` a que lleguen más (o hasta reunir
+    `max_batch_size`), ejecuta una sola llamada a `generate_embeddings` y resuelve el Future
+    de cada llamante. Con un único usuario el coste extra es de `max_wait_ms` por pregunta.
+
+    Los demás atributos (p. ej. `model_id`, `get_embedding_dim`) se delegan al embedder envuelto.
+
+    Args:
+        embedder: Embedder envuelto; usa `generate_embeddings` si existe (GPU) o `get_embeddings_batch`
+        max_batch_size (int): Textos máximos por llamada al modelo. Defaults to 32.
+        max_wait_ms (float): Milisegundos máximos que espera el primer texto a que se llene el lote. Defaults to 2.0.
+        latency_window (int): Latencias recientes consideradas en los percentiles. Defaults to 10000.
+    """
+
+    def __init__(self, embedder, max_batch_size: int = 32, max_wait_ms: float = 2.0, latency_window: int = 10000):
+        self.embedder = embedder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: deque = deque()
+        self._condition = threading.Condition()
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._batch_sizes: Counter = Counter()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-microbatcher", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name):
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    def _submit(self, text: str) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatchingEmbedder cerrado")
+            self._pending.append((text, future, time.perf_counter()))
+            self._condition.notify()
+        return future
+
+    def get_embedding(self, text: str) -> List[float]:
+        """Encola el texto y bloquea hasta que su lote se haya calculado"""
+        return self._submit(text).result()
+
+    async def get_embedding_async(self, text: str) -> List[float]:
+        """Como `get_embedding`, pero espera en el event loop sin ocupar un hilo por llamante"""
+        return await asyncio.wrap_future(self._submit(text))
+
+    def get_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """Los lotes ya formados (ingesta) no pasan por el agrupador"""
+        return self.embedder.get_embeddings_batch(texts, batch_size)
+
+    def _compute(self, texts: List[str]) -> List[List[float]]:
+        if hasattr(self.embedder, "generate_embeddings"):
+            return np.asarray(self.embedder.generate_embeddings(texts)).tolist()
+        return self.embedder.get_embeddings_batch(texts, batch_size=len(texts))
+
+    def _next_batch(self) -> List[Tuple[str, Future, float]]:
+        """Espera el primer texto y reúne los que lleguen dentro de la ventana de espera"""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return []
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            count = min(self.max_batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                embeddings = self._compute([text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, enqueued), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+            with self._condition:
+                self._batch_sizes[len(batch)] += 1
+                self._latencies.extend(finished - enqueued for _, _, enqueued in batch)
+
+    def batching_stats(self) -> dict:
+        """Latencia p50/p99 (ms, de encolar a tener el embedding) e histograma de tamaños de lote"""
+        with self._condition:
+            latencies = np.array(self._latencies)
+            histogram = dict(sorted(self._batch_sizes.items()))
+        batches = sum(histogram.values())
+        requests = sum(size * count for size, count in histogram.items())
+        return {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": round(requests / batches, 2) if batches else 0.0,
+            "batch_size_histogram": histogram,
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3) if latencies.size else 0.0,
+            "latency_p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3) if latencies.size else 0.0,
+        }
+
+    def close(self):
+        """Detiene el hilo de fondo después de atender los textos ya encolados"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.application.interfaces import Embedder
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+MIN_ALLOCATED_SLOTS = 1024
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza espacios para que cambios de formato no invaliden la caché"""
+    return " ".join(text.split())
+
+
+def text_key(text: str) -> str:
+    """Hash de contenido del texto normalizado"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Caché persistente de embeddings direccionada por contenido.
+
+    Cada modelo tiene su propio directorio con un archivo de vectores float32 mapeado
+    en memoria (una fila por entrada) y un índice JSON que asocia el hash del texto
+    normalizado con su fila, ordenado de menos a más recientemente usado. Cuando se
+    alcanza el tamaño máximo se reutilizan las filas de las entradas menos usadas (LRU).
+
+    El índice solo se escribe en `flush()`, una vez por ingesta. Si hay que reutilizar filas
+    antes de eso, el índice en disco deja de ser válido y se borra hasta el siguiente `flush()`.
+
+    La caché no está pensada para ser escrita por varios procesos a la vez.
+
+    Args:
+        cache_dir (str): Directorio raíz de la caché
+        model_name (str): Modelo de embeddings; forma parte de la clave
+        max_mb (int): Tamaño máximo del archivo de vectores en MB
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, max_mb: int = 1024):
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        os.makedirs(self.path, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.dim: Optional[int] = None
+        self._allocated = 0
+        self._vectors: Optional[np.memmap] = None
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # clave -> fila, de LRU a MRU
+        self._free_slots: List[int] = []
+        self._dirty = False
+        self._recency_changed = False
+        self._index_removed = False
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, VECTORS_FILE)
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, INDEX_FILE)
+
+    @property
+    def max_entries(self) -> int:
+        return max(1, self.max_bytes // (self.dim * 4)) if self.dim else 0
+
+    def _load(self):
+        """Carga el índice y mapea el archivo de vectores si existen"""
+        if not os.path.exists(self._index_path) or not os.path.exists(self._vectors_path):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self._allocated = index["allocated"]
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r+", shape=(self._allocated, self.dim)
+            )
+            self._entries = OrderedDict((key, slot) for key, slot in index["entries"])
+            used = set(self._entries.values())
+            self._free_slots = [slot for slot in range(self._allocated) if slot not in used]
+        except Exception as e:
+            print(f"Caché de embeddings corrupta en {self.path}, se reinicia: {e}")
+            self.clear()
+
+    def clear(self):
+        """Vacía la caché y elimina sus archivos"""
+        self._vectors = None
+        self._entries.clear()
+        self._free_slots = []
+        self._allocated = 0
+        self.dim = None
+        for path in (self._vectors_path, self._index_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _grow(self, needed: int):
+        """Amplía el archivo de vectores para alojar al menos `needed` filas"""
+        new_allocated = min(self.max_entries, max(MIN_ALLOCATED_SLOTS, self._allocated * 2, needed))
+        if new_allocated <= self._allocated:
+            return
+        if self._vectors is None:
+            mode = "w+"
+        else:
+            self._vectors.flush()
+            self._vectors = None
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(new_allocated * self.dim * 4)
+            mode = "r+"
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(new_allocated, self.dim))
+        self._free_slots.extend(range(self._allocated, new_allocated))
+        self._allocated = new_allocated
+
+    def _take_slot(self) -> int:
+        if not self._free_slots:
+            self._grow(self._allocated + 1)
+        if self._free_slots:
+            return self._free_slots.pop()
+        # Caché llena: se reutiliza la fila de la entrada menos usada. El índice en disco todavía
+        # apunta a esa fila, así que se borra para no servir un vector ajeno si no llega el flush
+        if not self._index_removed and os.path.exists(self._index_path):
+            os.remove(self._index_path)
+            self._index_removed = True
+        _, slot = self._entries.popitem(last=False)
+        self.evictions += 1
+        return slot
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """Busca los embeddings de varios textos.
+
+        Returns:
+            Tuple: (vectores encontrados o None por cada texto, índices de los textos no encontrados)
+        """
+        found: List[Optional[np.ndarray]] = [None] * len(texts)
+        misses: List[int] = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = text_key(text)
+                slot = self._entries.get(key) if self._vectors is not None else None
+                if slot is None:
+                    misses.append(i)
+                    continue
+                self._entries.move_to_end(key)
+                found[i] = np.array(self._vectors[slot])
+            self.hits += len(texts) - len(misses)
+            self.misses += len(misses)
+            if len(misses) < len(texts):
+                self._recency_changed = True  # El orden LRU se persiste en el siguiente flush
+        return found, misses
+
+    def put_many(self, texts: Sequence[str], vectors) -> None:
+        """Guarda los embeddings de varios textos. Los vectores nulos (fallos) no se guardan"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif self.dim != vectors.shape[1]:
+                print(f"Dimensión de embedding cambió ({self.dim} -> {vectors.shape[1]}), se reinicia la caché")
+                self.clear()
+                self.dim = int(vectors.shape[1])
+
+            for text, vector in zip(texts, vectors):
+                if not vector.any():
+                    continue
+                key = text_key(text)
+                slot = self._entries.get(key)
+                if slot is None:
+                    slot = self._take_slot()
+                self._vectors[slot] = vector
+                self._entries[key] = slot
+                self._entries.move_to_end(key)
+            self._dirty = True
+
+    def flush(self):
+        """Persiste los vectores y el índice en disco"""
+        with self._lock:
+            if not (self._dirty or self._recency_changed) or self._vectors is None:
+                return
+            self._vectors.flush()
+            index = {
+                "model": self.model_name,
+                "dim": self.dim,
+                "allocated": self._allocated,
+                "entries": [[key, slot] for key, slot in self._entries.items()],
+            }
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+            self._recency_changed = False
+            self._index_removed = False
+
+    def stats(self) -> dict:
+        """Contadores de uso de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+        }
+
+
+class CachedEmbedder(Embedder):
+    """
+    Envuelve un embedder (Ollama o GPU) y solo calcula los textos que no están en caché.
+
+    Los demás atributos (p. ej. `model_name`, `tokenizer`) se delegan al embedder envuelto.
+    Las preguntas deben embeberse con `uncached`, para no ocupar entradas de la caché de chunks.
+
+    Args:
+        embedder: Embedder a envolver
+        cache (EmbeddingCache): Caché persistente del mismo modelo
+    """
+
+    def __init__(self, embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+
+    def __getattr__(self, name):
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    @property
+    def uncached(self):
+        """Embedder envuelto, sin caché: el que se usa para las preguntas"""
+        return self.embedder
+
+    def get_embedding(self, text: str) -> List[float]:
+        """Las preguntas no se cachean: se delega directamente"""
+        return self.embedder.get_embedding(text)
+
+    def _embed_with_cache(self, texts: List[str], compute) -> np.ndarray:
+        found, misses = self.cache.get_many(texts)
+        if misses:
+            computed = np.asarray(compute([texts[i] for i in misses]), dtype=np.float32)
+            self.cache.put_many([texts[i] for i in misses], computed)
+            for i, vector in zip(misses, computed):
+                found[i] = vector
+        return np.vstack(found)
+
+    def get_embeddings_batch(self, texts: List[str], batch_size: int = 15) -> List[List[float]]:
+        """Genera embeddings calculando solo los fallos de caché"""
+        if not texts:
+            return []
+        return self._embed_with_cache(
+            texts, lambda missing: self.embedder.get_embeddings_batch(missing, batch_size=batch_size)
+        ).tolist()
+
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Variante en array para la interfaz del generador GPU"""
+        if not texts:
+            return np.array([])
+        return self._embed_with_cache(texts, self.embedder.generate_embeddings)
+
+    def get_embedding_dim(self) -> int:
+        return self.embedder.get_embedding_dim()
+
+    def flush(self):
+        """Persiste la caché; se llama una vez al terminar cada ingesta"""
+        self.cache.flush()
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
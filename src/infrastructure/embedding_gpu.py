@@ -1,11 +1,87 @@
 import onnxruntime as ort
 import numpy as np
-from typing import List
-from transformers import AutoTokenizer, AutoModel
-import torch
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
 import os
+import time
 from tqdm import tqdm
 from src.application.interfaces import EmbedderGPUGEnerator
+from src.infrastructure.model_metadata import ModelMetadataStore
+
+# Variantes del modelo ONNX: grafo exportado, grafo optimizado (fusiones) y optimizado + int8 dinámico
+ONNX_VARIANTS = ("fp32", "optimized", "int8")
+
+MAX_LENGTH = 512
+
+# Textos ya tokenizados por el chunker que se conservan a la espera de ser embebidos
+MAX_PRETOKENIZED = 50000
+
+
+class FastTokenizer:
+    """
+    Tokenizador de la librería `tokenizers` con la parte de la interfaz de transformers que usa
+    el generador (llamada con o sin padding y `pad`). Carga en milisegundos sin importar
+    transformers ni torch.
+
+    Los textos registrados con `remember` (p. ej. por TokenChunker, que ya los tokenizó) se
+    toman de ahí la primera vez que se piden en lugar de volver a tokenizarlos.
+
+    Args:
+        tokenizer: `tokenizers.Tokenizer` del modelo
+        pad_token_id (int): Id del token de padding
+        max_length (int): Tokens máximos por texto (se truncan conservando los tokens especiales)
+    """
+
+    def __init__(self, tokenizer, pad_token_id: int, max_length: int = MAX_LENGTH):
+        self.tokenizer = tokenizer
+        self.pad_token_id = pad_token_id
+        self.max_length = max_length
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self._pretokenized: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, text: str, ids: List[int]):
+        """Registra los ids (con tokens especiales) de un texto que se embeberá más adelante"""
+        if len(ids) > self.max_length:
+            return
+        with self._lock:
+            self._pretokenized[text] = ids
+            if len(self._pretokenized) > MAX_PRETOKENIZED:
+                self._pretokenized.popitem(last=False)
+
+    def _encode(self, texts: List[str]) -> List[List[int]]:
+        with self._lock:
+            known = [self._pretokenized.pop(text, None) for text in texts] if self._pretokenized else [None] * len(texts)
+        missing = [i for i, ids in enumerate(known) if ids is None]
+        if missing:
+            for i, encoding in zip(missing, self.tokenizer.encode_batch([texts[i] for i in missing])):
+                known[i] = encoding.ids
+        return known
+
+    def __call__(self, texts: List[str], padding: bool = False, return_tensors: Optional[str] = None, **kwargs) -> dict:
+        input_ids = self._encode(texts)
+        features = {
+            "input_ids": input_ids,
+            "attention_mask": [[1] * len(ids) for ids in input_ids],
+            "token_type_ids": [[0] * len(ids) for ids in input_ids],
+        }
+        if not padding:
+            return features
+        return self.pad([dict(zip(features, values)) for values in zip(*features.values())])
+
+    def pad(self, features: List[dict], padding: bool = True, return_tensors: str = "np") -> dict:
+        """Rellena hasta el texto más largo y devuelve arrays int64 listos para la sesión ONNX"""
+        length = max(len(feature["input_ids"]) for feature in features)
+        padded = {}
+        for key, fill in (("input_ids", self.pad_token_id), ("attention_mask", 0), ("token_type_ids", 0)):
+            array = np.full((len(features), length), fill, dtype=np.int64)
+            for i, feature in enumerate(features):
+                array[i, : len(feature[key])] = feature[key]
+            padded[key] = array
+        return padded
 
 
 class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
@@ -18,27 +94,112 @@ class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
 
     Args:
         model_name (str): Nombre del modelo de embeddings a utilizar
+        token_budget (int): Tokens (con padding) máximos por lote; 0 usa lotes de tamaño fijo
+        max_batch_texts (int): Textos máximos por lote en el modo por presupuesto de tokens
+        variant (str): Variante del modelo ONNX a cargar: "fp32", "optimized" o "int8"
+        metadata (Optional[ModelMetadataStore]): Metadatos persistidos de los modelos
+        tokenizer_workers (int): Hilos que tokenizan los lotes siguientes mientras se infiere el actual
 
     Attributes:
         model_name (str): Nombre del modelo de embeddings
+        model_id (str): Identificador del modelo y su variante (las variantes producen vectores distintos)
         tokenizer: Tokenizer del modelo
         providers (list): Proveedores de ejecución disponibles
         session: Sesión de inferencia ONNX
         embedding_dim (int): Dimensión de los embeddings generados
+        last_batching_stats (dict): Ratio de padding del último lote procesado por presupuesto de tokens
+        last_pipeline_stats (dict): Tiempos de tokenización e inferencia de la última llamada por lotes
     """
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        token_budget: int = 0,
+        max_batch_texts: int = 256,
+        variant: str = "fp32",
+        metadata: Optional[ModelMetadataStore] = None,
+        tokenizer_workers: int = 1,
+    ):
         """
         Inicializa el generador de embeddings con GPU.
 
+        Si el modelo ONNX y el tokenizador ya están en `models/`, no se importan transformers
+        ni torch: solo hacen falta para la primera exportación.
+
         Args:
             model_name (str): Nombre del modelo de embeddings. Defaults to "sentence-transformers/all-MiniLM-L6-v2"
+            token_budget (int): Tokens máximos por lote incluyendo padding. Defaults to 0 (desactivado)
+            max_batch_texts (int): Límite de textos por lote con presupuesto de tokens. Defaults to 256
+            variant (str): Variante ONNX ("fp32", "optimized" o "int8"). Defaults to "fp32"
+            metadata (Optional[ModelMetadataStore]): Dimensión y token de padding guardados. Defaults to None.
+            tokenizer_workers (int): Hilos de tokenización solapada con la inferencia; 0 tokeniza y
+                ejecuta cada lote en secuencia. Defaults to 1 (doble buffer).
+
+        Raises:
+            ValueError: Si la variante no existe
         """
+        if variant not in ONNX_VARIANTS:
+            raise ValueError(f"Variante ONNX desconocida '{variant}'. Opciones: {', '.join(ONNX_VARIANTS)}")
         self.model_name = model_name
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.variant = variant
+        self.model_id = model_name if variant == "fp32" else f"{model_name}:{variant}"
+        self.token_budget = token_budget
+        self.max_batch_texts = max_batch_texts
+        self.tokenizer_workers = max(0, tokenizer_workers)
+        self.last_batching_stats = {}
+        self.last_pipeline_stats = {}
+        self.metadata = metadata
+        self.metadata_key = f"onnx:{model_name}"
+        self.tokenizer = self._load_tokenizer()
         self.providers = self._get_available_providers()
         self.session = self._load_onnx_model()
-        self.embedding_dim = 384
+        self.embedding_dim = self._detect_embedding_dim()
+
+    def _stored_metadata(self) -> dict:
+        return (self.metadata.get(self.metadata_key) if self.metadata is not None else None) or {}
+
+    def _record_metadata(self, **fields):
+        if self.metadata is not None:
+            self.metadata.record(self.metadata_key, **fields)
+
+    def tokenizer_path(self) -> str:
+        """Ruta en `models/` del tokenizador serializado (tokenizer.json)"""
+        return f"models/{self.model_name.replace('/', '_')}.tokenizer.json"
+
+    def _load_tokenizer(self):
+        """
+        Carga el tokenizador desde `models/` con `tokenizers`; la primera vez lo descarga con
+        transformers y guarda su tokenizer.json para los arranques siguientes.
+        """
+        path = self.tokenizer_path()
+        if os.path.exists(path):
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_file(path)
+            pad_token_id = self._stored_metadata().get("pad_token_id")
+            if pad_token_id is None:
+                pad_token_id = tokenizer.token_to_id("[PAD]") or 0
+            return FastTokenizer(tokenizer, pad_token_id)
+
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        if getattr(tokenizer, "is_fast", False):
+            os.makedirs("models", exist_ok=True)
+            tokenizer.backend_tokenizer.save(path)
+            self._record_metadata(pad_token_id=tokenizer.pad_token_id or 0)
+            print(f"Tokenizador guardado en {path}")
+        return tokenizer
+
+    def _detect_embedding_dim(self) -> int:
+        """Dimensión según la forma de salida del grafo, los metadatos guardados o una inferencia de prueba"""
+        dim = self.session.get_outputs()[0].shape[-1]
+        if not isinstance(dim, int):
+            dim = self._stored_metadata().get("embedding_dim")
+        if not isinstance(dim, int):
+            dim = int(self.generate_embeddings(["test"]).shape[1])
+        self._record_metadata(embedding_dim=dim)
+        return dim
 
     def get_embedding(self, text: str) -> List[float]:
         """Genera un embedding para un solo texto."""
@@ -50,16 +211,74 @@ class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
         """
         Genera embeddings para una lista de textos en lotes (batches).
         Esta función ahora es compatible con el Orchestrator.
+
+        Con `token_budget` configurado los lotes se arman por longitud en tokens
+        (ver `generate_embeddings_bucketed`) y `batch_size` se ignora.
         """
+        if self.token_budget:
+            return self.generate_embeddings_bucketed(texts).tolist()
+
+        batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
         all_embeddings = []
-        for i in tqdm(range(0, len(texts), batch_size), desc="Generando embeddings con GPU"):
-            batch = texts[i : i + batch_size]
-            if not batch:
-                continue  # Evita procesar lotes vacíos
-            batch_embeddings = self.generate_embeddings(batch)
+        for _, batch_embeddings in self._pipelined(batches, self._tokenize, "Generando embeddings con GPU"):
             all_embeddings.extend(batch_embeddings.tolist())
         return all_embeddings
 
+    def _tokenize(self, texts: List[str]):
+        return self.tokenizer(texts, padding=True, truncation=True, return_tensors="np", max_length=MAX_LENGTH)
+
+    def _pipelined(self, jobs: Sequence, prepare: Callable, desc: str) -> Iterator[Tuple[object, np.ndarray]]:
+        """
+        Ejecuta la inferencia de cada lote mientras un pool de hilos prepara (tokeniza) los siguientes.
+
+        `prepare(job)` devuelve las entradas con padding de un lote; se mantienen hasta
+        `tokenizer_workers + 1` lotes preparados o en preparación, de modo que el proveedor de
+        ejecución no espera a Python entre lotes (ONNX Runtime y `tokenizers` liberan el GIL).
+        Los lotes se devuelven en orden como (job, embeddings). Al terminar, `last_pipeline_stats`
+        indica el tiempo de cada etapa y qué fracción del total estuvo ocupada la inferencia.
+        """
+        tokenize_seconds = inference_seconds = 0.0
+        started = time.perf_counter()
+
+        def timed_prepare(job):
+            prepare_started = time.perf_counter()
+            inputs = prepare(job)
+            return inputs, time.perf_counter() - prepare_started
+
+        executor = ThreadPoolExecutor(max_workers=self.tokenizer_workers) if self.tokenizer_workers else None
+        try:
+            pending = deque()
+            upcoming = iter(jobs)
+            for job in tqdm(jobs, desc=desc):
+                if executor is None:
+                    inputs, seconds = timed_prepare(job)
+                else:
+                    # Cola de lotes por delante del actual: el que se infiere y los que se tokenizan
+                    while len(pending) <= self.tokenizer_workers:
+                        next_job = next(upcoming, None)
+                        if next_job is None:
+                            break
+                        pending.append(executor.submit(timed_prepare, next_job))
+                    inputs, seconds = pending.popleft().result()
+                tokenize_seconds += seconds
+                inference_started = time.perf_counter()
+                embeddings = self._run_inference(inputs)
+                inference_seconds += time.perf_counter() - inference_started
+                yield job, embeddings
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        wall_seconds = time.perf_counter() - started
+        self.last_pipeline_stats = {
+            "batches": len(jobs),
+            "tokenizer_workers": self.tokenizer_workers,
+            "tokenize_seconds": round(tokenize_seconds, 4),
+            "inference_seconds": round(inference_seconds, 4),
+            "wall_seconds": round(wall_seconds, 4),
+            "inference_utilization": round(inference_seconds / wall_seconds, 4) if wall_seconds else 0.0,
+        }
+
     def _get_available_providers(self):
         """
         Detecta y retorna los proveedores de ejecución disponibles.
@@ -80,6 +299,42 @@ class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
             print("Usando CPU - no se encontraron proveedores GPU")
         return providers
 
+    def model_path(self, variant: str = "fp32") -> str:
+        """Ruta en `models/` del archivo ONNX de una variante"""
+        base = f"models/{self.model_name.replace('/', '_')}"
+        return f"{base}.onnx" if variant == "fp32" else f"{base}.{variant}.onnx"
+
+    def optimized_cache_path(self, model_path: str) -> str:
+        """Ruta del grafo ya optimizado por ONNX Runtime para el proveedor en uso"""
+        provider = self.providers[0].replace("ExecutionProvider", "").lower()
+        return f"{model_path[: -len('.onnx')]}.{provider}.ort.onnx"
+
+    def _create_session(self, model_path: str):
+        """
+        Crea la sesión reutilizando el grafo optimizado que ONNX Runtime guardó en el primer arranque.
+
+        La caché depende del proveedor y se descarta si el modelo original es más reciente.
+        Si no se puede cargar (p. ej. tras actualizar onnxruntime) se regenera.
+        """
+        cache_path = self.optimized_cache_path(model_path)
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(model_path):
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                return ort.InferenceSession(cache_path, sess_options=options, providers=self.providers)
+            except Exception as e:
+                print(f"Grafo optimizado en caché inválido ({e}), regenerándolo...")
+
+        options = ort.SessionOptions()
+        # Por encima de EXTENDED se añaden transformaciones de layout propias del hardware (solo para convoluciones)
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        options.optimized_model_filepath = cache_path
+        try:
+            return ort.InferenceSession(model_path, sess_options=options, providers=self.providers)
+        except Exception as e:
+            print(f"No se pudo guardar el grafo optimizado en {cache_path} ({e}), se optimizará en cada arranque")
+            return ort.InferenceSession(model_path, providers=self.providers)
+
     def _load_onnx_model(self):
         """
         Carga el modelo ONNX desde disco o lo exporta si no existe.
@@ -88,24 +343,63 @@ class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
             Sesión de inferencia ONNX configurada
         """
         os.makedirs("models", exist_ok=True)
-        model_path = f"models/{self.model_name.replace('/', '_')}.onnx"
-        try:
-            session = ort.InferenceSession(model_path, providers=self.providers)
-            print(f"Modelo ONNX cargado desde {model_path}")
-            return session
-        except Exception:
-            print("Modelo ONNX no encontrado, re-exportando desde HuggingFace...")
-            return self._export_and_load_onnx(model_path)
+        model_path = self.model_path(self.variant)
+        if not os.path.exists(model_path):
+            if self.variant == "fp32":
+                print("Modelo ONNX no encontrado, re-exportando desde HuggingFace...")
+            else:
+                print(f"Variante ONNX '{self.variant}' no encontrada, generándola...")
+            self.build_variant(self.variant)
+        session = self._create_session(model_path)
+        print(f"Modelo ONNX cargado desde {model_path}")
+        return session
+
+    def build_variant(self, variant: str) -> str:
+        """
+        Genera (si no existe) la variante indicada a partir del modelo fp32 y la guarda en `models/`.
+
+        - optimized: fusiones de atención, LayerNorm y GELU del optimizador de transformers de ORT.
+        - int8: cuantización dinámica de pesos a int8 sobre el grafo optimizado (pensada para CPU).
+
+        Args:
+            variant (str): "fp32", "optimized" o "int8"
+
+        Returns:
+            str: Ruta del archivo generado
+        """
+        model_path = self.model_path(variant)
+        if os.path.exists(model_path):
+            return model_path
+
+        if variant == "fp32":
+            self._export_onnx(model_path)
+        elif variant == "optimized":
+            from onnxruntime.transformers import optimizer
 
-    def _export_and_load_onnx(self, model_path: str):
+            optimized = optimizer.optimize_model(self.build_variant("fp32"), model_type="bert")
+            optimized.save_model_to_file(model_path)
+            print(f"Modelo optimizado guardado en {model_path}")
+        elif variant == "int8":
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(self.build_variant("optimized"), model_path, weight_type=QuantType.QInt8)
+            print(f"Modelo int8 guardado en {model_path}")
+        return model_path
+
+    def _export_onnx(self, model_path: str):
         """
-        Exporta el modelo HuggingFace a formato ONNX y lo carga.
+        Exporta el modelo HuggingFace a formato ONNX fp32.
 
         Args:
             model_path (str): Ruta donde guardar el modelo exportado
         """
+        # Solo la exportación necesita torch y transformers
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
         model = AutoModel.from_pretrained(self.model_name)
-        dummy_input = self.tokenizer("dummy input", return_tensors="pt", padding=True, truncation=True, max_length=512)
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        dummy_input = tokenizer("dummy input", return_tensors="pt", padding=True, truncation=True, max_length=MAX_LENGTH)
 
         torch.onnx.export(
             model,
@@ -122,7 +416,6 @@ class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
             opset_version=14,
         )
         print(f"Modelo exportado a {model_path}")
-        return ort.InferenceSession(model_path, providers=self.providers)
 
     def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
@@ -137,7 +430,10 @@ class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
         if not texts:
             return np.array([])
 
-        inputs = self.tokenizer(texts, padding=True, truncation=True, return_tensors="np", max_length=512)
+        return self._run_inference(self._tokenize(texts))
+
+    def _run_inference(self, inputs) -> np.ndarray:
+        """Ejecuta la sesión ONNX sobre entradas ya tokenizadas y con padding"""
         ort_inputs = {
             "input_ids": inputs["input_ids"],
             "attention_mask": inputs["attention_mask"],
@@ -147,6 +443,82 @@ class GPUEmbeddingGenerator(EmbedderGPUGEnerator):
         embeddings = self._mean_pooling(outputs, inputs["attention_mask"])
         return embeddings
 
+    @staticmethod
+    def _padding_ratio(lengths: List[int], batches: List[List[int]]) -> float:
+        """Fracción de tokens de padding al rellenar cada lote hasta su texto más largo"""
+        padded = sum(max(lengths[i] for i in batch) * len(batch) for batch in batches)
+        return 1 - sum(lengths) / padded if padded else 0.0
+
+    def plan_token_batches(self, lengths: List[int], token_budget: int) -> List[List[int]]:
+        """
+        Agrupa índices de textos ordenados por longitud de modo que cada lote,
+        con padding, no supere `token_budget` tokens (un texto solo siempre cabe).
+
+        Args:
+            lengths (List[int]): Longitud en tokens de cada texto
+            token_budget (int): Tokens máximos por lote contando el padding
+
+        Returns:
+            List[List[int]]: Lotes de índices sobre la lista original
+        """
+        batches, current = [], []
+        for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            # Al estar ordenado, el texto actual es el más largo del lote y fija el padding
+            if current and (lengths[i] * (len(current) + 1) > token_budget or len(current) >= self.max_batch_texts):
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+        return batches
+
+    def generate_embeddings_bucketed(
+        self, texts: List[str], token_budget: int = None, baseline_batch_size: int = 32
+    ) -> np.ndarray:
+        """
+        Genera embeddings agrupando textos de longitud parecida en lotes limitados por tokens.
+
+        Cada texto se tokeniza una sola vez; cada lote se rellena solo hasta su texto más largo
+        (en el pool de tokenización, solapado con la inferencia del lote anterior) y los
+        resultados se devuelven en el orden original. El ratio de padding frente a lotes
+        fijos en orden del documento queda en `last_batching_stats`.
+
+        Args:
+            texts (List[str]): Lista de textos a procesar
+            token_budget (int): Tokens máximos por lote. Por defecto el configurado en la instancia
+            baseline_batch_size (int): Tamaño de los lotes fijos con los que se compara el padding
+
+        Returns:
+            np.ndarray: Array con los embeddings en el orden de `texts`
+        """
+        if not texts:
+            return np.array([])
+        token_budget = token_budget or self.token_budget or 8192
+
+        encodings = self.tokenizer(texts, truncation=True, max_length=MAX_LENGTH)
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+        batches = self.plan_token_batches(lengths, token_budget)
+
+        def pad(batch: List[int]):
+            features = [{key: encodings[key][i] for key in encodings.keys()} for i in batch]
+            return self.tokenizer.pad(features, padding=True, return_tensors="np")
+
+        embeddings = None
+        for batch, batch_embeddings in self._pipelined(batches, pad, "Generando embeddings por presupuesto de tokens"):
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=batch_embeddings.dtype)
+            embeddings[batch] = batch_embeddings
+
+        fixed_batches = [
+            list(range(i, min(i + baseline_batch_size, len(texts)))) for i in range(0, len(texts), baseline_batch_size)
+        ]
+        self.last_batching_stats = {
+            "batches": len(batches),
+            "padding_ratio_fixed": round(self._padding_ratio(lengths, fixed_batches), 4),
+            "padding_ratio_bucketed": round(self._padding_ratio(lengths, batches), 4),
+        }
+        return embeddings
+
     def _mean_pooling(self, model_output, attention_mask):
         """
         Aplica pooling promedio a las salidas del modelo.
@@ -1,52 +1,174 @@
 import ollama
-from typing import List
+import httpx
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
 from tqdm import tqdm
 import time
-from src.application.interfaces import Embedder
+from src.application.interfaces import AsyncEmbedder, Embedder
+from src.domain.exceptions import EmbeddingError
+from src.infrastructure.model_metadata import ModelMetadataStore
+
+MAX_INPUT_CHARS = 4000
 
 
 class OllamaEmbeddingManager(Embedder):
     """Sabe cómo generar embeddings usando Ollama."""
 
-    def __init__(self, model_name: str):
+    def __init__(
+        self,
+        model_name: str,
+        host: Optional[str] = None,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        metadata: Optional[ModelMetadataStore] = None,
+    ):
+        """Inicializa el cliente de Ollama con un pool de conexiones compartido.
+
+        La dimensión no se averigua aquí: se lee de `metadata` o, la primera vez, con una
+        llamada al modelo cuando alguien la pide (ver `get_embedding_dim`).
+
+        Args:
+            model_name (str): Modelo de embeddings de Ollama
+            host (Optional[str]): URL del servidor Ollama. Por defecto usa OLLAMA_HOST o localhost
+            max_concurrency (int): Número máximo de peticiones simultáneas a Ollama. Defaults to 4.
+            max_retries (int): Reintentos por petición antes de reportar el fallo. Defaults to 3.
+            metadata (Optional[ModelMetadataStore]): Metadatos persistidos de los modelos. Defaults to None.
+        """
         self.model_name = model_name
-        self.embedding_dim = len(self.get_embedding("test"))
+        self.model_id = model_name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        # Un solo cliente (thread-safe) reutiliza las conexiones keep-alive entre hilos
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self.client = ollama.Client(host=host, limits=limits)
+        self.metadata = metadata
+        self.metadata_key = f"ollama:{model_name}"
+        stored = metadata.get(self.metadata_key) if metadata is not None else None
+        self.embedding_dim: Optional[int] = stored.get("embedding_dim") if stored else None
+        self._dim_verified = False
 
-    def get_embedding(self, text: str):
-        """Genera embeddings para el texto usando ollama"""
-        truncated_text = text[:4000]
-        max_retries = 3
+    def _embed_with_retries(self, inputs, max_retries: int):
+        """Llama al endpoint /api/embed con backoff exponencial entre intentos"""
         retry_delay = 1  # segundos
-
         for attempt in range(max_retries):
             try:
-                response = ollama.embeddings(model=self.model_name, prompt=truncated_text)
-                return response["embedding"]
+                response = self.client.embed(model=self.model_name, input=inputs)
+                embeddings = [list(vector) for vector in response["embeddings"]]
+                if not self._dim_verified and embeddings:
+                    self._check_dim(len(embeddings[0]))
+                return embeddings
             except Exception as e:
                 if attempt < max_retries - 1:
                     print(f"Intento {attempt + 1} fallido, reintentando en {retry_delay} segundos...")
                     time.sleep(retry_delay)
                     retry_delay *= 2  # Backoff exponencial
                 else:
-                    print(f"Error generando embedding después de {max_retries} intentos: {e}")
+                    raise EmbeddingError(f"Error generando embedding después de {max_retries} intentos: {e}") from e
+
+    def get_embedding(self, text: str) -> List[float]:
+        """Genera embeddings para el texto usando ollama
 
-                    return [0.0] * self.embedding_dim
+        Raises:
+            EmbeddingError: Si todos los reintentos fallan
+        """
+        return self._embed_with_retries(text[:MAX_INPUT_CHARS], self.max_retries)[0]
+
+    def _embed_batch(self, batch: List[str]) -> Tuple[List[Optional[List[float]]], List[int]]:
+        """Embebe un lote con una sola petición; si falla, reintenta cada texto por separado.
+
+        Returns:
+            Tuple: (embeddings del lote, índices locales que fallaron definitivamente)
+        """
+        try:
+            return self._embed_with_retries(batch, max_retries=1), []
+        except EmbeddingError as e:
+            print(f"Lote de {len(batch)} textos fallido ({e}), reintentando item por item...")
+
+        embeddings, failed = [], []
+        for i, text in enumerate(batch):
+            try:
+                embeddings.append(self.get_embedding(text))
+            except EmbeddingError as e:
+                print(f"Texto {i} del lote descartado: {e}")
+                embeddings.append(None)
+                failed.append(i)
+        return embeddings, failed
 
     def get_embeddings_batch(self, texts: List[str], batch_size: int = 15) -> List[List[float]]:
-        """Genera embeddings para múltiples textos de manera eficiente"""
-        embeddings = []
+        """Genera embeddings para múltiples textos de manera eficiente
 
-        # Procesar en lotes con delays - no saturar ollama
-        for i in tqdm(range(0, len(texts), batch_size), desc="Generando embeddings por lotes"):
-            batch = texts[i : i + batch_size]
-            batch_embeddings = []
+        Cada lote se envía en una sola petición al endpoint multi-input de Ollama y se mantienen
+        hasta `max_concurrency` peticiones en vuelo. El resultado conserva el orden de entrada.
 
-            for text in batch:
-                embedding = self.get_embedding(text)
-                batch_embeddings.append(embedding)
+        Raises:
+            EmbeddingError: Si algún texto no pudo embeberse; `failed_indices` indica cuáles
+        """
+        if not texts:
+            return []
 
-            embeddings.extend(batch_embeddings)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        failed_indices: List[int] = []
 
-            time.sleep(0.3)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {
+                executor.submit(self._embed_batch, [text[:MAX_INPUT_CHARS] for text in texts[i : i + batch_size]]): i
+                for i in range(0, len(texts), batch_size)
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Generando embeddings por lotes"):
+                start = futures[future]
+                batch_embeddings, batch_failed = future.result()
+                embeddings[start : start + len(batch_embeddings)] = batch_embeddings
+                failed_indices.extend(start + i for i in batch_failed)
 
+        if failed_indices:
+            raise EmbeddingError(
+                f"No se pudieron generar {len(failed_indices)} de {len(texts)} embeddings",
+                failed_indices=sorted(failed_indices),
+            )
         return embeddings
+
+    def _check_dim(self, dim: int):
+        """Contrasta la dimensión guardada con la del primer embedding real y la persiste"""
+        if self.embedding_dim is not None and self.embedding_dim != dim:
+            print(
+                f"Aviso: el modelo {self.model_name} devuelve embeddings de dimensión {dim}, "
+                f"no {self.embedding_dim} como indicaban los metadatos guardados"
+            )
+        self.embedding_dim = dim
+        self._dim_verified = True
+        if self.metadata is not None:
+            self.metadata.record(self.metadata_key, embedding_dim=dim)
+
+    def get_embedding_dim(self) -> int:
+        """Retorna la dimensión de los embeddings (con una llamada al modelo solo si no está guardada)"""
+        if self.embedding_dim is None:
+            self.get_embedding("test")
+        return self.embedding_dim
+
+
+class AsyncOllamaEmbeddingManager(AsyncEmbedder):
+    """Genera embeddings de consultas con `ollama.AsyncClient` para el modo servidor.
+
+    Args:
+        model_name (str): Modelo de embeddings de Ollama
+        host (Optional[str]): URL del servidor Ollama. Por defecto usa OLLAMA_HOST o localhost
+        max_connections (int): Conexiones HTTP simultáneas hacia Ollama. Defaults to 16.
+    """
+
+    def __init__(self, model_name: str, host: Optional[str] = None, max_connections: int = 16):
+        self.model_name = model_name
+        self.model_id = model_name
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = ollama.AsyncClient(host=host, limits=limits)
+
+    async def get_embedding(self, text: str) -> List[float]:
+        """Genera el embedding de un texto sin bloquear el event loop
+
+        Raises:
+            EmbeddingError: Si Ollama no devuelve el embedding
+        """
+        try:
+            response = await self.client.embed(model=self.model_name, input=text[:MAX_INPUT_CHARS])
+        except Exception as e:
+            raise EmbeddingError(f"Error generando embedding: {e}") from e
+        return list(response["embeddings"][0])
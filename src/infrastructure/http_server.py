@@ -0,0 +1,213 @@
+"""
+Servidor HTTP/1.1 mínimo sobre asyncio para el modo `--serve`.
+
+Endpoints:
+    POST /ask         {"question": "..."} -> respuesta completa en JSON
+    POST /ask/stream  {"question": "..."} -> NDJSON: {"token": ...} por fragmento y al final {"done": true, ...}
+    GET  /health      -> estado del servicio (preguntas en vuelo, en espera, caché)
+    GET  /metrics     -> métricas en formato de texto de Prometheus
+
+Usa solo la biblioteca estándar; las conexiones se mantienen abiertas (keep-alive) entre peticiones.
+"""
+
+import asyncio
+import json
+from dataclasses import asdict
+from typing import Optional
+
+from src.domain.models import LLMResponse
+
+MAX_BODY_BYTES = 1024 * 1024
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def response_to_dict(response: LLMResponse) -> dict:
+    """Serializa un LLMResponse con sus fuentes y métricas"""
+    return {
+        "answer": response.answer,
+        "from_cache": response.from_cache,
+        "sources": [
+            {
+                "source": result.chunk.metadata.get("source"),
+                "page": result.chunk.metadata.get("page"),
+                "doc_id": result.chunk.doc_id,
+                "chunk_id": result.chunk.chunk_id,
+                "similarity": result.similarity,
+            }
+            for result in response.source_chunks
+        ],
+        "metrics": asdict(response.metrics) if response.metrics else None,
+        **({"trace": response.trace} if response.trace is not None else {}),
+    }
+
+
+class RAGHttpServer:
+    """
+    Expone un AsyncOrchestrator por HTTP.
+
+    Args:
+        orchestrator (AsyncOrchestrator): Servicio que responde las preguntas
+        host (str): Interfaz de escucha. Defaults to "127.0.0.1".
+        port (int): Puerto; 0 elige uno libre. Defaults to 8000.
+    """
+
+    def __init__(self, orchestrator, host: str = "127.0.0.1", port: int = 8000):
+        self.orchestrator = orchestrator
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        print(f"Servidor RAG escuchando en http://{self.host}:{self.port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    # No se leyó el cuerpo: la conexión no puede reutilizarse
+                    await self._send_json(writer, {"error": str(e)}, status=e.status)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    await self._dispatch(method, path, body, writer)
+                except HttpError as e:
+                    await self._send_json(writer, {"error": str(e)}, status=e.status)
+                except Exception as e:
+                    print(f"Error atendiendo {method} {path}: {e}")
+                    await self._send_json(writer, {"error": str(e)}, status=500)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Lee una petición; devuelve None si el cliente cerró la conexión"""
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "línea de petición inválida")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "cabecera Content-Length inválida")
+        if length < 0:
+            raise HttpError(400, "cabecera Content-Length inválida")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "cuerpo de la petición demasiado grande")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        if path == "/health":
+            if method != "GET":
+                raise HttpError(405, "usa GET")
+            await self._send_json(writer, {"status": "ok", **self.orchestrator.stats()})
+        elif path == "/metrics":
+            if method != "GET":
+                raise HttpError(405, "usa GET")
+            body = self.orchestrator.metrics.render_prometheus().encode("utf-8")
+            await self._send(writer, body, PROMETHEUS_CONTENT_TYPE)
+        elif path == "/ask":
+            question = self._parse_question(method, body)
+            response = await self.orchestrator.ask_question(question)
+            await self._send_json(writer, response_to_dict(response))
+        elif path == "/ask/stream":
+            question = self._parse_question(method, body)
+            await self._stream_answer(question, writer)
+        else:
+            raise HttpError(404, f"ruta no soportada: {path}")
+
+    def _parse_question(self, method: str, body: bytes) -> str:
+        if method != "POST":
+            raise HttpError(405, "usa POST")
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f"JSON inválido: {e}")
+        question = payload.get("question") if isinstance(payload, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            raise HttpError(400, "falta el campo 'question'")
+        return question
+
+    async def _stream_answer(self, question: str, writer: asyncio.StreamWriter):
+        """Envía la respuesta como NDJSON con codificación chunked a medida que se genera"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        answer = self.orchestrator.ask_question_stream(question)
+        try:
+            async for token in answer:
+                await self._write_chunk(writer, {"token": token})
+            await self._write_chunk(writer, {"done": True, **response_to_dict(answer.response)})
+        except Exception as e:
+            # Las cabeceras ya se enviaron: el error viaja como última línea del flujo
+            print(f"Error generando respuesta en streaming: {e}")
+            await self._write_chunk(writer, {"done": True, "error": str(e)})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, payload: dict):
+        line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+        writer.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, payload: dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self._send(writer, body, "application/json; charset=utf-8", status)
+
+    async def _send(self, writer: asyncio.StreamWriter, body: bytes, content_type: str, status: int = 200):
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        )
+        writer.write(head.encode("ascii") + body)
+        await writer.drain()
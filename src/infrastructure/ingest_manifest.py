@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class IngestPlan:
+    """Cambios detectados entre la carpeta de documentos y el último manifiesto"""
+
+    to_process: List[Tuple[str, str, dict]] = field(default_factory=list)  # (clave, ruta, huella)
+    stale_doc_ids: List[str] = field(default_factory=list)  # documentos modificados o eliminados
+    removed_keys: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+
+class IngestManifest:
+    """
+    Manifiesto persistente de los archivos ya ingestados.
+
+    Guarda por archivo su huella (tamaño, mtime y hash del contenido) y su doc_id,
+    junto con el modelo y la dimensión de embedding con los que se generó la colección.
+
+    Args:
+        path (str): Ruta del archivo JSON del manifiesto
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.embedding_model: Optional[str] = None
+        self.embedding_dim: Optional[int] = None
+        self.files: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.embedding_model = data.get("embedding_model")
+            self.embedding_dim = data.get("embedding_dim")
+            self.files = data.get("files", {})
+
+    @staticmethod
+    def fingerprint(file_path: str, previous: Optional[dict] = None) -> dict:
+        """Calcula la huella de un archivo; reutiliza el hash si tamaño y mtime no cambiaron"""
+        stat = os.stat(file_path)
+        if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime_ns:
+            content_hash = previous["sha256"]
+        else:
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            content_hash = digest.hexdigest()
+        return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": content_hash}
+
+    def is_compatible(self, embedding_model: str, embedding_dim: int) -> bool:
+        """Indica si la colección existente se generó con el mismo modelo y dimensión"""
+        return self.embedding_model == embedding_model and self.embedding_dim == embedding_dim
+
+    def plan(self, files: Dict[str, str]) -> IngestPlan:
+        """Compara los archivos actuales (clave -> ruta) con el manifiesto"""
+        plan = IngestPlan()
+        for key, path in sorted(files.items()):
+            previous = self.files.get(key)
+            fingerprint = self.fingerprint(path, previous)
+            if previous and previous["sha256"] == fingerprint["sha256"]:
+                previous.update(size=fingerprint["size"], mtime=fingerprint["mtime"])
+                plan.unchanged += 1
+                continue
+            if previous:
+                plan.stale_doc_ids.append(previous["doc_id"])
+            plan.to_process.append((key, path, fingerprint))
+
+        for key, entry in self.files.items():
+            if key not in files:
+                plan.removed_keys.append(key)
+                plan.stale_doc_ids.append(entry["doc_id"])
+        return plan
+
+    def reset(self, embedding_model: str, embedding_dim: int):
+        """Olvida todos los archivos (tras reconstruir la colección)"""
+        self.embedding_model = embedding_model
+        self.embedding_dim = embedding_dim
+        self.files = {}
+
+    def record(self, key: str, fingerprint: dict, doc_id: str):
+        self.files[key] = {**fingerprint, "doc_id": doc_id}
+
+    def forget(self, key: str):
+        self.files.pop(key, None)
+
+    def save(self):
+        """Escribe el manifiesto de forma atómica"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"embedding_model": self.embedding_model, "embedding_dim": self.embedding_dim, "files": self.files},
+                f,
+                indent=2,
+            )
+        os.replace(tmp_path, self.path)
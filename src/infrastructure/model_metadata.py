@@ -0,0 +1,47 @@
+import json
+import os
+import threading
+from typing import Optional
+
+
+class ModelMetadataStore:
+    """
+    Metadatos de los modelos de embeddings (p. ej. la dimensión) persistidos en un JSON.
+
+    Se rellenan la primera vez que se usa cada modelo, de modo que los arranques siguientes
+    no necesitan una llamada de prueba al modelo (ni cargarlo) para conocer su dimensión.
+
+    Args:
+        path (str): Ruta del archivo JSON
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._models = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._models = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Metadatos de modelos ilegibles en {path}, se regenerarán: {e}")
+
+    def get(self, model_key: str) -> Optional[dict]:
+        with self._lock:
+            return self._models.get(model_key)
+
+    def record(self, model_key: str, **fields):
+        """Guarda (o actualiza) los metadatos de un modelo si cambiaron"""
+        with self._lock:
+            current = self._models.get(model_key, {})
+            updated = {**current, **fields}
+            if updated == current:
+                return
+            self._models[model_key] = updated
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._models, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
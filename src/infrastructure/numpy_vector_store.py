@@ -0,0 +1,322 @@
+import json
+import os
+import re
+import shutil
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.application.interfaces import Retriever, VectorStore
+from src.domain.models import DocumentChunk, SearchResult
+
+VECTORS_FILE = "vectors.f32"
+ROWS_FILE = "rows.jsonl"
+INDEX_FILE = "index.json"
+MIN_ALLOCATED_ROWS = 1024
+
+
+class NumpyVectorStore(VectorStore, Retriever):
+    """
+    Almacén vectorial en proceso para corpus pequeños, sin Milvus.
+
+    Los vectores (normalizados, para similitud coseno como la colección de Milvus) viven en
+    una matriz float32 contigua mapeada en memoria; el texto y los metadatos de cada fila se
+    añaden a un archivo JSONL del que solo se leen las filas devueltas por una búsqueda. Un
+    índice JSON guarda el chunk_id, el doc_id y la posición en el JSONL de cada fila.
+
+    La búsqueda es exacta: un producto matricial contra todas las filas y `argpartition`
+    para quedarse con las top-k. Borrar o reemplazar filas solo las marca como eliminadas;
+    `compact()` reescribe los archivos sin ellas.
+
+    Las inserciones y los borrados solo cambian el índice en memoria: se persiste en
+    `compact()`, una vez al final de cada ingesta, en lugar de reescribirlo en cada lote.
+
+    No está pensado para ser escrito por varios procesos a la vez.
+
+    Args:
+        data_dir (str): Directorio raíz de los almacenes
+        collection_name (str): Nombre de la colección (un subdirectorio por colección)
+        embedding_dim (int): Dimensión de los embeddings
+    """
+
+    def __init__(self, data_dir: str, collection_name: str, embedding_dim: int):
+        self.collection_name = collection_name
+        self.embedding_dim = embedding_dim
+        self.path = os.path.join(data_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", collection_name))
+        self._lock = threading.Lock()
+        self._reset_state()
+        self._dim_mismatch = False
+        if os.path.exists(self._index_path):
+            self._load()
+
+    def _reset_state(self):
+        self._vectors: Optional[np.memmap] = None
+        self._allocated = 0
+        self._count = 0
+        self._chunk_ids: List[str] = []
+        self._doc_ids: List[str] = []
+        self._offsets: List[int] = []
+        self._deleted = np.zeros(0, dtype=bool)
+        self._rows_by_chunk: Dict[str, int] = {}
+        self._dirty = False
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, VECTORS_FILE)
+
+    @property
+    def _rows_path(self) -> str:
+        return os.path.join(self.path, ROWS_FILE)
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, INDEX_FILE)
+
+    def _load(self):
+        """Mapea la matriz existente; solo se leen a memoria las claves de cada fila"""
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["dim"] != self.embedding_dim:
+            # Se trata como inexistente: la ingesta la recreará con la dimensión nueva
+            print(
+                f"Advertencia: la colección '{self.collection_name}' tiene dimensión {index['dim']}, "
+                f"se esperaba {self.embedding_dim}. Ejecuta la ingesta completa para recrearla."
+            )
+            self._dim_mismatch = True
+            return
+        self._allocated = index["allocated"]
+        self._count = index["count"]
+        self._chunk_ids = index["chunk_ids"]
+        self._doc_ids = index["doc_ids"]
+        self._offsets = index["offsets"]
+        self._deleted = np.zeros(self._allocated, dtype=bool)
+        self._deleted[index["deleted"]] = True
+        self._rows_by_chunk = {
+            chunk_id: row for row, chunk_id in enumerate(self._chunk_ids) if not self._deleted[row]
+        }
+        if self._allocated:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r+", shape=(self._allocated, self.embedding_dim)
+            )
+
+    def _save_index(self):
+        """Persiste la matriz y el índice; el índice se reemplaza de forma atómica"""
+        if self._vectors is not None:
+            self._vectors.flush()
+        index = {
+            "dim": self.embedding_dim,
+            "allocated": self._allocated,
+            "count": self._count,
+            "chunk_ids": self._chunk_ids,
+            "doc_ids": self._doc_ids,
+            "offsets": self._offsets,
+            "deleted": np.flatnonzero(self._deleted[: self._count]).tolist(),
+        }
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path)
+        self._dirty = False
+
+    def set_collection(self):
+        """Crea la colección vacía, eliminando la anterior si existía"""
+        with self._lock:
+            if os.path.exists(self.path):
+                print(f"Eliminando colección existente '{self.collection_name}' para asegurar consistencia de dimensión.")
+                shutil.rmtree(self.path)
+            print(f"Creando nueva colección '{self.collection_name}' con dimensión {self.embedding_dim}...")
+            os.makedirs(self.path)
+            open(self._rows_path, "wb").close()
+            self._reset_state()
+            self._dim_mismatch = False
+            self._save_index()
+            print("Colección creada con éxito.")
+
+    def has_collection(self) -> bool:
+        """Indica si la colección ya existe en disco con la dimensión esperada"""
+        return os.path.exists(self._index_path) and not self._dim_mismatch
+
+    def _grow(self, needed: int):
+        """Amplía el archivo de vectores para alojar al menos `needed` filas"""
+        new_allocated = max(MIN_ALLOCATED_ROWS, self._allocated * 2, needed)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_allocated * self.embedding_dim * 4)
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(new_allocated, self.embedding_dim)
+        )
+        self._deleted = np.concatenate([self._deleted, np.zeros(new_allocated - self._allocated, dtype=bool)])
+        self._allocated = new_allocated
+
+    def _mark_deleted(self, rows):
+        for row in rows:
+            self._deleted[row] = True
+            self._rows_by_chunk.pop(self._chunk_ids[row], None)
+
+    def delete_documents(self, doc_ids: List[str]):
+        """Marca como eliminados todos los chunks de los documentos indicados"""
+        if not doc_ids:
+            return
+        targets = set(doc_ids)
+        with self._lock:
+            rows = [row for row in range(self._count) if not self._deleted[row] and self._doc_ids[row] in targets]
+            self._mark_deleted(rows)
+            self._dirty = True
+        print(f"Eliminados {len(rows)} chunks de {len(doc_ids)} documento(s)")
+
+    def insert(self, chunks: List[DocumentChunk], batch_size: int = 100, upsert: bool = False, compact: bool = True):
+        """Añade chunks con embedding al final de la matriz
+
+        Args:
+            chunks (List[DocumentChunk]): Chunks con embedding
+            batch_size (int): Sin efecto; se mantiene por compatibilidad con MilvusManager
+            upsert (bool): Reemplaza las filas con el mismo chunk_id en lugar de duplicarlas. Defaults to False.
+            compact (bool): Persiste el índice y reescribe los archivos sin las filas eliminadas al terminar.
+                Defaults to True.
+        """
+        chunks = [chunk for chunk in chunks if chunk.embedding is not None]
+        if not chunks:
+            print("Advertencia: No hay chunks con emebeddings para insertar.")
+            return
+        if not self.has_collection():
+            self.set_collection()
+
+        vectors = np.asarray([chunk.embedding for chunk in chunks], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        print(f"Insertando {len(chunks)} chunks en el almacén local...")
+        with self._lock:
+            if upsert:
+                self._mark_deleted(
+                    [self._rows_by_chunk[chunk.chunk_id] for chunk in chunks if chunk.chunk_id in self._rows_by_chunk]
+                )
+            if self._count + len(chunks) > self._allocated:
+                self._grow(self._count + len(chunks))
+
+            with open(self._rows_path, "ab") as f:
+                for chunk in chunks:
+                    self._offsets.append(f.tell())
+                    row = {"text": chunk.text, "metadata": chunk.metadata}
+                    f.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+
+            start = self._count
+            self._vectors[start : start + len(chunks)] = vectors
+            for row, chunk in enumerate(chunks, start):
+                self._chunk_ids.append(chunk.chunk_id)
+                self._doc_ids.append(chunk.doc_id)
+                self._rows_by_chunk[chunk.chunk_id] = row
+            self._count += len(chunks)
+            self._dirty = True
+        if compact:
+            self.compact()
+
+    def compact(self):
+        """Reescribe vectores, filas e índice sin las filas eliminadas y persiste el índice"""
+        with self._lock:
+            live = np.flatnonzero(~self._deleted[: self._count])
+            if len(live) == self._count:
+                if self._dirty:
+                    self._save_index()
+                return
+            vectors = np.array(self._vectors[live]) if len(live) else np.zeros((0, self.embedding_dim), np.float32)
+            rows = self._read_rows(live.tolist())
+
+            tmp_rows = self._rows_path + ".tmp"
+            offsets = []
+            with open(tmp_rows, "wb") as f:
+                for row in rows:
+                    offsets.append(f.tell())
+                    f.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+
+            allocated = max(MIN_ALLOCATED_ROWS, len(live))
+            tmp_vectors = self._vectors_path + ".tmp"
+            compacted = np.memmap(tmp_vectors, dtype=np.float32, mode="w+", shape=(allocated, self.embedding_dim))
+            compacted[: len(live)] = vectors
+            compacted.flush()
+            del compacted
+
+            self._vectors = None
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_rows, self._rows_path)
+            self._chunk_ids = [self._chunk_ids[row] for row in live]
+            self._doc_ids = [self._doc_ids[row] for row in live]
+            self._offsets = offsets
+            self._count = len(live)
+            self._allocated = allocated
+            self._deleted = np.zeros(allocated, dtype=bool)
+            self._rows_by_chunk = {chunk_id: row for row, chunk_id in enumerate(self._chunk_ids)}
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r+", shape=(allocated, self.embedding_dim)
+            )
+            self._save_index()
+            print(f"Almacén compactado: {self._count} filas")
+
+    def _read_rows(self, rows: Sequence[int]) -> List[dict]:
+        """Lee del JSONL el texto y los metadatos de las filas indicadas"""
+        records = []
+        with open(self._rows_path, "rb") as f:
+            for row in rows:
+                f.seek(self._offsets[row])
+                records.append(json.loads(f.readline()))
+        return records
+
+    def search_batch(self, vectors, top_k: int) -> List[List[SearchResult]]:
+        """Búsqueda exacta de varias consultas con un solo producto matricial"""
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        # Bajo el cerrojo: una compactación concurrente cambiaría filas, offsets y archivos
+        with self._lock:
+            count = self._count
+            if self._vectors is None or count == 0:
+                return [[] for _ in queries]
+            deleted = self._deleted[:count]
+            k = min(top_k, count - int(deleted.sum()))
+            if k <= 0:
+                return [[] for _ in queries]
+
+            scores = queries @ np.asarray(self._vectors[:count]).T
+            scores[:, deleted] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            unique_rows = np.unique(top).tolist()
+            by_row = dict(zip(unique_rows, self._read_rows(unique_rows)))
+            return [
+                [
+                    SearchResult(
+                        chunk=DocumentChunk(
+                            chunk_id=self._chunk_ids[row],
+                            doc_id=self._doc_ids[row],
+                            text=by_row[row]["text"],
+                            metadata=by_row[row]["metadata"],
+                        ),
+                        similarity=float(score),
+                    )
+                    for row, score in zip(query_rows.tolist(), query_scores.tolist())
+                ]
+                for query_rows, query_scores in zip(top, top_scores)
+            ]
+
+    def search(self, vector: List[float], top_k: int) -> List[SearchResult]:
+        """Busca en la base de conocimiento"""
+        return self.search_batch([vector], top_k)[0]
+
+    def get_stats(self):
+        """Obtiene estadísticas de la colección"""
+        with self._lock:
+            deleted = int(self._deleted[: self._count].sum())
+            return {
+                "row_count": self._count - deleted,
+                "deleted_rows": deleted,
+                "allocated_rows": self._allocated,
+                "path": self.path,
+            }
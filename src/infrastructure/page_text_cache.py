@@ -0,0 +1,120 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import List, Optional, Tuple
+
+from src.application.interfaces import TextProcessor
+from src.infrastructure.ingest_manifest import IngestManifest
+
+# Cambiar si cambia el formato de los archivos o la limpieza del texto
+FORMAT_VERSION = 1
+FILES_INDEX = "files.json"
+HEADER_SIZE = struct.Struct("<I")
+# Nivel 1: comprime el texto ~4x y cuesta una fracción de lo que cuesta extraerlo
+COMPRESSION_LEVEL = 1
+
+
+class PageTextCache:
+    """
+    Caché persistente del texto extraído de cada PDF, direccionada por el hash de su contenido.
+
+    Guarda por PDF un archivo con el texto limpio de todas sus páginas concatenado y comprimido
+    con zlib, precedido de una cabecera JSON con el número de cada página y su desplazamiento
+    en el texto. Un PDF sin cambios (mismo SHA-256) no se vuelve a parsear: cambiar
+    CHUNK_SIZE/CHUNK_OVERLAP solo cuesta el chunking y los embeddings.
+
+    Para no releer archivos enteros solo para calcular su hash, se recuerda la huella
+    (tamaño, mtime y SHA-256) de cada ruta como en el manifiesto de ingesta.
+
+    Args:
+        cache_dir (str): Directorio de la caché
+        text_processor (TextProcessor): Limpieza aplicada al texto antes de guardarlo
+    """
+
+    def __init__(self, cache_dir: str, text_processor: TextProcessor):
+        self.path = os.path.join(cache_dir, f"v{FORMAT_VERSION}")
+        os.makedirs(self.path, exist_ok=True)
+        self.text_processor = text_processor
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._files = {}
+        self._dirty = False
+        if os.path.exists(self._files_path):
+            with open(self._files_path, "r", encoding="utf-8") as f:
+                self._files = json.load(f)
+
+    @property
+    def _files_path(self) -> str:
+        return os.path.join(self.path, FILES_INDEX)
+
+    def _pages_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.pages")
+
+    def clean(self, text: str) -> str:
+        return self.text_processor.clean_text(text)
+
+    def key(self, pdf_path: str) -> str:
+        """SHA-256 del contenido del PDF; solo se recalcula si cambian su tamaño o su mtime"""
+        path = os.path.abspath(pdf_path)
+        with self._lock:
+            previous = self._files.get(path)
+        fingerprint = IngestManifest.fingerprint(pdf_path, previous)
+        if fingerprint != previous:
+            with self._lock:
+                self._files[path] = fingerprint
+                self._dirty = True
+        return fingerprint["sha256"]
+
+    def contains(self, key: str) -> bool:
+        """Indica si hay texto guardado para la clave, sin leerlo"""
+        return os.path.exists(self._pages_path(key))
+
+    def get(self, key: str) -> Optional[List[Tuple[int, str]]]:
+        """Páginas (número, texto limpio) guardadas para un PDF, o None si no está en caché"""
+        try:
+            with open(self._pages_path(key), "rb") as f:
+                data = f.read()
+            (header_size,) = HEADER_SIZE.unpack_from(data)
+            header = json.loads(data[HEADER_SIZE.size : HEADER_SIZE.size + header_size])
+            text = zlib.decompress(data[HEADER_SIZE.size + header_size :]).decode("utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            print(f"Advertencia: texto en caché ilegible para {key[:12]} ({e}); se extraerá de nuevo.")
+            self.misses += 1
+            return None
+        self.hits += 1
+        offsets = header["offsets"]
+        return [(page_num, text[offsets[i] : offsets[i + 1]]) for i, page_num in enumerate(header["pages"])]
+
+    def put(self, key: str, pages: List[Tuple[int, str]]):
+        """Guarda las páginas ya limpias de un PDF de forma atómica"""
+        offsets = [0]
+        for _, text in pages:
+            offsets.append(offsets[-1] + len(text))
+        header = json.dumps({"pages": [page_num for page_num, _ in pages], "offsets": offsets}).encode("utf-8")
+        body = zlib.compress("".join(text for _, text in pages).encode("utf-8"), COMPRESSION_LEVEL)
+        tmp_path = self._pages_path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER_SIZE.pack(len(header)) + header + body)
+        os.replace(tmp_path, self._pages_path(key))
+
+    def save(self):
+        """Persiste las huellas de las rutas vistas"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self._files_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._files, f)
+            os.replace(tmp_path, self._files_path)
+            self._dirty = False
+
+    def stats(self) -> dict:
+        """Contadores de uso de la caché"""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+import threading
+from typing import Sequence, Tuple
+
+import numpy as np
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+INDEX_FILE = "index.json"
+MIN_ALLOCATED_ROWS = 1024
+# Las claves primarias son no negativas: una clave negativa marca una fila borrada
+DELETED_ID = -1
+COMPACT_CHUNK_ROWS = 65536
+
+
+class FullPrecisionVectors:
+    """
+    Copia local en float32 de los vectores de una colección, para reordenar con precisión
+    completa los candidatos de una búsqueda sobre vectores comprimidos.
+
+    Los vectores van en una matriz mapeada en memoria (solo se leen las filas de los
+    candidatos) y la clave primaria de cada fila en un segundo archivo. La búsqueda de filas
+    por clave usa un array ordenado de claves en lugar de un diccionario, para que la memoria
+    residente sea de 16 bytes por fila. Si una clave se vuelve a insertar gana la fila más
+    reciente; `delete()` marca las filas de las claves borradas y `compact()` reescribe los
+    archivos solo con la última fila de cada clave viva. `reset()` empieza de cero con cada
+    ingesta completa.
+
+    Args:
+        path (str): Directorio de los archivos
+        embedding_dim (int): Dimensión de los embeddings
+    """
+
+    def __init__(self, path: str, embedding_dim: int):
+        self.path = path
+        self.embedding_dim = embedding_dim
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._ids = None
+        self._allocated = 0
+        self._count = 0
+        self._sorted_ids = None
+        self._sorted_rows = None
+        self._dim_mismatch = False
+        if os.path.exists(self._index_path):
+            self._load()
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, INDEX_FILE)
+
+    def _open(self, allocated: int):
+        self._vectors = np.memmap(
+            os.path.join(self.path, VECTORS_FILE), dtype=np.float32, mode="r+", shape=(allocated, self.embedding_dim)
+        )
+        self._ids = np.memmap(os.path.join(self.path, IDS_FILE), dtype=np.int64, mode="r+", shape=(allocated,))
+        self._allocated = allocated
+
+    def _load(self):
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["dim"] != self.embedding_dim:
+            print(
+                f"Advertencia: los vectores de reordenación en {self.path} tienen dimensión {index['dim']}, "
+                f"se esperaba {self.embedding_dim}. Ejecuta la ingesta completa para regenerarlos."
+            )
+            self._dim_mismatch = True
+            return
+        self._count = index["count"]
+        if index["allocated"]:
+            self._open(index["allocated"])
+
+    def exists(self) -> bool:
+        """Indica si hay vectores guardados con la dimensión esperada"""
+        return os.path.exists(self._index_path) and not self._dim_mismatch
+
+    def reset(self):
+        """Elimina los vectores guardados y crea los archivos vacíos"""
+        with self._lock:
+            self._vectors = self._ids = None
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            os.makedirs(self.path)
+            for name in (VECTORS_FILE, IDS_FILE):
+                open(os.path.join(self.path, name), "wb").close()
+            self._allocated = self._count = 0
+            self._sorted_ids = self._sorted_rows = None
+            self._dim_mismatch = False
+            self._save_index()
+
+    def _grow(self, needed: int):
+        new_allocated = max(MIN_ALLOCATED_ROWS, self._allocated * 2, needed)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._ids.flush()
+            self._vectors = self._ids = None
+        for name, itemsize in ((VECTORS_FILE, 4 * self.embedding_dim), (IDS_FILE, 8)):
+            with open(os.path.join(self.path, name), "ab") as f:
+                f.truncate(new_allocated * itemsize)
+        self._open(new_allocated)
+
+    def _save_index(self):
+        index = {"dim": self.embedding_dim, "allocated": self._allocated, "count": self._count}
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray):
+        """Añade vectores (ya preparados para la métrica de la colección) con sus claves primarias"""
+        if not len(ids):
+            return
+        with self._lock:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"No existen vectores de reordenación en {self.path}; llama a reset() primero")
+            start = self._count
+            if start + len(ids) > self._allocated:
+                self._grow(start + len(ids))
+            self._vectors[start : start + len(ids)] = vectors
+            self._ids[start : start + len(ids)] = ids
+            self._count += len(ids)
+            self._sorted_ids = self._sorted_rows = None
+
+    def delete(self, ids: Sequence[int]):
+        """Marca como borradas todas las filas de las claves indicadas"""
+        if not len(ids) or not self._count:
+            return
+        with self._lock:
+            stored = self._ids[: self._count]
+            rows = np.flatnonzero(np.isin(stored, np.asarray(ids, dtype=np.int64)))
+            if len(rows):
+                stored[rows] = DELETED_ID
+                self._sorted_ids = self._sorted_rows = None
+
+    def compact(self):
+        """Reescribe los archivos solo con la fila vigente de cada clave no borrada"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            _, live = self._lookup_table()
+            if len(live) == self._count:
+                return
+            live = np.sort(live)
+            allocated = max(MIN_ALLOCATED_ROWS, len(live))
+            tmp_vectors = os.path.join(self.path, VECTORS_FILE + ".tmp")
+            tmp_ids = os.path.join(self.path, IDS_FILE + ".tmp")
+            vectors = np.memmap(tmp_vectors, dtype=np.float32, mode="w+", shape=(allocated, self.embedding_dim))
+            ids = np.memmap(tmp_ids, dtype=np.int64, mode="w+", shape=(allocated,))
+            # Por bloques: no hace falta tener todos los vectores en memoria a la vez
+            for start in range(0, len(live), COMPACT_CHUNK_ROWS):
+                rows = live[start : start + COMPACT_CHUNK_ROWS]
+                vectors[start : start + len(rows)] = self._vectors[rows]
+                ids[start : start + len(rows)] = self._ids[rows]
+            vectors.flush()
+            ids.flush()
+            del vectors, ids
+
+            removed = self._count - len(live)
+            self._vectors = self._ids = None
+            os.replace(tmp_vectors, os.path.join(self.path, VECTORS_FILE))
+            os.replace(tmp_ids, os.path.join(self.path, IDS_FILE))
+            self._open(allocated)
+            self._count = len(live)
+            self._sorted_ids = self._sorted_rows = None
+            self._save_index()
+        print(f"Vectores de reordenación compactados: {self._count} filas ({removed} eliminadas)")
+
+    def flush(self):
+        """Persiste los vectores y el número de filas escritas"""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._ids.flush()
+            if os.path.exists(self.path):
+                self._save_index()
+
+    def _lookup_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Claves vivas ordenadas y su fila más reciente (se reconstruye tras cada inserción o borrado)"""
+        if self._sorted_ids is None:
+            ids = np.asarray(self._ids[: self._count]) if self._count else np.zeros(0, dtype=np.int64)
+            rows = np.arange(len(ids))
+            order = np.lexsort((rows, ids))
+            sorted_ids = ids[order]
+            last = np.append(sorted_ids[1:] != sorted_ids[:-1], True) if len(ids) else np.zeros(0, dtype=bool)
+            last &= sorted_ids != DELETED_ID
+            self._sorted_ids, self._sorted_rows = sorted_ids[last], order[last]
+        return self._sorted_ids, self._sorted_rows
+
+    def get(self, ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectores de las claves pedidas y máscara de las que se encontraron
+
+        Returns:
+            Tuple: (matriz len(ids) x dim, con ceros en las que faltan; máscara booleana de encontradas)
+        """
+        keys = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            sorted_ids, sorted_rows = self._lookup_table()
+            positions = np.minimum(np.searchsorted(sorted_ids, keys), max(len(sorted_ids) - 1, 0))
+            found = sorted_ids[positions] == keys if len(sorted_ids) else np.zeros(len(keys), dtype=bool)
+            vectors = np.zeros((len(keys), self.embedding_dim), dtype=np.float32)
+            if found.any():
+                rows = sorted_rows[positions[found]]
+                # Lectura ordenada por fila: accesos secuenciales dentro del archivo mapeado
+                order = np.argsort(rows)
+                vectors[np.flatnonzero(found)[order]] = self._vectors[rows[order]]
+        return vectors, found
+
+    def nbytes(self) -> int:
+        """Bytes en disco de los vectores escritos"""
+        return self._count * self.embedding_dim * 4
@@ -1,8 +1,8 @@
 import re
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 from tqdm import tqdm
 from src.application.interfaces import TextProcessor, Chunker
-from src.domain.models import DocumentPage, DocumentChunk
+from src.domain.models import DocumentPage, DocumentChunk, make_chunk_id
 
 
 class SmartChunker(Chunker):
@@ -29,36 +29,179 @@ class SmartChunker(Chunker):
         Returns:
             List[Dict]: Lista de chunks con metadatos
         """
-        chunks = []
+        return list(self.iter_chunks(tqdm(pages_data, desc="Creando chunks")))
 
-        for page in tqdm(pages_data, desc="Creando chunks"):
-            text = self.text_processor.clean_text(page.text)
+    def iter_chunks(self, pages: Iterable[DocumentPage]) -> Iterator[DocumentChunk]:
+        """Genera los chunks pagina a pagina, sin materializar el documento completo"""
+        for page in pages:
+            yield from self._chunk_page(page)
 
-            metadata = {"page": page.page_num, "source": page.source}
+    def _chunk_page(self, page: DocumentPage) -> Iterator[DocumentChunk]:
+        text = self.text_processor.clean_text(page.text)
 
-            if len(text) <= self.chunk_size:
-                chunks.append(
-                    DocumentChunk(doc_id=page.doc_id, text=text, metadata={**metadata, "chunk_type": "full_page"})
+        metadata = {"page": page.page_num, "source": page.source}
+
+        if len(text) <= self.chunk_size:
+            yield DocumentChunk(
+                doc_id=page.doc_id,
+                text=text,
+                metadata={**metadata, "chunk_type": "full_page"},
+                chunk_id=make_chunk_id(page.doc_id, page.page_num, 0),
+            )
+            return
+
+        start = 0
+        index = 0
+        while start < len(text):
+            end = start + self.chunk_size
+            if end < len(text):
+                last_period = text.rfind(".", start, end)
+                if last_period > start + self.chunk_size // 2:
+                    end = last_period + 1
+            chunk_text = text[start:end].strip()
+            if chunk_text:
+                chunk_metadata = {
+                    **metadata,
+                    "chunk_type": "partial_page",
+                    "start_char": start,
+                    "end_char": end,
+                }
+                yield DocumentChunk(
+                    doc_id=page.doc_id,
+                    text=chunk_text,
+                    metadata=chunk_metadata,
+                    chunk_id=make_chunk_id(page.doc_id, page.page_num, index),
                 )
-            else:
-                start = 0
-                while start < len(text):
-                    end = start + self.chunk_size
-                    if end < len(text):
-                        last_period = text.rfind(".", start, end)
-                        if last_period > start + self.chunk_size // 2:
-                            end = last_period + 1
-                    chunk_text = text[start:end].strip()
-                    if chunk_text:
-                        chunk_metadata = {
-                            **metadata,
-                            "chunk_type": "partial_page",
-                            "start_char": start,
-                            "end_char": end,
-                        }
-                        chunks.append(DocumentChunk(doc_id=page.doc_id, text=chunk_text, metadata=chunk_metadata))
-                    start += self.chunk_size - self.overlap
-        return chunks
+                index += 1
+            start += self.chunk_size - self.overlap
+
+
+SENTENCE_END = re.compile(r"[.!?…](?=\s|$)")
+
+
+class TokenChunker(Chunker):
+    """
+    Divide el texto en chunks medidos en tokens del modelo de embeddings.
+
+    Cada página se tokeniza una sola vez (en lotes de páginas) y los cortes se hacen con los
+    offsets de los tokens: preferentemente en un final de frase de la segunda mitad de la
+    ventana y, si no hay, entre dos palabras. Así cada chunk llena la ventana del modelo sin
+    que se trunque al embeberlo. Los chunks llevan `token_count` (incluidos los tokens
+    especiales) en los metadatos y, con `on_tokenized`, se entregan sus ids al embedder
+    para que no vuelva a tokenizarlos.
+
+    Args:
+        text_processor (TextProcessor): Procesador de texto para limpieza
+        tokenizer: `tokenizers.Tokenizer` del modelo de embeddings (se usa una copia sin truncado)
+        max_tokens (int): Tokens máximos por chunk, incluidos los especiales ([CLS], [SEP]...). Defaults to 256.
+        overlap (int): Tokens que se superponen entre chunks consecutivos. Defaults to 32.
+        pages_per_batch (int): Páginas tokenizadas en cada llamada al tokenizador. Defaults to 32.
+        on_tokenized: Callback `(texto, ids)` con los ids finales de cada chunk. Defaults to None.
+
+    Raises:
+        ValueError: Si la ventana no deja sitio para el solapamiento
+    """
+
+    def __init__(
+        self,
+        text_processor: TextProcessor,
+        tokenizer,
+        max_tokens: int = 256,
+        overlap: int = 32,
+        pages_per_batch: int = 32,
+        on_tokenized: Optional[Callable[[str, List[int]], None]] = None,
+    ):
+        self.text_processor = text_processor
+        self.tokenizer = type(tokenizer).from_str(tokenizer.to_str())
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+        self.prefix, self.suffix = self._special_tokens()
+        self.max_tokens = max_tokens
+        self.content_tokens = max_tokens - len(self.prefix) - len(self.suffix)
+        self.overlap = overlap
+        self.pages_per_batch = max(1, pages_per_batch)
+        self.on_tokenized = on_tokenized
+        if self.content_tokens <= overlap:
+            raise ValueError(f"max_tokens={max_tokens} no deja sitio para un solapamiento de {overlap} tokens")
+
+    def _special_tokens(self) -> Tuple[List[int], List[int]]:
+        """Ids especiales que el post-procesador añade antes y después de una secuencia"""
+        encoding = self.tokenizer.encode("a")
+        content = [i for i, special in enumerate(encoding.special_tokens_mask) if not special]
+        return list(encoding.ids[: content[0]]), list(encoding.ids[content[-1] + 1 :])
+
+    def chunk(self, pages_data: List[DocumentPage]) -> List[DocumentChunk]:
+        """Divide en chunks de tokens todas las páginas"""
+        return list(self.iter_chunks(tqdm(pages_data, desc="Creando chunks")))
+
+    def iter_chunks(self, pages: Iterable[DocumentPage]) -> Iterator[DocumentChunk]:
+        """Genera los chunks tokenizando las páginas en lotes de `pages_per_batch`"""
+        batch = []
+        for page in pages:
+            batch.append(page)
+            if len(batch) >= self.pages_per_batch:
+                yield from self._chunk_batch(batch)
+                batch = []
+        if batch:
+            yield from self._chunk_batch(batch)
+
+    def _chunk_batch(self, pages: List[DocumentPage]) -> Iterator[DocumentChunk]:
+        texts = [self.text_processor.clean_text(page.text) for page in pages]
+        encodings = self.tokenizer.encode_batch(texts, add_special_tokens=False)
+        for page, text, encoding in zip(pages, texts, encodings):
+            yield from self._chunk_page(page, text, encoding.ids, encoding.offsets)
+
+    def _make_chunk(self, page: DocumentPage, text: str, ids: List[int], metadata: dict, index: int) -> DocumentChunk:
+        ids = self.prefix + list(ids) + self.suffix
+        if self.on_tokenized is not None:
+            self.on_tokenized(text, ids)
+        return DocumentChunk(
+            doc_id=page.doc_id,
+            text=text,
+            metadata={**metadata, "token_count": len(ids)},
+            chunk_id=make_chunk_id(page.doc_id, page.page_num, index),
+        )
+
+    def _cut(self, start: int, end: int, offsets: Sequence[Tuple[int, int]], sentence_ends: Set[int], starts_word) -> int:
+        """Índice (exclusivo) donde cortar el chunk que empieza en `start` sin pasar de `end`"""
+        for cut in range(end, start + self.content_tokens // 2, -1):
+            if offsets[cut - 1][1] in sentence_ends:
+                return cut
+        for cut in range(end, start, -1):
+            if starts_word[cut]:
+                return cut
+        return end
+
+    def _chunk_page(
+        self, page: DocumentPage, text: str, ids: List[int], offsets: Sequence[Tuple[int, int]]
+    ) -> Iterator[DocumentChunk]:
+        metadata = {"page": page.page_num, "source": page.source}
+        count = len(ids)
+        if not count:
+            return
+        if count <= self.content_tokens:
+            yield self._make_chunk(page, text, ids, {**metadata, "chunk_type": "full_page"}, 0)
+            return
+
+        sentence_ends = {match.end() for match in SENTENCE_END.finditer(text)}
+        # Un token empieza palabra si hay espacio entre él y el anterior (la puntuación va pegada)
+        starts_word = [i == 0 or offsets[i][0] > offsets[i - 1][1] for i in range(count)] + [True]
+
+        start = 0
+        index = 0
+        while start < count:
+            end = min(start + self.content_tokens, count)
+            if end < count:
+                end = self._cut(start, end, offsets, sentence_ends, starts_word)
+            start_char, end_char = offsets[start][0], offsets[end - 1][1]
+            chunk_metadata = {**metadata, "chunk_type": "partial_page", "start_char": start_char, "end_char": end_char}
+            yield self._make_chunk(page, text[start_char:end_char], ids[start:end], chunk_metadata, index)
+            index += 1
+            if end >= count:
+                break
+            start = max(end - self.overlap, start + 1)
+            while start < end and not starts_word[start]:
+                start += 1
 
 
 class BasicTextProcessor(TextProcessor):
@@ -1,17 +1,225 @@
-from pymilvus import MilvusClient
-from typing import List
+import json
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pymilvus import AsyncMilvusClient, DataType, MilvusClient
+from typing import Iterator, List, Optional, Tuple
 from tqdm import tqdm
-from src.application.interfaces import VectorStore, Retriever
-from src.domain.models import DocumentChunk, SearchResult
+from src.application.interfaces import AsyncRetriever, VectorStore, Retriever
+from src.application.metrics import NULL_METRICS
+from src.domain.models import DocumentChunk, SearchResult, chunk_primary_key
+from src.infrastructure.rescore_store import FullPrecisionVectors
+
+SEARCH_OUTPUT_FIELDS = ["text", "metadata", "chunk_id", "doc_id", "source", "page"]
+
+# Parámetros por defecto de construcción y de búsqueda de cada tipo de índice
+INDEX_TYPES = {
+    "HNSW": ({"M": 16, "efConstruction": 200}, {"ef": 64}),
+    "IVF_FLAT": ({"nlist": 128}, {"nprobe": 16}),
+    "IVF_PQ": ({"nlist": 128, "m": 16, "nbits": 8}, {"nprobe": 16}),
+    "FLAT": ({}, {}),
+    "BIN_IVF_FLAT": ({"nlist": 128}, {"nprobe": 16}),
+    "BIN_FLAT": ({}, {}),
+}
+
+# Tipo del campo vectorial según el modo de almacenamiento; los modos comprimidos se reordenan en float32
+VECTOR_STORAGE_TYPES = {
+    "float32": DataType.FLOAT_VECTOR,
+    "float16": DataType.FLOAT16_VECTOR,
+    "bfloat16": DataType.BFLOAT16_VECTOR,
+    "binary": DataType.BINARY_VECTOR,
+}
+
+# Índices de Milvus para vectores binarios (métrica HAMMING) equivalentes a los configurados
+BINARY_INDEX_TYPES = {"FLAT": "BIN_FLAT", "IVF_FLAT": "BIN_IVF_FLAT"}
+
+# Límite de resultados (topk) de una búsqueda en Milvus
+MAX_SEARCH_LIMIT = 16384
+
+MAX_TEXT_BYTES = 65535
+MAX_KEY_BYTES = 1024
+
+
+def _fit_varchar(value: str, max_bytes: int) -> str:
+    """Recorta un texto para que quepa en un VARCHAR de Milvus (el límite es en bytes UTF-8)"""
+    encoded = value.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return value
+    return encoded[:max_bytes].decode("utf-8", errors="ignore")
+
+
+def _search_params(metric_type: str, params: dict, top_k: int) -> dict:
+    """Parámetros de una búsqueda concreta; HNSW exige ef >= top_k"""
+    params = dict(params)
+    if "ef" in params:
+        params["ef"] = max(params["ef"], top_k)
+    return {"metric_type": metric_type, "params": params}
+
+
+def _storage_index(index_type: str, metric_type: str, storage: str) -> Tuple[str, str]:
+    """Índice y métrica de la búsqueda ANN para un modo de almacenamiento"""
+    if storage != "binary":
+        return index_type, metric_type
+    if index_type not in BINARY_INDEX_TYPES:
+        print(f"El índice {index_type} no admite vectores binarios; se usará BIN_IVF_FLAT.")
+    return BINARY_INDEX_TYPES.get(index_type, "BIN_IVF_FLAT"), "HAMMING"
+
+
+def prepare_vectors(vectors: np.ndarray, metric_type: str) -> np.ndarray:
+    """Vectores float32 tal como se comparan con la métrica (normalizados para COSINE)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    if metric_type != "COSINE":
+        return vectors
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def encode_vectors(vectors: np.ndarray, storage: str) -> list:
+    """Convierte vectores float32 al formato del campo vectorial de cada modo de almacenamiento"""
+    if storage == "float16":
+        return list(vectors.astype(np.float16))
+    if storage == "bfloat16":
+        import ml_dtypes  # dependencia de onnx; solo la necesita este modo
+
+        return list(vectors.astype(ml_dtypes.bfloat16))
+    if storage == "binary":
+        # Un bit por dimensión: el signo de cada componente
+        return [row.tobytes() for row in np.packbits(vectors > 0, axis=1)]
+    return vectors.tolist()
+
+
+def _rescore(
+    store: FullPrecisionVectors, metric_type: str, query: np.ndarray, hits, top_k: int
+) -> List[SearchResult]:
+    """Reordena los candidatos de la búsqueda comprimida con los vectores float32 y se queda con top_k"""
+    candidates = _to_search_results(hits)
+    if not candidates:
+        return []
+    vectors, found = store.get([hit["id"] for hit in hits])
+    if not found.all():
+        print(f"Advertencia: {int((~found).sum())} candidatos sin vector de reordenación; ejecuta la ingesta completa.")
+    if metric_type == "L2":
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        order, similarities = np.argsort(distances, kind="stable"), distances
+    else:
+        similarities = vectors @ query
+        order = np.argsort(-similarities, kind="stable")
+    results = []
+    for i in order:
+        if found[i]:
+            results.append(SearchResult(chunk=candidates[i].chunk, similarity=float(similarities[i])))
+            if len(results) == top_k:
+                break
+    return results
+
+
+def _to_search_results(hits) -> List[SearchResult]:
+    """Convierte los resultados de una búsqueda de Milvus en SearchResult"""
+    results = []
+    for res in hits:
+        entity = res["entity"]
+        retrieved_chunk = DocumentChunk(
+            chunk_id=entity["chunk_id"],
+            doc_id=entity["doc_id"],
+            text=entity["text"],
+            metadata={**(entity.get("metadata") or {}), "source": entity["source"], "page": entity["page"]},
+        )
+        results.append(SearchResult(chunk=retrieved_chunk, similarity=res["distance"]))
+    return results
 
 
 class MilvusManager(VectorStore, Retriever):
-    """Sabe como interactuar con Milvus: configurar, insertar y buscar"""
+    """Sabe como interactuar con Milvus: configurar, insertar y buscar
 
-    def __init__(self, uri: str, collection_name: str, embedding_dim: int):
+    La colección tiene un esquema explícito: `source`, `page` y `doc_id` son campos escalares
+    tipados y el resto de metadatos del chunk va en un campo JSON. El índice vectorial y sus
+    parámetros de construcción y de búsqueda son configurables.
+
+    Con `vector_storage` en "float16", "bfloat16" o "binary" Milvus guarda los vectores
+    comprimidos (2 bytes o 1 bit por dimensión) y la búsqueda ANN pide `oversample` veces
+    más candidatos, que se reordenan con los vectores float32 guardados en un archivo local
+    mapeado en memoria (`rescore_dir`). Los binarios se indexan con BIN_FLAT/BIN_IVF_FLAT y
+    distancia HAMMING; las similitudes devueltas son siempre las de `metric_type` en float32.
+
+    Args:
+        uri (str): URI de Milvus (servidor o archivo de Milvus Lite)
+        collection_name (str): Nombre de la colección
+        embedding_dim (int): Dimensión de los embeddings
+        index_type (str): "HNSW", "IVF_FLAT", "IVF_PQ" o "FLAT". Defaults to "HNSW".
+        metric_type (str): Métrica del índice ("COSINE", "IP" o "L2"). Defaults to "COSINE".
+        index_params (Optional[dict]): Parámetros de construcción (p. ej. M, efConstruction, nlist, m)
+        search_params (Optional[dict]): Parámetros de búsqueda (p. ej. ef, nprobe)
+        metrics: Metrics opcional para contar lotes, chunks, reintentos e inserciones fallidas
+        vector_storage (str): "float32", "float16", "bfloat16" o "binary". Defaults to "float32".
+        oversample (int): Candidatos por resultado pedidos al índice comprimido. Defaults to 4.
+        rescore_dir (Optional[str]): Directorio de los vectores float32 para reordenar (obligatorio si se comprimen)
+        insert_concurrency (int): Lotes de inserción enviados a la vez. Defaults to 4.
+        compact_after_insert (bool): Compacta además de hacer flush al terminar una inserción. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        collection_name: str,
+        embedding_dim: int,
+        index_type: str = "HNSW",
+        metric_type: str = "COSINE",
+        index_params: Optional[dict] = None,
+        search_params: Optional[dict] = None,
+        metrics=None,
+        vector_storage: str = "float32",
+        oversample: int = 4,
+        rescore_dir: Optional[str] = None,
+        insert_concurrency: int = 4,
+        compact_after_insert: bool = False,
+    ):
+        index_type = index_type.upper()
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Tipo de índice desconocido '{index_type}'. Opciones: {', '.join(INDEX_TYPES)}")
+        if vector_storage not in VECTOR_STORAGE_TYPES:
+            raise ValueError(
+                f"Almacenamiento de vectores desconocido '{vector_storage}'. Opciones: {', '.join(VECTOR_STORAGE_TYPES)}"
+            )
+        if vector_storage != "float32" and not rescore_dir:
+            raise ValueError(f"El almacenamiento '{vector_storage}' requiere rescore_dir para reordenar en float32")
+        if vector_storage == "binary" and embedding_dim % 8:
+            raise ValueError(f"Los vectores binarios requieren una dimensión múltiplo de 8 (es {embedding_dim})")
         self.client = MilvusClient(uri=uri)
         self.collection_name = collection_name
         self.embedding_dim = embedding_dim
+        self.metric_type = metric_type.upper()
+        self.vector_storage = vector_storage
+        self.oversample = max(1, oversample)
+        self.index_type, self.index_metric_type = _storage_index(index_type, self.metric_type, vector_storage)
+        default_index_params, default_search_params = INDEX_TYPES[self.index_type]
+        self.index_params = {**default_index_params, **(index_params or {})}
+        self.search_params = {**default_search_params, **(search_params or {})}
+        self.metrics = metrics or NULL_METRICS
+        self.insert_concurrency = max(1, insert_concurrency)
+        self.compact_after_insert = compact_after_insert
+        self.rescore_vectors = FullPrecisionVectors(rescore_dir, embedding_dim) if vector_storage != "float32" else None
+
+    def _build_schema(self):
+        schema = self.client.create_schema(auto_id=False, enable_dynamic_field=False)
+        schema.add_field("id", DataType.INT64, is_primary=True)
+        schema.add_field("vector", VECTOR_STORAGE_TYPES[self.vector_storage], dim=self.embedding_dim)
+        schema.add_field("text", DataType.VARCHAR, max_length=MAX_TEXT_BYTES)
+        schema.add_field("chunk_id", DataType.VARCHAR, max_length=MAX_KEY_BYTES)
+        schema.add_field("doc_id", DataType.VARCHAR, max_length=MAX_KEY_BYTES)
+        schema.add_field("source", DataType.VARCHAR, max_length=MAX_KEY_BYTES)
+        schema.add_field("page", DataType.INT64)
+        schema.add_field("metadata", DataType.JSON)
+        return schema
+
+    def _build_index_params(self):
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(
+            field_name="vector", index_type=self.index_type, metric_type=self.index_metric_type, params=self.index_params
+        )
+        # Índice escalar para los filtros por documento (borrados de la ingesta incremental)
+        index_params.add_index(field_name="doc_id", index_type="INVERTED")
+        return index_params
 
     def set_collection(self):
         """Configura la colección de Milvus, asegurando la dimensión correcta."""
@@ -19,70 +227,199 @@ class MilvusManager(VectorStore, Retriever):
             print(f"Eliminando colección existente '{self.collection_name}' para asegurar consistencia de dimensión.")
             self.client.drop_collection(collection_name=self.collection_name)
 
-        print(f"Creando nueva colección '{self.collection_name}' con dimensión {self.embedding_dim}...")
-        self.client.create_collection(collection_name=self.collection_name, dimension=self.embedding_dim)
+        print(
+            f"Creando nueva colección '{self.collection_name}' con dimensión {self.embedding_dim} ({self.vector_storage}) "
+            f"e índice {self.index_type} {self.index_params} ({self.index_metric_type})..."
+        )
+        if self.rescore_vectors is not None:
+            self.rescore_vectors.reset()
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            schema=self._build_schema(),
+            index_params=self._build_index_params(),
+        )
         print("Colección creada con éxito.")
 
-    def insert(self, chunks: List[DocumentChunk], batch_size: int = 100):
-        """Insertar chunks en Milvus con embeddings de manera eficiente"""
-
-        # Adaptacion a uso de models
-        data_to_insert = [
-            {
-                "id": hash(chunk.chunk_id),
-                "vector": chunk.embedding,
-                "text": chunk.text,
-                "metadata": chunk.metadata,
-                "chunk_id": chunk.chunk_id,
-                "doc_id": chunk.doc_id,
-            }
-            for chunk in chunks
-            if chunk.embedding is not None
-        ]
+    def has_collection(self) -> bool:
+        """Indica si la colección ya existe en Milvus con el esquema explícito actual"""
+        if not self.client.has_collection(collection_name=self.collection_name):
+            return False
+        fields = {field["name"]: field for field in self.client.describe_collection(self.collection_name)["fields"]}
+        if not {"source", "page", "doc_id"} <= fields.keys():
+            # Colecciones antiguas (quick-setup con metadatos en JSON): requieren la ingesta completa
+            print(f"La colección '{self.collection_name}' usa un esquema anterior y debe recrearse.")
+            return False
+        if fields["vector"]["type"] != VECTOR_STORAGE_TYPES[self.vector_storage]:
+            print(f"La colección '{self.collection_name}' guarda los vectores en otro formato y debe recrearse.")
+            return False
+        if self.rescore_vectors is not None and not self.rescore_vectors.exists():
+            print(f"Faltan los vectores float32 de reordenación de '{self.collection_name}'; debe recrearse.")
+            return False
+        return True
+
+    def delete_documents(self, doc_ids: List[str]):
+        """Elimina todos los chunks de los documentos indicados"""
+        if not doc_ids:
+            return
+        doc_filter = f"doc_id in [{', '.join(json.dumps(doc_id) for doc_id in doc_ids)}]"
+        if self.rescore_vectors is not None:
+            # Las claves de los documentos se leen antes de borrarlos para marcar sus vectores float32
+            rows = self.client.query(collection_name=self.collection_name, filter=doc_filter, output_fields=["id"])
+            self.rescore_vectors.delete([row["id"] for row in rows])
+            self.rescore_vectors.flush()
+        result = self.client.delete(collection_name=self.collection_name, filter=doc_filter)
+        print(f"Eliminados chunks de {len(doc_ids)} documento(s): {result}")
+
+    def _to_row(self, chunk: DocumentChunk) -> dict:
+        return {
+            "id": chunk_primary_key(chunk.chunk_id),
+            "vector": chunk.embedding,
+            "text": _fit_varchar(chunk.text, MAX_TEXT_BYTES),
+            "chunk_id": chunk.chunk_id,
+            "doc_id": chunk.doc_id,
+            "source": _fit_varchar(str(chunk.metadata.get("source", "")), MAX_KEY_BYTES),
+            "page": int(chunk.metadata.get("page", 0)),
+            "metadata": {key: value for key, value in chunk.metadata.items() if key not in ("source", "page")},
+        }
+
+    def _row_batches(self, chunks: List[DocumentChunk], batch_size: int) -> Iterator[List[dict]]:
+        """Construye cada lote de filas cuando va a enviarse, en lugar de convertir todos los chunks de antemano"""
+        batch = []
+        for chunk in chunks:
+            if chunk.embedding is None:
+                continue
+            batch.append(self._to_row(chunk))
+            if len(batch) == batch_size:
+                yield self._finish_batch(batch)
+                batch = []
+        if batch:
+            yield self._finish_batch(batch)
+
+    def _finish_batch(self, batch: List[dict]) -> List[dict]:
+        if self.rescore_vectors is not None:
+            self._compress_batch(batch)
+        return batch
+
+    def _write_batch(self, write, batch: List[dict]) -> int:
+        """Escribe un lote; si falla lo parte en mitades (bisección) hasta aislar las filas inválidas
+
+        Returns:
+            int: Filas escritas
+        """
+        try:
+            with self.metrics.span("vector_insert_batch"):
+                write(collection_name=self.collection_name, data=batch)
+            self.metrics.inc("rag_vector_inserted_chunks_total", len(batch))
+            return len(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self.metrics.inc("rag_vector_insert_failed_total")
+                print(f"Error insertando el chunk {batch[0]['chunk_id']}: {e}")
+                return 0
+            self.metrics.inc("rag_vector_insert_retries_total", 2)
+            middle = len(batch) // 2
+            return self._write_batch(write, batch[:middle]) + self._write_batch(write, batch[middle:])
+
+    def insert(self, chunks: List[DocumentChunk], batch_size: int = 100, upsert: bool = False, compact: bool = True):
+        """Insertar chunks en Milvus con embeddings de manera eficiente
 
-        if not data_to_insert:
+        Los lotes se construyen a medida que se envían y hasta `insert_concurrency` lotes viajan
+        a la vez. Un lote que falla se divide por bisección, de modo que solo se pierden las filas
+        que Milvus rechaza y no hace falta reenviar el lote fila a fila.
+
+        Args:
+            chunks (List[DocumentChunk]): Chunks con embedding
+            batch_size (int): Tamaño de lote. Defaults to 100.
+            upsert (bool): Reemplaza filas con el mismo ID en lugar de duplicarlas. Defaults to False.
+            compact (bool): Persiste la colección al terminar (ver `compact`). Defaults to True.
+        """
+        write = self.client.upsert if upsert else self.client.insert
+        total = sum(1 for chunk in chunks if chunk.embedding is not None)
+        if not total:
             print("Advertencia: No hay chunks con emebeddings para insertar.")
             return
 
-        print(f"Insertando {len(data_to_insert)} chunks en Milvus...")
-        for i in tqdm(range(0, len(data_to_insert), batch_size), desc="Insertando lotes"):
-            batch = data_to_insert[i : i + batch_size]
-            try:
-                self.client.insert(collection_name=self.collection_name, data=batch)
-            except Exception as e:
-                print(f"Error insertando lote {i // batch_size}: {e}")
-                # Intentar insertar individualmente los elementos del lote con error
-                for item in batch:
-                    try:
-                        self.client.insert(collection_name=self.collection_name, data=[item])
-                    except Exception as single_error:
-                        print(f"Error insertando item individual: {single_error}")
+        print(f"Insertando {total} chunks en Milvus...")
+        started = time.perf_counter()
+        inserted = 0
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.insert_concurrency, thread_name_prefix="milvus-insert") as executor:
+            with tqdm(total=-(-total // batch_size), desc="Insertando lotes") as progress:
+                for batch in self._row_batches(chunks, batch_size):
+                    self.metrics.inc("rag_vector_insert_batches_total")
+                    in_flight.append(executor.submit(self._write_batch, write, batch))
+                    # Ventana de lotes en vuelo: acota la memoria y mantiene ocupado a Milvus
+                    while len(in_flight) >= self.insert_concurrency:
+                        inserted += in_flight.popleft().result()
+                        progress.update()
+                while in_flight:
+                    inserted += in_flight.popleft().result()
+                    progress.update()
+        elapsed = time.perf_counter() - started
+        print(
+            f"Insertadas {inserted}/{total} filas en {elapsed:.2f} s ({inserted / elapsed if elapsed else 0:.0f} filas/s, "
+            f"lotes de {batch_size}, {self.insert_concurrency} en paralelo)"
+        )
+        if self.rescore_vectors is not None:
+            self.rescore_vectors.flush()
+        if compact:
+            self.compact()
+
+    def _compress_batch(self, batch: List[dict]):
+        """Guarda los vectores float32 del lote para reordenar y los sustituye por su versión comprimida"""
+        vectors = prepare_vectors([row["vector"] for row in batch], self.metric_type)
+        self.rescore_vectors.add([row["id"] for row in batch], vectors)
+        for row, encoded in zip(batch, encode_vectors(vectors, self.vector_storage)):
+            row["vector"] = encoded
+
+    def compact(self):
+        """Persiste los segmentos insertados con flush; con `compact_after_insert` pide además una compactación
+
+        Tras una carga nueva la compactación es costosa y no aporta nada: Milvus la programa por su cuenta.
+        Los vectores float32 de reordenación sí se compactan siempre, quitando los borrados y reemplazados.
+        """
+        if self.rescore_vectors is not None:
+            self.rescore_vectors.compact()
         try:
-            self.client.compact(collection_name=self.collection_name)
-            print("Datos persistidos con compact")
+            self.client.flush(collection_name=self.collection_name)
+            if self.compact_after_insert:
+                self.client.compact(collection_name=self.collection_name)
+                print("Datos persistidos con flush y compact")
+            else:
+                print("Datos persistidos con flush")
         except Exception as e:
-            print(f"Error haciendo compact: {e}")
+            print(f"Error persistiendo la colección: {e}")
 
-    def search(self, vector: List[float], top_k: int) -> List[SearchResult]:
-        """Busca en la base de conocimiento"""
+    def search_batch(self, vectors, top_k: int) -> List[List[SearchResult]]:
+        """Busca varias consultas en una sola petición multi-vector a Milvus"""
+        if not len(vectors):
+            return []
+        if self.rescore_vectors is None:
+            search_res = self.client.search(
+                collection_name=self.collection_name,
+                data=np.asarray(vectors, dtype=np.float32).tolist(),
+                limit=top_k,
+                output_fields=SEARCH_OUTPUT_FIELDS,
+                search_params=_search_params(self.metric_type, self.search_params, top_k),
+            )
+            return [_to_search_results(hits) for hits in search_res]
+
+        queries = prepare_vectors(vectors, self.metric_type)
+        limit = min(top_k * self.oversample, MAX_SEARCH_LIMIT)
         search_res = self.client.search(
             collection_name=self.collection_name,
-            data=[vector],
-            limit=top_k,
-            output_fields=["text", "metadata", "chunk_id", "doc_id"],
+            data=encode_vectors(queries, self.vector_storage),
+            limit=limit,
+            output_fields=SEARCH_OUTPUT_FIELDS,
+            search_params=_search_params(self.index_metric_type, self.search_params, limit),
         )
+        return [
+            _rescore(self.rescore_vectors, self.metric_type, query, hits, top_k) for query, hits in zip(queries, search_res)
+        ]
 
-        results = []
-        for res in search_res[0]:
-            retrieved_chunk = DocumentChunk(
-                chunk_id=res["entity"]["chunk_id"],
-                doc_id=res["entity"]["doc_id"],
-                text=res["entity"]["text"],
-                metadata=res["entity"]["metadata"],
-            )
-            results.append(SearchResult(chunk=retrieved_chunk, similarity=res["distance"]))
-
-        return results
+    def search(self, vector: List[float], top_k: int) -> List[SearchResult]:
+        """Busca en la base de conocimiento"""
+        return self.search_batch([vector], top_k)[0]
 
     def get_stats(self):
         """Obtiene estadísticas de la colección"""
@@ -95,3 +432,58 @@ class MilvusManager(VectorStore, Retriever):
         except Exception as e:
             print(f"Error obteniendo estadísticas: {e}")
             return {"error": str(e)}
+
+
+class AsyncMilvusSearcher(AsyncRetriever):
+    """Búsquedas concurrentes sobre una colección existente con `AsyncMilvusClient` (modo servidor)
+
+    Requiere un servidor Milvus (http/https); Milvus Lite no admite el cliente asíncrono.
+    `index_type`, `metric_type`, `search_params` y `vector_storage` deben coincidir con los del
+    MilvusManager que creó la colección; con vectores comprimidos se pasan sus `rescore_vectors`.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        collection_name: str,
+        index_type: str = "HNSW",
+        metric_type: str = "COSINE",
+        search_params: Optional[dict] = None,
+        vector_storage: str = "float32",
+        oversample: int = 4,
+        rescore_vectors: Optional[FullPrecisionVectors] = None,
+    ):
+        self.client = AsyncMilvusClient(uri=uri)
+        self.collection_name = collection_name
+        self.metric_type = metric_type.upper()
+        self.vector_storage = vector_storage
+        self.oversample = max(1, oversample)
+        self.rescore_vectors = rescore_vectors if vector_storage != "float32" else None
+        index_type, self.index_metric_type = _storage_index(index_type.upper(), self.metric_type, vector_storage)
+        self.search_params = {**INDEX_TYPES[index_type][1], **(search_params or {})}
+
+    async def search(self, vector: List[float], top_k: int) -> List[SearchResult]:
+        """Busca en la base de conocimiento sin bloquear el event loop"""
+        if self.rescore_vectors is None:
+            search_res = await self.client.search(
+                collection_name=self.collection_name,
+                data=[vector],
+                limit=top_k,
+                output_fields=SEARCH_OUTPUT_FIELDS,
+                search_params=_search_params(self.metric_type, self.search_params, top_k),
+            )
+            return _to_search_results(search_res[0])
+
+        query = prepare_vectors(vector, self.metric_type)
+        limit = min(top_k * self.oversample, MAX_SEARCH_LIMIT)
+        search_res = await self.client.search(
+            collection_name=self.collection_name,
+            data=encode_vectors(query, self.vector_storage),
+            limit=limit,
+            output_fields=SEARCH_OUTPUT_FIELDS,
+            search_params=_search_params(self.index_metric_type, self.search_params, limit),
+        )
+        return _rescore(self.rescore_vectors, self.metric_type, query[0], search_res[0], top_k)
+
+    async def close(self):
+        await self.client.close()